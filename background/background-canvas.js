@@ -79,6 +79,9 @@
       ctx.beginPath(); ctx.arc(cx,cy,radius,0,Math.PI*2); ctx.fill();
     }
 
+    // pre-simulated rainfall ripples, when ripple-player.js is loaded
+    if(window.__ripplePlayer) window.__ripplePlayer.draw(ctx, w, h, now);
+
     ctx.restore();
     // subtle film grain
     ctx.save();
@@ -0,0 +1,86 @@
+// Streams pre-simulated rainfall ripples (written by rainfall_923/export_web.py) and draws them
+// on top of the organic canvas background. The data is a small JSON index plus binary chunks of
+// quantized typed arrays, so the page downloads a few KB per minute of animation instead of video.
+// Chunks are fetched one ahead of playback and dropped once played.
+
+(() => {
+  const script = document.currentScript;
+  const src = (script && script.dataset.src) || 'ripples/index.json';
+  const base = src.slice(0, src.lastIndexOf('/') + 1);
+
+  let index = null, palette = [], t0 = 0;
+  const chunks = new Map(); // chunk number -> decoded chunk (or a pending promise)
+  // chunk number -> { delay, until } of a failed fetch; retried with exponential backoff, not every frame
+  const failed = new Map();
+  const RETRY_MIN = 1000, RETRY_MAX = 60000;
+
+  // Float16 -> Float32 lookup (Float16Array is not available everywhere yet)
+  const HALF = new Float32Array(65536);
+  for(let h=0;h<65536;h++){
+    const s = h & 0x8000 ? -1 : 1, e = (h >> 10) & 0x1f, f = h & 0x3ff;
+    HALF[h] = e === 0 ? s * f * Math.pow(2, -24) : e === 31 ? (f ? NaN : s * Infinity) : s * (1 + f/1024) * Math.pow(2, e - 15);
+  }
+
+  function decode(buf, meta){
+    const o = meta.offsets, n = meta.ripples;
+    const counts = new Uint16Array(buf, o.counts, meta.frames);
+    const starts = new Uint32Array(meta.frames);
+    for(let i=1;i<meta.frames;i++) starts[i] = starts[i-1] + counts[i-1];
+    return { meta, counts, starts,
+      x: new Uint16Array(buf, o.x, n), y: new Uint16Array(buf, o.y, n), r: new Uint16Array(buf, o.r, n),
+      alpha: new Uint8Array(buf, o.alpha, n), color: new Uint8Array(buf, o.color, n) };
+  }
+
+  function fetchChunk(ci){
+    if(!index || ci >= index.chunks.length || chunks.has(ci)) return;
+    const retry = failed.get(ci);
+    if(retry && performance.now() < retry.until) return;
+    const meta = index.chunks[ci];
+    chunks.set(ci, null);
+    fetch(base + meta.file)
+      .then(r => { if(!r.ok) throw new Error(`HTTP ${r.status}`); return r.arrayBuffer(); })
+      .then(buf => { chunks.set(ci, decode(buf, meta)); failed.delete(ci); })
+      .catch(() => {
+        chunks.delete(ci);
+        const delay = retry ? Math.min(RETRY_MAX, retry.delay * 2) : RETRY_MIN;
+        failed.set(ci, { delay, until: performance.now() + delay });
+      });
+  }
+
+  fetch(src).then(r => r.json()).then(idx => {
+    index = idx;
+    palette = idx.palette.map(([r,g,b]) => `${r},${g},${b}`);
+    t0 = performance.now() / 1000;
+    fetchChunk(0); fetchChunk(1);
+  }).catch(() => { index = null; });
+
+  // draw the frame for the current time; called from the background canvas' rAF loop
+  function draw(ctx, w, h, now){
+    if(!index) return;
+    const frame = Math.floor((now - t0) * index.fps) % index.frames;
+    const ci = Math.floor(frame / index.chunkFrames);
+    const n = index.chunks.length;
+    fetchChunk(ci); fetchChunk((ci + 1) % n);
+    for(const k of chunks.keys()) if(k !== ci && k !== (ci + 1) % n) chunks.delete(k);
+    const c = chunks.get(ci);
+    if(!c) return;
+
+    const fi = frame - c.meta.start, s = c.starts[fi], e = s + c.counts[fi];
+    const scale = Math.min(w, h);
+    ctx.save();
+    ctx.globalCompositeOperation = 'lighter';
+    ctx.lineWidth = 2;
+    for(let i=s;i<e;i++){
+      const a = c.alpha[i] / 255;
+      if(a < 0.04) continue;
+      ctx.strokeStyle = `rgba(${palette[c.color[i]]},${a})`;
+      ctx.beginPath();
+      // y is stored bottom-up like the matplotlib axes
+      ctx.arc(HALF[c.x[i]] * w, (1 - HALF[c.y[i]]) * h, Math.max(1, HALF[c.r[i]] * scale), 0, Math.PI * 2);
+      ctx.stroke();
+    }
+    ctx.restore();
+  }
+
+  window.__ripplePlayer = { draw };
+})();
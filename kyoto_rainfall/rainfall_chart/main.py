@@ -1,15 +1,36 @@
 import pygame
+import os
 import sys
-import math
+import time
 import random
-import pandas as pd
 import numpy as np
 from collections import deque
 
+# shared render helpers (level of detail, ...) live next to the matplotlib version
+SHARED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'rainfall_923')
+sys.path.append(SHARED_DIR)
+import lod
+from clouds import NoiseClouds
+from tail_reader import TailFollowReader
+from live_feed import LiveFeed
+from weather import WeatherSeries, wind_components
+from budget import FrameBudget
+from data_loader import BackgroundLoad, header_row
+from frame_store import FrameStore, FrameWriter
+import kiosk
+
 # --- CONFIG ---
 WIDTH, HEIGHT = 1000, 700
 BG_COLOR = (18, 20, 26)
+# the simulation advances in fixed steps of 1/SIM_HZ s whatever the render rate,
+# so data playback speed does not depend on how fast frames are drawn
+SIM_HZ = 60
+# render rate cap, the usual display refresh: drawing faster only burns a core on
+# frames the screen never shows (higher or uncapped, 0, via --fps)
 FPS = 60
+# sim steps caught up per rendered frame; a longer backlog is dropped so a slow
+# machine renders fewer frames (frame skipping) instead of spiralling behind
+MAX_SIM_STEPS = 8
 DATA_FILE_CANDIDATES = [
     '../kyotov9.24.csv',
     '../kyotov03.csv',
@@ -22,9 +43,40 @@ KYOTO_LAT, KYOTO_LON = 35.0116, 135.7681
 
 # Visual parameters
 N_RIPPLES = 12
+# a batch of N_RIPPLES ripples is spawned every SPAWN_EVERY sim steps
+SPAWN_EVERY = 6
 MAX_RADIUS = min(WIDTH, HEIGHT) // 2
 FADE_RATE = 0.015
 RIPPLE_LINEWIDTH = 2
+# per-ripple angular offsets of a spawn batch (ripple i sits at wind angle + i rad)
+SPAWN_SIN = np.sin(np.arange(N_RIPPLES))
+SPAWN_COS = np.cos(np.arange(N_RIPPLES))
+
+# column candidates per series, first case-insensitive substring match wins
+COLUMNS = {
+    'rain': ['rain', 'precip', 'precipitation'],
+    'wind_dir': ['wind_direction', 'winddir', 'wind_dir'],
+    'rh': ['relative_humidity', 'humidity', 'rh'],
+    'temp': ['temperature', 'temp', 'air_temperature'],
+}
+
+# the cloud field is sampled every CLOUD_REFRESH sim steps; only the tiles whose
+# colour changed since then are redrawn (see CloudLayer.update)
+CLOUD_REFRESH = 4
+
+# adaptive quality (see budget.py): live ripples kept under the 'ripples' step,
+# and the chord error of the ring polygons under the 'antialias' step (pygame
+# rings are not anti-aliased, their smoothness is the segment count)
+MAX_LIVE_RIPPLES = 60
+COARSE_ERROR_PX = 1.5
+
+# how often --follow checks the CSV for appended rows
+FOLLOW_POLL_MS = 2000
+
+# --kiosk loops: 20 s of sim steps (a whole number of spawn intervals); the
+# start is searched over the first LOOP_SEARCH_STEPS steps of the data
+LOOP_STEPS = 20 * SIM_HZ
+LOOP_SEARCH_STEPS = 6000
 
 
 def find_data_file(candidates):
@@ -35,75 +87,62 @@ def find_data_file(candidates):
     return None
 
 
+def synthetic_weather():
+    # deterministic synthetic fallback
+    rng = np.random.RandomState(1234)
+    n = 1000
+    return WeatherSeries(rain=rng.uniform(0, 20, n), wind_dir=rng.uniform(0, 360, n),
+                         rh=rng.uniform(30, 100, n), temp=rng.uniform(0, 30, n))
+
+
 def load_weather_data(path):
     # If no path provided, return deterministic synthetic fallback immediately
     if path is None:
-        rng = np.random.RandomState(1234)
-        n = 1000
-        return {
-            'rain': rng.uniform(0, 20, n),
-            'wind_dir': rng.uniform(0, 360, n),
-            'rh': rng.uniform(30, 100, n),
-            'temp': rng.uniform(0, 30, n)
-        }
-
-    # Attempts to find sensible columns; returns a dict of arrays or fallbacks
+        return synthetic_weather()
+
+    # imported here so the window opens without waiting for pandas
+    import pandas as pd
+
+    # Attempts to find sensible columns; returns a typed, validated WeatherSeries
     try:
-        df = pd.read_csv(path)
-        # possible column names
-        col_names = {c.lower(): c for c in df.columns}
-        def find(cols):
-            for c in cols:
-                for k, orig in col_names.items():
-                    if c in k:
-                        return df[orig].values
-            return None
-
-        rain = find(['rain', 'precip', 'precipitation'])
-        wind_dir = find(['wind_direction', 'winddir', 'wind_dir'])
-        rh = find(['relative_humidity', 'humidity', 'rh'])
-        temp = find(['temperature', 'temp', 'air_temperature'])
-
-        # fallback to synthetic columns if missing
-        n = len(df)
-        if rain is None:
-            rain = np.zeros(n)
-        if wind_dir is None:
-            wind_dir = np.zeros(n)
-        if rh is None:
-            rh = np.zeros(n)
-        if temp is None:
-            temp = np.zeros(n)
-
-        return {'rain': rain, 'wind_dir': wind_dir, 'rh': rh, 'temp': temp}
+        # multi-section exports: read from the main ('time', widest) header on
+        df = pd.read_csv(path, skiprows=header_row(path))
+        # numeric coercion and NaN/outlier handling are vectorized in weather.py;
+        # missing columns come back as zeros
+        return WeatherSeries.from_frame(df, COLUMNS)
     except Exception as e:
         print(f'Error loading data: {e}')
-        # deterministic synthetic fallback
-        rng = np.random.RandomState(1234)
-        n = 1000
-        return {
-            'rain': rng.uniform(0, 20, n),
-            'wind_dir': rng.uniform(0, 360, n),
-            'rh': rng.uniform(30, 100, n),
-            'temp': rng.uniform(0, 30, n)
-        }
+        return synthetic_weather()
 
 
 class Ripple:
-    def __init__(self, x, y, color, wind_angle=0):
+    def __init__(self, x, y, color, wind_cos=1.0, wind_sin=0.0):
         self.x = x
         self.y = y
         self.r = 2.0
         self.color = color
         self.alpha = 0.95
-        self.wind_angle = wind_angle
+        # small wind drift per step, from the precomputed wind components
+        self.dx = wind_cos * 0.4
+        self.dy = wind_sin * 0.4
+        # state before the last step, for drawing in between sim steps
+        self.prev = (x, y, self.r, self.alpha)
+        self.interpolate(1.0)
 
     def step(self):
+        self.prev = (self.x, self.y, self.r, self.alpha)
         self.r += 1.6
         self.alpha -= FADE_RATE
-        # small wind drift
-        self.x += math.cos(self.wind_angle) * 0.4
-        self.y += math.sin(self.wind_angle) * 0.4
+        self.x += self.dx
+        self.y += self.dy
+
+    def interpolate(self, t):
+        """Set the drawn state (draw_x, draw_y, draw_r, draw_alpha) `t` of the way from the previous step."""
+        px, py, pr, pa = self.prev
+        self.draw_x = px + (self.x - px) * t
+        self.draw_y = py + (self.y - py) * t
+        self.draw_r = pr + (self.r - pr) * t
+        self.draw_alpha = pa + (self.alpha - pa) * t
 
     def is_dead(self):
         return self.alpha <= 0 or self.r > MAX_RADIUS
@@ -126,102 +165,319 @@ def color_from_rain(r):
     return (max(0, min(255, rcol)), max(0, min(255, gcol)), max(0, min(255, bcol)))
 
 
-def make_clouds(surface, num=18):
-    clouds = []
-    for _ in range(num):
-        cx = random.randint(0, WIDTH)
-        cy = random.randint(0, HEIGHT)
-        r = random.randint(120, 280)
-        alpha = random.uniform(0.06, 0.18)
-        clouds.append((cx, cy, r, alpha))
-    return clouds
-
-
-def draw_clouds(surface, clouds):
-    for (cx, cy, r, alpha) in clouds:
-        s = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
-        g = pygame.Surface((r * 2, r * 2), pygame.SRCALPHA)
-        pygame.draw.circle(g, (30, 35, 50, int(alpha * 255)), (r, r), r)
-        g = pygame.transform.smoothscale(g, (int(r * 2), int(r * 2)))
-        s.blit(g, (0, 0))
-        surface.blit(s, (cx - r, cy - r), special_flags=pygame.BLEND_RGBA_ADD)
+def spawn_batch(data, idx, thin=False):
+    """Ripples of the spawn batch that starts at sample `idx` (every other one if `thin`)."""
+    # spawn up to N_RIPPLES distributed around center with wind offset
+    center_x = WIDTH // 2
+    center_y = HEIGHT // 2
+    # one batch of samples; the wind comes as precomputed sin/cos
+    ids = (idx + np.arange(N_RIPPLES)) % len(data['rain'])
+    rain_vals = data['rain'][ids]
+    wsin, wcos = wind_components(data, ids)
+    # spawn positions slightly offset by wind: angle (wind + r_i) via the sum formulas
+    cos_a = wcos * SPAWN_COS - wsin * SPAWN_SIN
+    sin_a = wsin * SPAWN_COS + wcos * SPAWN_SIN
+    batch = []
+    for r_i in range(0, N_RIPPLES, 2 if thin else 1):
+        off = 30 + r_i * 6
+        sx = center_x + int(cos_a[r_i] * off)
+        sy = center_y + int(sin_a[r_i] * off)
+        color = color_from_rain(float(rain_vals[r_i]))
+        batch.append(Ripple(sx, sy, color, float(wcos[r_i]), float(wsin[r_i])))
+    return batch
+
+
+def ripple_lifetime():
+    """Sim steps from spawn until a ripple is dead."""
+    rp = Ripple(0, 0, (0, 0, 0))
+    steps = 0
+    while not rp.is_dead():
+        rp.step()
+        steps += 1
+    return steps
+
+
+def loop_cost(data, start, period):
+    """How different the spawn batches at steps `start` and `start + period` are (0 = same samples)."""
+    n = len(data['rain'])
+    a = (start // SPAWN_EVERY * N_RIPPLES + np.arange(N_RIPPLES)) % n
+    b = ((start + period) // SPAWN_EVERY * N_RIPPLES + np.arange(N_RIPPLES)) % n
+    wind = np.abs((data['wind_dir'][a] - data['wind_dir'][b] + 180) % 360 - 180) / 180
+    return float(np.mean(np.abs(data['rain'][a] - data['rain'][b]) / 30 + wind
+                         + np.abs(data['rh'][a] - data['rh'][b]) / 100
+                         + np.abs(data['temp'][a] - data['temp'][b]) / 40))
+
+
+def build_loop(data, out, period=LOOP_STEPS, search=LOOP_SEARCH_STEPS):
+    """Render a seamless loop of `period` sim steps of ripples (on black) to the frame store `out`.
+
+    The spawn batches repeat with the period, from the start step whose
+    batch best matches the one a period later. The simulation is warmed up
+    for whole periods first, so the ripples alive on the first frame are
+    the ones left over from the loop's own end and the wrap has no seam.
+    Frame ids are the sim steps they show; returns the start step.
+    """
+    period -= period % SPAWN_EVERY
+    batches = period // SPAWN_EVERY
+    start = min(range(0, search, SPAWN_EVERY), key=lambda s: loop_cost(data, s, period))
+    warmup = -(-ripple_lifetime() // period) * period
+    n = len(data['rain'])
+    ripples = []
+    canvas = pygame.Surface((WIDTH, HEIGHT))
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with FrameWriter(out, WIDTH, HEIGHT, fps=SIM_HZ) as writer:
+        for step in range(warmup + period):
+            # sim_step at full quality, with the batch index wrapping every period
+            ripples = [rp for rp in ripples if not rp.is_dead()]
+            if step % SPAWN_EVERY == 0:
+                batch = start // SPAWN_EVERY + step // SPAWN_EVERY % batches
+                ripples.extend(spawn_batch(data, batch * N_RIPPLES % n))
+            for rp in ripples:
+                rp.step()
+                rp.interpolate(1.0)
+            if step < warmup:
+                continue
+            canvas.fill((0, 0, 0))
+            for rp in ripples:
+                draw_ripple(canvas, rp)
+            rgb = np.frombuffer(pygame.image.tobytes(canvas, 'RGB'), dtype=np.uint8)
+            writer.append(rgb.reshape(HEIGHT, WIDTH, 3), frame_id=start + step - warmup)
+    return start
+
+
+class CloudLayer:
+    """Animated noise clouds (clouds.NoiseClouds) rendered at 1/4 resolution.
+
+    The field is sampled at low resolution and smoothscaled up, so the cost
+    is flat no matter how much of the sky is covered. The layer is faint
+    (a few colour levels) and drifts slowly, so `update` keeps the colours
+    on screen and only redraws the tiles of TILE low-res pixels where the
+    colour moved by LEVELS or more; clear sky and barely moving clouds cost
+    nothing.
+    """
+
+    TILE = 8
+    # a tile may lag the field by one colour level, which is invisible; redrawing
+    # on every 1-level step would touch about a quarter of the window per refresh
+    LEVELS = 2
+
+    def __init__(self, width, height, scale=4, color=(30, 35, 50), max_alpha=0.35):
+        self.size = (width, height)
+        self.seed = random.randint(0, 9999)
+        self.color = np.array(color, dtype=np.float32)
+        self.max_alpha = max_alpha
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        # same seed, so changing the detail keeps the sky's shape
+        self.scale = scale
+        self.noise = NoiseClouds(self.size[0] // scale, self.size[1] // scale, seed=self.seed)
+        self.invalidate()
+
+    def invalidate(self):
+        """Make the next `update` redraw the whole background."""
+        self.shown = None
+
+    def update(self, background, frame):
+        """Bring `background` (BG_COLOR plus clouds) to `frame`; returns the rects that changed."""
+        dens = self.noise.density(frame) * self.max_alpha
+        # surfarray is (x, y, rgb); additive like the old per-cloud blits
+        rgb = (dens.T[:, :, None] * self.color).astype(np.uint8)
+        w, h = rgb.shape[:2]
+        t = self.TILE
+        if self.shown is None:
+            self.shown = rgb
+            changed = np.ones((-(-w // t), -(-h // t)), dtype=bool)
+        else:
+            diff = np.zeros((-(-w // t) * t, -(-h // t) * t), dtype=bool)
+            diff[:w, :h] = np.any(np.abs(rgb.astype(np.int16) - self.shown) >= self.LEVELS, axis=2)
+            changed = diff.reshape(diff.shape[0] // t, t, diff.shape[1] // t, t).any(axis=(1, 3))
+            if not changed.any():
+                return []
+        rects = []
+        for ty in range(changed.shape[1]):
+            # runs of changed tiles along the row become one rect
+            row = np.concatenate([[False], changed[:, ty], [False]])
+            edges = np.flatnonzero(row[1:] != row[:-1])
+            for x0, x1 in zip(edges[0::2] * t, edges[1::2] * t):
+                self.shown[x0:x1, ty * t:(ty + 1) * t] = rgb[x0:x1, ty * t:(ty + 1) * t]
+                # smoothscale blends one low-res pixel into its neighbours
+                rect = pygame.Rect((x0 - 1) * self.scale, (ty * t - 1) * self.scale,
+                                   (x1 - x0 + 2) * self.scale, (t + 2) * self.scale)
+                rects.append(rect.clip(background.get_rect()))
+        big = pygame.transform.smoothscale(pygame.surfarray.make_surface(self.shown), self.size)
+        for r in rects:
+            background.fill(BG_COLOR, r)
+            background.blit(big, r, r, special_flags=pygame.BLEND_RGB_ADD)
+        return rects
+
+
+class KioskLoop(kiosk.LoopCache):
+    """Seamless loop of this viewer's ripples, played instead of the live simulation.
+
+    The loop holds the ripples only (on black), one frame per sim step,
+    rendered by `main.py --build-loop` (build_loop) in a separate process;
+    the clouds and the info box are drawn live over it. Until the loop for
+    the current data is ready the viewer runs live.
+    """
+
+    def __init__(self, csv_path, size, period=LOOP_STEPS):
+        self.csv_path = os.path.abspath(csv_path) if csv_path else None
+        self.size = size
+        self.period = period
+        super().__init__(self._loop_path, self._command, FrameStore, cwd=os.getcwd())
+
+    def _loop_path(self):
+        return kiosk.loop_path(self.csv_path, *self.size, self.period, kind='pygame')
+
+    def _command(self, path):
+        return [sys.executable, os.path.abspath(__file__), '--build-loop', path]
+
+    def surface(self, i):
+        return pygame.image.frombuffer(self.frames[i % len(self.frames)], self.size, 'RGB')
+
+    def sample(self, i):
+        """First sample of the batch spawned next after loop frame `i`, as `idx` in live mode."""
+        start = int(self.frames.frame_ids[0])
+        batches = len(self.frames) // SPAWN_EVERY
+        return N_RIPPLES * (start // SPAWN_EVERY + (i % len(self.frames) // SPAWN_EVERY + 1) % batches)
+
+
+def ripple_rect(rp):
+    """Screen rect `draw_ripple` will touch for this ripple's drawn state (None if skipped)."""
+    level = lod.classify(rp.draw_r, rp.draw_alpha)
+    if level == lod.SKIP:
+        return None
+    if level == lod.POINT:
+        return pygame.Rect(int(rp.draw_x), int(rp.draw_y), RIPPLE_LINEWIDTH, RIPPLE_LINEWIDTH)
+    size = int(rp.draw_r * 2) + 4
+    half = size / 2.0
+    # one pixel of slack each side for how blit rounds float positions
+    return pygame.Rect(int(rp.draw_x - half) - 1, int(rp.draw_y - half) - 1, size + 2, size + 2)
+
+
+def draw_ripple(surface, rp, max_error_px=lod.MAX_ERROR_PX):
+    # level of detail: skip near-transparent ripples, draw tiny ones as a
+    # point and pick the ring's polygon segment count from its pixel radius
+    level = lod.classify(rp.draw_r, rp.draw_alpha)
+    if level == lod.SKIP:
+        return
+    a = max(0.0, min(1.0, rp.draw_alpha))
+    if level == lod.POINT:
+        # additive fill of a single pixel block, pre-multiplied by alpha
+        col = tuple(int(c * a) for c in rp.color)
+        surface.fill(col, (int(rp.draw_x), int(rp.draw_y), RIPPLE_LINEWIDTH, RIPPLE_LINEWIDTH), special_flags=pygame.BLEND_RGB_ADD)
+        return
+    col = rp.color + (int(a * 255),)
+    size = int(rp.draw_r * 2) + 4
+    half = size / 2.0
+    surf = pygame.Surface((size, size), pygame.SRCALPHA)
+    poly = lod.unit_circle(int(lod.segments_for_radius(rp.draw_r, max_error_px))) * rp.draw_r + half
+    pygame.draw.lines(surf, col, True, poly.tolist(), RIPPLE_LINEWIDTH)
+    surface.blit(surf, (rp.draw_x - half, rp.draw_y - half), special_flags=pygame.BLEND_RGBA_ADD)
 
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Kyoto rain ripples (pygame)')
+    parser.add_argument('--follow', action='store_true',
+                        help='Keep reading rows appended to the CSV while running')
+    parser.add_argument('--live', metavar='URL', default=None,
+                        help='Poll an Open-Meteo style JSON endpoint for new samples')
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help=f'Render rate cap, 0 = uncapped (the simulation always runs at {SIM_HZ} Hz)')
+    parser.add_argument('--target-fps', type=float, default=SIM_HZ,
+                        help='Frame rate the adaptive quality controller tries to hold')
+    parser.add_argument('--kiosk', action='store_true',
+                        help='Play a cached seamless loop; run live only while it is (re)built')
+    parser.add_argument('--build-loop', metavar='OUT', default=None,
+                        help='Render the --kiosk loop for the CSV to a frame store and exit')
+    args = parser.parse_args()
+    if args.follow and args.live:
+        # each replaces the data source; the feed would silently shadow the tail reader
+        parser.error('--follow and --live are alternative data sources; pick one')
+    if args.kiosk and args.live:
+        parser.error('--kiosk loops the CSV; it does not combine with --live')
+
+    if args.build_loop:
+        # offscreen: surfaces and pygame.draw need no window
+        data_path = find_data_file(DATA_FILE_CANDIDATES)
+        start = build_loop(load_weather_data(data_path), args.build_loop)
+        print(f'Wrote {args.build_loop} (loop starts at step {start})')
+        return
+
     pygame.init()
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption('Kyoto Rain — Ripples')
     clock = pygame.time.Clock()
 
     data_path = find_data_file(DATA_FILE_CANDIDATES)
-    if data_path:
+    reader = None
+    loading = None
+    if data_path and args.follow:
+        # tail-follow: only bytes appended since the last poll are parsed
+        print('Following', data_path)
+        reader = TailFollowReader(data_path)
+        reader.subscribe(lambda rd, added: print(f'Picked up {added} new rows'))
+        data = reader.data if reader.data else synthetic_weather()
+    elif data_path and not args.live:
+        # animate the first rows while the whole file is parsed on a background thread
+        print('Loading data from', data_path)
+        loading = BackgroundLoad(load_weather_data, data_path, COLUMNS)
+        data = loading.preview or loading.wait()
+    elif data_path:
         print('Loading data from', data_path)
         data = load_weather_data(data_path)
     else:
         print('No CSV found; using synthetic data')
-        data = load_weather_data(None)
+        data = synthetic_weather()
+
+    feed = None
+    if args.live:
+        # polled on a background asyncio loop; the frame loop only drains its queue
+        feed = LiveFeed(args.live, seed=data).start()
+        data = feed.data
 
     n = len(data['rain'])
     idx = 0
 
     ripples = []
-    clouds = make_clouds(screen, num=20)
+    clouds = CloudLayer(WIDTH, HEIGHT)
 
     font = pygame.font.SysFont('Arial', 16)
 
-    running = True
-    frame = 0
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-
-        screen.fill(BG_COLOR)
-
-        # draw clouds in background (subtle)
-        draw_clouds(screen, clouds)
-
-        # spawn a set of ripples every few frames
-        if frame % 6 == 0:
-            # spawn up to N_RIPPLES distributed around center with wind offset
-            center_x = WIDTH // 2
-            center_y = HEIGHT // 2
-            for r_i in range(N_RIPPLES):
-                # sample data
-                rain_val = float(data['rain'][idx % n])
-                wind_deg = float(data['wind_dir'][idx % n]) if n > 0 else 0.0
-                wind_rad = math.radians(wind_deg)
-                # spawn position slightly offset by wind
-                off = 30 + r_i * 6
-                sx = center_x + int(math.cos(wind_rad + r_i) * off)
-                sy = center_y + int(math.sin(wind_rad + r_i) * off)
-                color = color_from_rain(rain_val)
-                ripples.append(Ripple(sx, sy, color, wind_angle=wind_rad))
-                idx = (idx + 1) % n
-
-        # step & draw ripples
-        for rp in ripples[:]:
+    background = pygame.Surface((WIDTH, HEIGHT))
+    prev_rects = []
+    box_w = 240
+    box_h = 22 * 6 + 12
+    overlay_rect = pygame.Rect(WIDTH - box_w - 18, HEIGHT - box_h - 18, box_w, box_h)
+    budget = FrameBudget(1.0 / args.target_fps)
+
+    def sim_step(tick, idx, ripples):
+        """Advance the simulation one fixed step; returns (idx, ripples)."""
+        # ripples that died last step were drawn once more, now drop them
+        ripples = [rp for rp in ripples if not rp.is_dead()]
+        if budget.active('ripples') and len(ripples) > MAX_LIVE_RIPPLES:
+            # over budget: the oldest (faintest) ripples go first
+            ripples = ripples[-MAX_LIVE_RIPPLES:]
+        # spawn a set of ripples every few steps
+        if tick % SPAWN_EVERY == 0:
+            # over budget: every other ripple of the batch
+            ripples.extend(spawn_batch(data, idx, budget.active('spawn')))
+            idx = (idx + N_RIPPLES) % n
+        for rp in ripples:
             rp.step()
-            if rp.alpha > 0:
-                col = rp.color + (int(max(0, min(255, rp.alpha * 255))),)
-                surf = pygame.Surface((int(rp.r * 2) + 4, int(rp.r * 2) + 4), pygame.SRCALPHA)
-                pygame.draw.circle(surf, col, (surf.get_width() // 2, surf.get_height() // 2), int(rp.r), RIPPLE_LINEWIDTH)
-                screen.blit(surf, (rp.x - rp.r - 2, rp.y - rp.r - 2), special_flags=pygame.BLEND_RGBA_ADD)
-            if rp.is_dead():
-                try:
-                    ripples.remove(rp)
-                except ValueError:
-                    pass
+        return idx, ripples
 
+    def draw_info(frame, sample):
         # info overlay
         info_lines = [f'Kyoto: {KYOTO_LAT:.4f}, {KYOTO_LON:.4f}',
                       f'Frame: {frame}',
-                      f'Rain sample: {float(data["rain"][idx % n]):.2f} mm',
-                      f'RH: {float(data["rh"][idx % n]):.1f}%',
-                      f'Temp: {float(data["temp"][idx % n]):.1f}°C']
+                      f'Rain sample: {float(data["rain"][sample % n]):.2f} mm',
+                      f'RH: {float(data["rh"][sample % n]):.1f}%',
+                      f'Temp: {float(data["temp"][sample % n]):.1f}°C',
+                      f'Quality: {budget.label()}']
         # draw semi-opaque box
-        box_w = 240
-        box_h = 22 * len(info_lines) + 12
         box_surf = pygame.Surface((box_w, box_h), pygame.SRCALPHA)
         box_surf.fill((8, 10, 12, 180))
         # small blur-like border by drawing translucent rects (cheap)
@@ -230,10 +486,110 @@ def main():
             txt = font.render(line, True, (230, 230, 230))
             screen.blit(txt, (WIDTH - box_w - 12, HEIGHT - box_h - 6 + i * 22))
 
-        pygame.display.flip()
-        clock.tick(FPS)
-        frame += 1
+    loop = KioskLoop(data_path, (WIDTH, HEIGHT)) if args.kiosk else None
+    loop_frame = 0
+
+    running = True
+    tick = 0
+    cloud_tick = None
+    sim_dt = 1.0 / SIM_HZ
+    acc = sim_dt  # the first frame shows step 0
+    last_time = time.perf_counter()
+    last_poll = pygame.time.get_ticks()
+    while running:
+        frame_start = time.perf_counter()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
 
+        if reader is not None and pygame.time.get_ticks() - last_poll >= FOLLOW_POLL_MS:
+            last_poll = pygame.time.get_ticks()
+            if reader.refresh():
+                n = len(data['rain'])
+                if loop is not None:
+                    loop.refresh()
+        if feed is not None and feed.drain():
+            n = len(data['rain'])
+        loaded = loading.take() if loading is not None else None
+        if loaded is not None:
+            # swapped between frames: sim_step reads `data` and `n` from here
+            print(f'Loaded {len(loaded["rain"])} samples')
+            data = loaded
+            n = len(data['rain'])
+
+        cloud_every = CLOUD_REFRESH * clouds.scale // 4
+        if loop is not None and loop.ready():
+            # kiosk playback at SIM_HZ: the cached ripples added over the live clouds,
+            # one loop frame per sim step; the simulation is paused
+            if tick // cloud_every != cloud_tick:
+                cloud_tick = tick // cloud_every
+                clouds.update(background, tick)
+            screen.blit(background, (0, 0))
+            screen.blit(loop.surface(loop_frame), (0, 0), special_flags=pygame.BLEND_RGB_ADD)
+            draw_info(tick, loop.sample(loop_frame))
+            pygame.display.flip()
+            loop_frame += 1
+            tick += 1
+            clock.tick(SIM_HZ)
+            # if live takes over again it restores the whole screen and has no backlog
+            prev_rects = [screen.get_rect()]
+            last_time = time.perf_counter()
+            continue
+
+        # fixed-timestep simulation: consume the elapsed wall time in whole steps
+        now = time.perf_counter()
+        acc += now - last_time
+        last_time = now
+        steps = 0
+        while acc >= sim_dt and steps < MAX_SIM_STEPS:
+            idx, ripples = sim_step(tick, idx, ripples)
+            tick += 1
+            acc -= sim_dt
+            steps += 1
+        if acc >= sim_dt:
+            # too far behind: skip the backlog rather than fall further behind
+            acc %= sim_dt
+        # draw in between the last two sim states
+        t = acc / sim_dt
+        for rp in ripples:
+            rp.interpolate(t)
+
+        # the cached background (fill + clouds) follows the clouds every few sim steps,
+        # only where their colour changed
+        cloud_rects = []
+        if tick // cloud_every != cloud_tick:
+            cloud_tick = tick // cloud_every
+            cloud_rects = clouds.update(background, tick)
+
+        # damage: where ripples were last frame, where they are now, the overlay and the clouds
+        rects = [r for r in map(ripple_rect, ripples) if r is not None]
+        dirty = prev_rects + rects + [overlay_rect] + cloud_rects
+        prev_rects = rects
+        for r in dirty:
+            screen.blit(background, r, r)
+
+        max_error_px = COARSE_ERROR_PX if budget.active('antialias') else lod.MAX_ERROR_PX
+        for rp in ripples:
+            draw_ripple(screen, rp, max_error_px)
+
+        draw_info(tick, idx)
+
+        pygame.display.update(dirty)
+
+        # work time of this frame, without the wait below
+        if budget.record(time.perf_counter() - frame_start):
+            # low detail clouds are rendered at half the resolution and refreshed half as often
+            scale = 8 if budget.active('clouds') else 4
+            if scale != clouds.scale:
+                # set_scale redraws the whole background on the next refresh
+                clouds.set_scale(scale)
+                cloud_tick = None
+        clock.tick(args.fps)
+
+    if feed is not None:
+        feed.stop()
+    if loop is not None:
+        loop.stop()
     pygame.quit()
 
 
@@ -0,0 +1,95 @@
+"""Cache of pre-decoded, pre-scaled background maps.
+
+`Kyoto_map.jpg` used to be decoded with `plt.imread` on every run and then
+resampled and alpha-blended by `imshow` on every frame. Here the map is
+decoded once, resampled to the exact canvas size in pixels and blended
+with its alpha (and optional dimming) over the colour it is drawn on. The
+result is stored as raw RGBA bytes keyed by the source file hash and the
+target size, and handed back as a read-only memmap, so renderers copy it
+straight in.
+
+The cache lives in $RAINFALL_CACHE or ~/.cache/visual_rainfall.
+"""
+import os
+import hashlib
+import numpy as np
+
+
+MAP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Kyoto_rain_art', 'Kyoto_map.jpg'))
+CACHE_DIR = os.environ.get('RAINFALL_CACHE', os.path.join(os.path.expanduser('~'), '.cache', 'visual_rainfall'))
+
+_hashes = {}
+
+
+def source_hash(path):
+    # memoized per (path, size, mtime) so repeated lookups in one process are free
+    st = os.stat(path)
+    key = (path, st.st_size, st.st_mtime_ns)
+    if key not in _hashes:
+        with open(path, 'rb') as f:
+            _hashes[key] = hashlib.sha1(f.read()).hexdigest()[:16]
+    return _hashes[key]
+
+
+def _resize_bilinear(img, height, width):
+    """Bilinear resample of an (h, w, c) float image (pixel-centre aligned)."""
+    h0, w0 = img.shape[:2]
+    ys = np.clip((np.arange(height) + 0.5) * h0 / height - 0.5, 0, h0 - 1)
+    xs = np.clip((np.arange(width) + 0.5) * w0 / width - 0.5, 0, w0 - 1)
+    y0 = np.floor(ys).astype(int)
+    x0 = np.floor(xs).astype(int)
+    y1 = np.minimum(y0 + 1, h0 - 1)
+    x1 = np.minimum(x0 + 1, w0 - 1)
+    wy = (ys - y0)[:, None, None]
+    wx = (xs - x0)[None, :, None]
+    top = img[y0][:, x0] * (1 - wx) + img[y0][:, x1] * wx
+    bottom = img[y1][:, x0] * (1 - wx) + img[y1][:, x1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def map_background(width, height, alpha=0.75, under=(1.0, 1.0, 1.0), dim=1.0, path=MAP_PATH):
+    """Opaque (height, width, 4) uint8 map blended over `under`, or None if missing."""
+    if not os.path.exists(path):
+        return None
+    width, height = int(width), int(height)
+    under_hex = ''.join(f'{int(round(c * 255)):02x}' for c in under[:3])
+    name = f'{source_hash(path)}_{width}x{height}_a{alpha:g}_d{dim:g}_{under_hex}.rgba'
+    cached = os.path.join(CACHE_DIR, name)
+    shape = (height, width, 4)
+    if os.path.exists(cached) and os.path.getsize(cached) == height * width * 4:
+        return np.memmap(cached, dtype=np.uint8, mode='r', shape=shape)
+
+    import matplotlib.pyplot as plt
+    img = plt.imread(path)
+    img = img[..., :3].astype(np.float32)
+    if img.max() > 1.0:
+        img /= 255.0
+    rgb = _resize_bilinear(img, height, width) * dim
+    rgb = alpha * rgb + (1.0 - alpha) * np.asarray(under[:3], dtype=np.float32)
+    out = np.empty(shape, dtype=np.uint8)
+    out[..., :3] = np.clip(np.round(rgb * 255), 0, 255)
+    out[..., 3] = 255
+
+    # write to a temp file and rename so concurrent renderers never see a partial file
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f'{cached}.{os.getpid()}.tmp'
+    out.tofile(tmp)
+    os.replace(tmp, cached)
+    return np.memmap(cached, dtype=np.uint8, mode='r', shape=shape)
+
+
+def axes_pixel_size(ax, dpi):
+    pos = ax.get_position()
+    w, h = ax.figure.get_size_inches() * dpi
+    return max(1, int(round(pos.width * w))), max(1, int(round(pos.height * h)))
+
+
+def add_map_background(ax, dpi, extent=(0, 1, 0, 1), alpha=0.75):
+    """Show the cached, pre-scaled map in `ax`; returns the image artist or None."""
+    from matplotlib.colors import to_rgb
+    width, height = axes_pixel_size(ax, dpi)
+    buf = map_background(width, height, alpha=alpha, under=to_rgb(ax.get_facecolor()))
+    if buf is None:
+        return None
+    # the buffer already matches the axes in pixels, so no resampling is needed
+    return ax.imshow(buf, extent=extent, aspect='auto', interpolation='none', zorder=0)
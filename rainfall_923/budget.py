@@ -0,0 +1,71 @@
+"""Frame-time budget controller shared by the interactive viewers.
+
+A heavy-rain stretch spawns more ripples than a slow machine can draw and
+the frame rate sags. `FrameBudget` watches the recent frame times (the work
+done per frame, not the time spent waiting for the next one) against a
+target budget and moves a single quality level:
+
+- over budget on average for a whole window: degrade one more step,
+- under `headroom` x budget for a whole window: restore one step.
+
+The steps are taken in a fixed order, cheapest loss of quality first:
+
+  'clouds'     lower cloud layer detail
+  'antialias'  coarser / aliased ring outlines
+  'ripples'    cap the number of live ripples drawn
+  'spawn'      thin out new spawns
+
+A viewer that has no use for a step (e.g. no cloud layer) passes its own
+`steps`; what each step means in practice is up to the viewer, which asks
+`budget.active('ripples')` etc. Only the standard library is used here so
+both the matplotlib and the pygame viewer can share it.
+"""
+from collections import deque
+
+
+STEPS = ('clouds', 'antialias', 'ripples', 'spawn')
+LABELS = {
+    'clouds': 'low cloud detail',
+    'antialias': 'aliased rings',
+    'ripples': 'ripple cap',
+    'spawn': 'sparse spawns',
+}
+
+
+class FrameBudget:
+    def __init__(self, budget, steps=STEPS, window=30, headroom=0.6):
+        """`budget` is the per-frame work time in seconds (e.g. 1 / target fps)."""
+        self.budget = float(budget)
+        self.steps = tuple(steps)
+        self.window = max(1, int(window))
+        self.headroom = headroom
+        self.level = 0
+        self.times = deque(maxlen=self.window)
+
+    def record(self, seconds):
+        """Add one frame's work time; returns True when the level changed."""
+        self.times.append(seconds)
+        if len(self.times) < self.window:
+            return False
+        avg = sum(self.times) / len(self.times)
+        if avg > self.budget and self.level < len(self.steps):
+            self.level += 1
+        elif avg < self.budget * self.headroom and self.level > 0:
+            self.level -= 1
+        else:
+            return False
+        # judge the new level on its own frames only
+        self.times.clear()
+        return True
+
+    def active(self, step):
+        """Whether the degradation `step` is currently applied."""
+        return step in self.steps[:self.level]
+
+    def average(self):
+        return sum(self.times) / len(self.times) if self.times else 0.0
+
+    def label(self):
+        if self.level == 0:
+            return 'full'
+        return f'-{self.level} ({LABELS[self.steps[self.level - 1]]})'
@@ -0,0 +1,92 @@
+"""Procedural animated cloud layer (NumPy port of background-canvas.js).
+
+The JS background drifts soft blobs over a cheap value-noise field. Here
+the same idea is vectorized: a tileable multi-octave value-noise texture is
+built once, and every frame two copies of it are sampled at drifting
+offsets (bilinear, wrapping) and lerped together. The per-frame cost is a
+handful of array gathers over the layer's pixels, independent of how many
+"clouds" are visible, instead of one patch or surface blit per cloud.
+
+The layer is meant to be generated at a low resolution and scaled up by
+the renderer (imshow bilinear / pygame smoothscale); clouds are blurry
+anyway.
+"""
+import numpy as np
+
+
+def _fade(t):
+    # same smoothstep as the JS `fade`
+    return t * t * (3 - 2 * t)
+
+
+def tileable_noise(height, width, cells=4, octaves=3, seed=1337):
+    """Multi-octave value noise in 0..1 that wraps seamlessly on both axes."""
+    rng = np.random.RandomState(seed)
+    out = np.zeros((height, width), dtype=np.float32)
+    amp = 1.0
+    total = 0.0
+    for o in range(octaves):
+        c = cells * 2 ** o
+        lattice = rng.rand(c, c).astype(np.float32)
+        ys = np.arange(height) * c / height
+        xs = np.arange(width) * c / width
+        y0 = np.floor(ys).astype(int)
+        x0 = np.floor(xs).astype(int)
+        fy = _fade(ys - y0).astype(np.float32)[:, None]
+        fx = _fade(xs - x0).astype(np.float32)[None, :]
+        y1 = (y0 + 1) % c
+        x1 = (x0 + 1) % c
+        top = lattice[y0][:, x0] * (1 - fx) + lattice[y0][:, x1] * fx
+        bottom = lattice[y1][:, x0] * (1 - fx) + lattice[y1][:, x1] * fx
+        out += amp * (top * (1 - fy) + bottom * fy)
+        total += amp
+        amp *= 0.5
+    return out / total
+
+
+class NoiseClouds:
+    """Animated cloud density field of shape (height, width)."""
+
+    def __init__(self, width, height, seed=1337, cells=4, octaves=3,
+                 drift=((0.35, 0.12), (-0.2, 0.27)), morph_period=400.0, coverage=0.45):
+        self.width = int(width)
+        self.height = int(height)
+        # two independent textures drifting at different speeds (like the JS layers)
+        self.textures = [tileable_noise(self.height, self.width, cells, octaves, seed + i) for i in range(2)]
+        self.drift = drift
+        self.morph_period = float(morph_period)
+        self.coverage = float(coverage)
+        self._ys = np.arange(self.height)
+        self._xs = np.arange(self.width)
+
+    def _sample(self, tex, ox, oy):
+        # bilinear sample of the wrapped texture shifted by (ox, oy) pixels
+        ix, fx = int(np.floor(ox)), ox - np.floor(ox)
+        iy, fy = int(np.floor(oy)), oy - np.floor(oy)
+        x0 = (self._xs + ix) % self.width
+        x1 = (x0 + 1) % self.width
+        y0 = (self._ys + iy) % self.height
+        y1 = (y0 + 1) % self.height
+        rows0 = tex[y0]
+        rows1 = tex[y1]
+        top = rows0[:, x0] * (1 - fx) + rows0[:, x1] * fx
+        bottom = rows1[:, x0] * (1 - fx) + rows1[:, x1] * fx
+        return top * (1 - fy) + bottom * fy
+
+    def density(self, t):
+        """Cloud density in 0..1 at frame `t` (float frames are fine)."""
+        (ax, ay), (bx, by) = self.drift
+        a = self._sample(self.textures[0], t * ax, t * ay)
+        b = self._sample(self.textures[1], t * bx, t * by)
+        w = 0.5 + 0.5 * np.sin(2 * np.pi * t / self.morph_period)
+        field = a * (1 - w) + b * w
+        # keep only the upper part of the noise so the sky has gaps between clouds
+        lo = 1.0 - self.coverage
+        return _fade(np.clip((field - lo) / (1.0 - lo), 0.0, 1.0))
+
+    def rgba(self, t, color=(1.0, 1.0, 1.0), max_alpha=0.3):
+        """(height, width, 4) float32 layer for imshow-style compositing."""
+        out = np.empty((self.height, self.width, 4), dtype=np.float32)
+        out[..., :3] = color
+        out[..., 3] = self.density(t) * max_alpha
+        return out
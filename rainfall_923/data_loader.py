@@ -0,0 +1,125 @@
+"""Open the viewers before the CSV is parsed.
+
+Importing pandas and parsing a large export takes seconds, and the viewers
+used to show nothing until both were done. Instead:
+
+- `read_head` parses only the first `PREVIEW_ROWS` rows of the main CSV
+  section with a plain line split like tail_reader.py (no pandas), which
+  is enough to animate for a while,
+- `BackgroundLoad` runs the full loader on a daemon thread; the render loop
+  polls `take()` once per frame and swaps the data in between two frames,
+  so a frame never sees half of each.
+
+The preview is the head of the same series, so a simulation that has not
+consumed more than the preview's samples continues exactly as if it had
+started on the full data (see RippleSimulation.set_data).
+
+  loading = BackgroundLoad(load_data, path, COLUMNS)
+  data = loading.preview or loading.wait()
+  ...
+  full = loading.take()   # once per frame; None until ready
+"""
+import itertools
+import threading
+
+import numpy as np
+
+from weather import WeatherSeries, KEYS
+
+
+# 5000 samples: over a minute of playback in the pygame viewer, several in matplotlib
+PREVIEW_ROWS = 5000
+# lines searched for section headers, like main.load_data
+HEADER_SCAN = 200
+
+
+def main_header(lines):
+    """Index of the main header line: 0 for a plain CSV, else the 'time' header with the most columns."""
+    if all(ln.strip() for ln in lines):
+        return 0
+    timed = [(i, len(ln.split(','))) for i, ln in enumerate(lines) if ln.lower().startswith('time,')]
+    # first of the widest, the same pick as load_data's fallback
+    return max(timed, key=lambda t: t[1])[0] if timed else 0
+
+
+def header_row(path, scan=HEADER_SCAN):
+    """`main_header` of a file, for pd.read_csv(skiprows=...)."""
+    with open(path, encoding='utf-8') as f:
+        return main_header(list(itertools.islice(f, scan)))
+
+
+def _number(field):
+    try:
+        return float(field)
+    except ValueError:
+        # blanks and text become NaN, as pd.to_numeric(errors='coerce') does
+        return np.nan
+
+
+def read_head(path, candidates, rows=PREVIEW_ROWS):
+    """WeatherSeries of the first `rows` rows of the main section, or None if there are none."""
+    start = header_row(path)
+    with open(path, encoding='utf-8') as f:
+        lines = itertools.islice(f, start, start + rows + 1)
+        header = [h.strip().lower() for h in next(lines, '').split(',')]
+        table = []
+        for ln in lines:
+            if not ln.strip():
+                break  # end of the section
+            fields = ln.rstrip('\n').split(',')
+            if len(fields) == len(header):
+                table.append(fields)
+    if not table:
+        return None
+    columns = {}
+    for key, names in candidates.items():
+        # first candidate wins, then first column, like WeatherSeries.from_frame
+        i = next((i for cand in names for i, h in enumerate(header) if cand in h), None)
+        if i is not None:
+            columns[key] = np.array([_number(row[i]) for row in table])
+    return WeatherSeries(**{k: columns.get(k, np.zeros(len(table))) for k in KEYS})
+
+
+def matching_samples(a, b):
+    """How many leading samples `a` and `b` share in every column."""
+    n = min(len(a['rain']), len(b['rain']))
+    same = np.ones(n, dtype=bool)
+    for key in KEYS:
+        same &= np.asarray(a[key][:n]) == np.asarray(b[key][:n])
+    return n if same.all() else int(np.argmin(same))
+
+
+class BackgroundLoad:
+    """`load(path)` on a daemon thread, with a pandas-free preview available right away."""
+
+    def __init__(self, load, path, candidates, rows=PREVIEW_ROWS):
+        self.path = path
+        try:
+            self.preview = read_head(path, candidates, rows)
+        except (OSError, UnicodeDecodeError):
+            self.preview = None
+        self._load = load
+        self._result = None
+        self._taken = False
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='data-loader', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            self._result = self._load(self.path)
+        finally:
+            # set after the result, so a reader that sees `done` sees the whole result
+            self._done.set()
+
+    def take(self):
+        """The full data the first time it is called after loading finished, else None."""
+        if self._taken or not self._done.is_set():
+            return None
+        self._taken = True
+        return self._result
+
+    def wait(self, timeout=None):
+        """Block until loaded and take the result (for callers without a preview)."""
+        self._done.wait(timeout)
+        return self.take()
@@ -1,19 +1,129 @@
-"""Encode PNG frames in frames/ to an MP4 using imageio[ffmpeg]."""
+"""Encode the frames in frames.rfs (or a directory of PNGs) to an MP4 using imageio[ffmpeg].
+
+One libx264 stream runs on one process, so long clips are encoder-bound on
+machines with many idle cores. With `--segments N` the frame list is cut
+into N segments whose lengths are whole GOPs (`--gop` frames, every
+segment starting on a keyframe), the segments are encoded concurrently by
+N ffmpeg processes with identical settings and fixed keyframe spacing, and
+the pieces are joined with ffmpeg's concat demuxer (`-c copy`, no
+re-encode). The result has the same GOP structure as a single-stream
+encode.
+"""
 import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
 import imageio
 
+from frame_store import FrameStore, EXT as STORE_EXT
+
 FRAMES_DIR = os.path.join(os.path.dirname(__file__), 'frames')
+FRAMES_STORE = FRAMES_DIR + STORE_EXT
 OUT_MP4 = os.path.join(os.path.dirname(__file__), 'rainfall_animation.mp4')
+FPS = 20
+# 2 s at 20 fps; segments are cut on multiples of this
+GOP = 40
+
+
+def list_frames(frames_dir=FRAMES_DIR):
+    return sorted([os.path.join(frames_dir, f) for f in os.listdir(frames_dir) if f.endswith('.png')])
+
+
+def gop_params(gop):
+    # a keyframe exactly every `gop` frames and nowhere else, so segments line up
+    return ['-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0']
+
+
+def encode(frames, out=OUT_MP4, fps=FPS, gop=GOP, start=0, stop=None):
+    """Single-stream encode of frames[start:stop] (PNG paths or a FrameStore) into `out`."""
+    stop = len(frames) if stop is None else stop
+    with imageio.get_writer(out, fps=fps, codec='libx264', ffmpeg_params=gop_params(gop)) as writer:
+        for i in range(start, stop):
+            f = frames[i]
+            writer.append_data(imageio.imread(f) if isinstance(f, str) else f)
+    return out
+
+
+def split_segments(n_frames, segments, gop=GOP):
+    """[(start, stop)] frame ranges, each a whole number of GOPs except possibly the last."""
+    gops = -(-n_frames // gop)
+    k = max(1, min(segments, gops))
+    # GOPs spread as evenly as possible over the segments
+    cuts = [gops * i // k * gop for i in range(k + 1)]
+    return [(a, min(n_frames, b)) for a, b in zip(cuts, cuts[1:]) if a < n_frames]
+
+
+def ffmpeg_exe():
+    """The ffmpeg imageio uses (imageio-ffmpeg's bundled binary), else the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        return shutil.which('ffmpeg') or 'ffmpeg'
+
+
+def concat(parts, out):
+    """Join already-encoded segments with the concat demuxer, copying the streams."""
+    with tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False) as f:
+        for p in parts:
+            # concat list quoting: single quotes, embedded ones escaped
+            f.write("file '{}'\n".format(os.path.abspath(p).replace("'", "'\\''")))
+        listing = f.name
+    try:
+        subprocess.run([ffmpeg_exe(), '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', listing, '-c', 'copy', '-movflags', '+faststart', out], check=True)
+    finally:
+        os.unlink(listing)
+    return out
+
+
+def encode_segmented(frames, out=OUT_MP4, fps=FPS, segments=None, gop=GOP):
+    """Encode GOP-aligned segments on `segments` processes, then concat them without re-encoding."""
+    segments = segments or os.cpu_count() or 1
+    ranges = split_segments(len(frames), segments, gop)
+    tmp = tempfile.mkdtemp(prefix='segments_', dir=os.path.dirname(os.path.abspath(out)))
+    parts = [os.path.join(tmp, f'part_{i:03d}.mp4') for i in range(len(ranges))]
+    try:
+        with ProcessPoolExecutor(len(ranges)) as pool:
+            # list() waits for every segment and re-raises encoder errors
+            # a FrameStore pickles as its path, each worker maps the file itself
+            list(pool.map(encode, [frames] * len(parts), parts, [fps] * len(parts), [gop] * len(parts),
+                          [a for a, _ in ranges], [b for _, b in ranges]))
+        return concat(parts, out)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
 
-pngs = sorted([os.path.join(FRAMES_DIR, f) for f in os.listdir(FRAMES_DIR) if f.endswith('.png')])
-if not pngs:
-    print('No PNG frames found in', FRAMES_DIR)
-    raise SystemExit(1)
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Encode exported frames to an MP4')
+    parser.add_argument('--store', default=FRAMES_STORE, help='frame_store file to read (default: frames.rfs)')
+    parser.add_argument('--frames-dir', default=None, help='Read a directory of frame PNGs instead of the store')
+    parser.add_argument('--out', default=OUT_MP4)
+    parser.add_argument('--fps', type=float, default=None, help=f'Default: the store\'s fps, else {FPS}')
+    parser.add_argument('--segments', type=int, default=1,
+                        help='Encode N GOP-aligned segments in parallel and concat them (0 = one per core)')
+    parser.add_argument('--gop', type=int, default=GOP, help='Keyframe interval in frames; segments are cut on it')
+    args = parser.parse_args()
 
-print('Writing', OUT_MP4, 'from', len(pngs), 'frames')
-with imageio.get_writer(OUT_MP4, fps=20, codec='libx264') as writer:
-    for p in pngs:
-        img = imageio.imread(p)
-        writer.append_data(img)
+    if args.frames_dir:
+        frames = list_frames(args.frames_dir)
+        fps = args.fps or FPS
+    elif os.path.exists(args.store):
+        frames = FrameStore(args.store)
+        fps = args.fps or frames.fps
+    else:
+        print('No frame store at', args.store, '(export one with export_frames.py)')
+        raise SystemExit(1)
+    if not len(frames):
+        print('No frames found in', args.frames_dir or args.store)
+        raise SystemExit(1)
 
-print('Wrote', OUT_MP4)
+    print('Writing', args.out, 'from', len(frames), 'frames')
+    if args.segments == 1:
+        encode(frames, args.out, fps, args.gop)
+    else:
+        encode_segmented(frames, args.out, fps, args.segments or None, args.gop)
+    print('Wrote', args.out)
@@ -2,28 +2,49 @@ import os
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
-from matplotlib.patches import Circle
 import numpy as np
 
 # reuse helpers from main.py in the same directory
 import main as m
+import assets
+import lod
+from raster import RasterCompositor
+from frame_store import FrameWriter, EXT as STORE_EXT
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'frames')
+DRAFT_OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'frames_draft')
+OUTPUT_STORE = OUTPUT_DIR + STORE_EXT
+DRAFT_OUTPUT_STORE = DRAFT_OUTPUT_DIR + STORE_EXT
 
 
-def save_frames(n_frames=200, fps=20, dpi=150):
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+def output_paths(draft=False, out_dir=None, store=None, png=False):
+    """(out_dir, store): frames go into one frame_store file unless PNGs are asked for."""
+    if png:
+        out_dir = out_dir or (DRAFT_OUTPUT_DIR if draft else OUTPUT_DIR)
+        os.makedirs(out_dir, exist_ok=True)
+        return out_dir, None
+    return out_dir, store or (DRAFT_OUTPUT_STORE if draft else OUTPUT_STORE)
+
+
+def save_frames(n_frames=200, fps=20, dpi=None, draft=False, out_dir=None, start_frame=0, raster=False, threads=None,
+                store=None, png=False):
+    """Frames into a frame_store file (`store`, default frames.rfs), or with `png` into `out_dir`.
+
+    Returns the path written.
+    """
+    if raster:
+        return save_frames_raster(n_frames, dpi, draft, out_dir, start_frame, threads, store, png)
+    # final exports always use the full-quality preset unless draft is asked for
+    quality = m.render_quality(draft=draft, dpi=dpi)
+    stride = quality['stride']
+    out_dir, store = output_paths(draft, out_dir, store, png)
     data = m.load_data(m.CSV_CANDIDATE)
-    n = len(data['rain'])
 
     fig, ax = plt.subplots(figsize=(10, 7))
     # use same background logic as main
     try:
-        kyoto_img_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Kyoto_rain_art', 'Kyoto_map.jpg'))
-        if os.path.exists(kyoto_img_path):
-            img = plt.imread(kyoto_img_path)
-            ax.imshow(img, extent=(0,1,0,1), aspect='auto', interpolation='bilinear', zorder=0, alpha=0.75)
-        else:
+        background = assets.add_map_background(ax, quality['dpi']) if quality['background'] else None
+        if background is None:
             ax.set_facecolor('#000000')
     except Exception:
         ax.set_facecolor('#000000')
@@ -31,75 +52,91 @@ def save_frames(n_frames=200, fps=20, dpi=150):
     ax.set_xlim(0,1); ax.set_ylim(0,1)
     ax.set_xticks([]); ax.set_yticks([])
 
-    # grid spawn positions (match main.py)
-    MARGIN = 0.06
-    span = 1.0 - 2 * MARGIN
-    max_area_frac = 1.0 / 20.0
-    max_r = float(np.sqrt(max_area_frac / np.pi))
-    min_spacing = 2.0 * max_r
-    max_cols = max(1, int(np.floor(span / min_spacing)) + 1)
-    max_rows = max(1, int(np.floor(span / min_spacing)) + 1)
-    GRID_COLS = min(8, max_cols)
-    GRID_ROWS = min(6, max_rows)
-    xs = np.linspace(MARGIN, 1 - MARGIN, GRID_COLS)
-    ys = np.linspace(MARGIN, 1 - MARGIN, GRID_ROWS)
-    grid_positions = [(x, y) for y in ys for x in xs]
-    spawn_i = 0
-
-    ripples = []
-    artists = []
-
-    def spawn(idx):
-        nonlocal spawn_i
-        rain = float(data['rain'][idx % n])
-        wind = float(data['wind_dir'][idx % n])
-        ang = np.deg2rad(wind)
-        pos = grid_positions[spawn_i % len(grid_positions)]
-        spawn_i += 1
-        jitter = 0.03
-        x = pos[0] + (np.random.rand() - 0.5) * jitter
-        y = pos[1] + (np.random.rand() - 0.5) * jitter
-        offx = 0.02 * np.cos(ang)
-        offy = 0.02 * np.sin(ang)
-        x += offx; y += offy
-        x = float(np.clip(x, 0.02, 0.98))
-        y = float(np.clip(y, 0.02, 0.98))
-        col = m.color_from_rain(rain)
-        r = m.Ripple(x, y, col, r0=0.02, max_r=max_r)
-        from matplotlib.colors import to_rgba
-        rgba = to_rgba(r.color, r.alpha)
-        c = Circle((r.x, r.y), r.r, fill=False, edgecolor=rgba, linewidth=2.5, zorder=2)
-        ax.add_patch(c)
-        ripples.append(r); artists.append(c)
-
-    frame_idx = 0
-    for frame in range(n_frames):
-        if frame % 5 == 0:
-            for _ in range(6):
-                spawn(frame_idx)
-                frame_idx += 1
-
-        # step and update artists
-        to_remove = []
-        for rp, art in zip(ripples[:], artists[:]):
-            alive = rp.step()
-            art.set_radius(rp.r)
-            from matplotlib.colors import to_rgba
-            art.set_edgecolor(to_rgba(rp.color, max(0.0, rp.alpha)))
-            if not alive:
-                to_remove.append((rp, art))
-
-        for rp, art in to_remove:
-            try:
-                ripples.remove(rp); artists.remove(art); art.remove()
-            except ValueError:
-                pass
-
-        out_path = os.path.join(OUTPUT_DIR, f'frame_{frame:04d}.png')
-        fig.savefig(out_path, dpi=dpi)
+    # ripple state comes from the shared seekable simulation (same as main.py)
+    sim = m.RippleSimulation(data)
+    sim.seek(start_frame)
+    # the canvas is drawn at the export dpi; only damaged pixels are redrawn per frame
+    fig.set_dpi(quality['dpi'])
+    layer = m.RippleLayer(ax, quality)
+    redraw = m.DamageRedraw(fig, layer)
+    writer = None
+    if store:
+        w, h = fig.canvas.get_width_height()
+        writer = FrameWriter(store, w, h, fps=fps / stride)
+
+    written = 0
+    for frame in range(start_frame, start_frame + n_frames):
+        sim.step()
+        # the simulation runs every frame; only every stride-th one is rendered
+        if frame % stride:
+            continue
+        buf = redraw.draw(sim)
+        if writer is not None:
+            writer.append(buf, frame)
+        else:
+            plt.imsave(os.path.join(out_dir, f'frame_{frame:04d}.png'), buf)
+        written += 1
     plt.close(fig)
-    print(f'Wrote {n_frames} frames to {OUTPUT_DIR}')
+    if writer is not None:
+        writer.close()
+    print(f'Wrote {written} frames to {store or out_dir}')
+    return store or out_dir
+
+
+def save_frames_raster(n_frames=200, dpi=None, draft=False, out_dir=None, start_frame=0, threads=None, store=None,
+                       png=False):
+    """Full-bleed frames from raster.RasterCompositor, redrawing only damaged tiles."""
+    quality = m.render_quality(draft=draft, dpi=dpi)
+    stride = quality['stride']
+    out_dir, store = output_paths(draft, out_dir, store, png)
+    data = m.load_data(m.CSV_CANDIDATE)
+
+    width, height = int(10 * quality['dpi']), int(7 * quality['dpi'])
+    background = assets.map_background(width, height) if quality['background'] else None
+    if background is None:
+        background = np.zeros((height, width, 3), dtype=np.uint8)
+    # linewidths are in points like matplotlib's
+    comp = RasterCompositor(background, linewidth=quality['linewidth'] * quality['dpi'] / 72.0,
+                            antialiased=quality['antialiased'], threads=threads)
+
+    sim = m.RippleSimulation(data)
+    sim.seek(start_frame)
+    writer = FrameWriter(store, width, height, fps=20 / stride) if store else None
+    written = 0
+    for frame in range(start_frame, start_frame + n_frames):
+        sim.step()
+        if frame % stride:
+            continue
+        rgba = sim.rgba()
+        draw = lod.classify(sim.r * width, rgba[:, 3]) != lod.SKIP
+        comp.render(sim.x[draw] * width, (1 - sim.y[draw]) * height, sim.r[draw] * width, sim.r[draw] * height, rgba[draw])
+        if writer is not None:
+            writer.append(comp.frame, frame)
+        else:
+            # zlib level 1: at this size PNG deflate, not compositing, dominates the frame time
+            plt.imsave(os.path.join(out_dir, f'frame_{frame:04d}.png'), comp.frame, pil_kwargs={'compress_level': 1})
+        written += 1
+    comp.close()
+    if writer is not None:
+        writer.close()
+    print(f'Wrote {written} frames to {store or out_dir}')
+    return store or out_dir
 
 
 if __name__ == '__main__':
-    save_frames()
+    import argparse
+    parser = argparse.ArgumentParser(description='Export ripple animation frames into a frame store')
+    parser.add_argument('--frames', type=int, default=200, help='Number of simulation frames')
+    parser.add_argument('--start', type=int, default=0, help='First simulation frame to export')
+    parser.add_argument('--draft', action='store_true', help='Fast low-resolution preview into frames_draft.rfs')
+    parser.add_argument('--raster', action='store_true',
+                        help='NumPy compositor that only redraws damaged regions (no matplotlib figure)')
+    parser.add_argument('--threads', type=int, default=None, help='Composite --raster frames tile-parallel on N threads')
+    parser.add_argument('--store', metavar='PATH', default=None,
+                        help='frame_store file to write (default: frames.rfs, frames_draft.rfs with --draft)')
+    parser.add_argument('--png', action='store_true', help='Write a directory of frame_####.png instead of a store')
+    args = parser.parse_args()
+    if args.png and args.store:
+        parser.error('--store and --png are alternative outputs; pick one')
+    save_frames(n_frames=args.frames, draft=args.draft, start_frame=args.start, raster=args.raster, threads=args.threads,
+                store=args.store, png=args.png)
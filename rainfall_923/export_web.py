@@ -0,0 +1,101 @@
+"""Export the simulated ripples as compact binary chunks for the web canvas.
+
+Instead of shipping an MP4, the per-frame ripple arrays from the seekable
+simulation are quantized and written as typed-array chunks next to a small
+JSON index, which `background/ripple-player.js` streams and draws at the
+display refresh rate.
+
+Chunk layout (little endian, every section starts on an even byte):
+  counts  Uint16[frames]   live ripples per frame
+  x, y, r Float16[total]   axis-fraction position and radius, frame-major
+  alpha   Uint8[total]     alpha * 255
+  color   Uint8[total]     index into the 256-entry palette in index.json
+
+Run with:
+  python export_web.py --frames 2000
+"""
+import os
+import json
+import argparse
+import numpy as np
+
+import main as m
+from simulation import RippleSimulation, rain_colors
+
+
+OUT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'background', 'ripples'))
+FORMAT_VERSION = 1
+PALETTE_MM = 30.0  # rainfall mapped onto the 256-entry palette (matches rain_colors)
+
+
+def _section(buf, arr):
+    # keep 16-bit views aligned in the browser
+    if len(buf) % 2:
+        buf.extend(b'\0')
+    offset = len(buf)
+    buf.extend(np.ascontiguousarray(arr).astype(arr.dtype.newbyteorder('<')).tobytes())
+    return offset
+
+
+def encode_chunk(frames):
+    """Pack a list of (x, y, r, alpha, rain) frame tuples into one chunk."""
+    counts = np.array([len(f[0]) for f in frames], dtype=np.uint16)
+    cat = [np.concatenate([f[k] for f in frames]) if frames else np.zeros(0) for k in range(5)]
+    x, y, r, alpha, rain = cat
+    color = np.clip(np.round(rain / PALETTE_MM * 255), 0, 255).astype(np.uint8)
+    buf = bytearray()
+    offsets = {
+        'counts': _section(buf, counts),
+        'x': _section(buf, x.astype(np.float16)),
+        'y': _section(buf, y.astype(np.float16)),
+        'r': _section(buf, r.astype(np.float16)),
+        'alpha': _section(buf, np.clip(np.round(alpha * 255), 0, 255).astype(np.uint8)),
+        'color': _section(buf, color),
+    }
+    return bytes(buf), offsets, int(counts.sum())
+
+
+def export(csv_path=None, n_frames=2000, chunk_frames=200, fps=20, out_dir=OUT_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    data = m.load_data(csv_path or m.CSV_CANDIDATE)
+    sim = RippleSimulation(data)
+
+    palette = np.round(rain_colors(np.linspace(0, PALETTE_MM, 256)) * 255).astype(int)
+    index = {
+        'version': FORMAT_VERSION,
+        'fps': fps,
+        'frames': n_frames,
+        'chunkFrames': chunk_frames,
+        'palette': palette.tolist(),
+        'chunks': [],
+    }
+
+    total_bytes = 0
+    for start in range(0, n_frames, chunk_frames):
+        frames = []
+        for _ in range(min(chunk_frames, n_frames - start)):
+            sim.step()
+            # step() grows r/alpha in place, so the arrays are only valid until the next step
+            frames.append((sim.x.copy(), sim.y.copy(), sim.r.copy(), sim.alpha.copy(), sim.rain.copy()))
+        blob, offsets, ripples = encode_chunk(frames)
+        name = f'chunk_{start // chunk_frames:04d}.bin'
+        with open(os.path.join(out_dir, name), 'wb') as f:
+            f.write(blob)
+        total_bytes += len(blob)
+        index['chunks'].append({'file': name, 'start': start, 'frames': len(frames),
+                                'ripples': ripples, 'bytes': len(blob), 'offsets': offsets})
+
+    with open(os.path.join(out_dir, 'index.json'), 'w') as f:
+        json.dump(index, f, separators=(',', ':'))
+    print(f'Wrote {len(index["chunks"])} chunks ({total_bytes / 1024:.1f} KiB) for {n_frames} frames to {out_dir}')
+    return index
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export ripple data for background/ripple-player.js')
+    parser.add_argument('--csv', default=None, help='Weather CSV (defaults to main.CSV_CANDIDATE)')
+    parser.add_argument('--frames', type=int, default=2000, help='Number of simulation frames')
+    parser.add_argument('--chunk', type=int, default=200, help='Frames per binary chunk')
+    parser.add_argument('--out', default=OUT_DIR, help='Output directory')
+    args = parser.parse_args()
+    export(args.csv, n_frames=args.frames, chunk_frames=args.chunk, out_dir=args.out)
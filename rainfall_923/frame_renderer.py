@@ -1,20 +1,28 @@
-"""Render the ripple animation to PNG frames (headless).
+"""Render the ripple animation to frames (headless).
 
-This recreates the logic from Kyoto_rain_art/main.py and writes frames to
-rainfall_chart/frames/frame_####.png which you can assemble into a video.
+This recreates the logic from Kyoto_rain_art/main.py and writes the frames
+into one frame_store file (frames.rfs, see frame_store.py), or with `--png`
+to rainfall_chart/frames/frame_####.png, which you can assemble into a video.
 """
 import os
 import math
-import textwrap
 import numpy as np
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import pandas as pd
+from matplotlib.collections import LineCollection
+
+# reuse the render quality presets from main.py in the same directory
+import main as m
+import assets
+import lod
+from clouds import NoiseClouds
+from overlay import OverlayCompositor
+from frame_store import FrameWriter, EXT as STORE_EXT
 
 
 OUT_DIR = os.path.join(os.path.dirname(__file__), 'frames')
-os.makedirs(OUT_DIR, exist_ok=True)
 
 
 def load_data(csv_path=None):
@@ -49,7 +57,16 @@ def load_data(csv_path=None):
                 temperature=rng.normal(15, 5, frames))
 
 
-def render_frames(csv_path=None, max_frames=None):
+def render_frames(csv_path=None, max_frames=None, draft=False, out_dir=None, store=None, png=False):
+    quality = m.render_quality(draft=draft)
+    stride = quality['stride']
+    out_dir = out_dir or (OUT_DIR + '_draft' if draft else OUT_DIR)
+    if png:
+        os.makedirs(out_dir, exist_ok=True)
+        store = None
+    else:
+        store = store or out_dir + STORE_EXT
+
     data = load_data(csv_path)
     frames = data['frames']
     rainfall = data['rainfall']
@@ -69,30 +86,37 @@ def render_frames(csv_path=None, max_frames=None):
     KYOTO_LAT = 35.0116
     KYOTO_LON = 135.7681
 
-    fig, ax = plt.subplots(figsize=(8, 8))
+    # the figure is drawn at the export dpi so the overlay can be blitted into its pixel buffer
+    fig, ax = plt.subplots(figsize=(8, 8), dpi=quality['dpi'])
     ax.set_xlim(0, 200)
     ax.set_ylim(0, 200)
     ax.set_xticks([])
     ax.set_yticks([])
     ax.set_facecolor('black')
 
-    # optional background map if available
-    kyoto_img = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Kyoto_rain_art', 'Kyoto_map.jpg'))
-    if os.path.exists(kyoto_img):
-        img = plt.imread(kyoto_img)
-        ax.imshow(img, extent=(0, 200, 0, 200), aspect='auto', zorder=0, alpha=0.75)
+    # optional background map if available (pre-scaled and blended over black by the asset cache)
+    if quality['background']:
+        assets.add_map_background(ax, quality['dpi'], extent=(0, 200, 0, 200))
 
-    rng = np.random.default_rng(1)
-    for _ in range(30):
-        cx = rng.uniform(20, 180)
-        cy = rng.uniform(20, 180)
-        cr = rng.uniform(10, 30)
-        cloud = plt.Circle((cx, cy), cr, color='white', alpha=rng.uniform(0.10, 0.30), lw=0, fill=True, zorder=0.5)
-        ax.add_patch(cloud)
+    # frames go into one frame_store file unless PNGs are asked for
+    writer = None
+    if store:
+        w, h = fig.canvas.get_width_height()
+        writer = FrameWriter(store, w, h, fps=20 / stride)
 
-    info_text = ax.text(1.0, 0.02, '', color='white', fontsize=12,
-                        ha='right', va='bottom', transform=ax.transAxes,
-                        bbox=dict(facecolor='black', boxstyle='round,pad=0.5', alpha=0.5), zorder=3)
+    rng = np.random.default_rng(1)
+    # animated noise clouds: a low-res field sampled per frame, upscaled by imshow
+    clouds = NoiseClouds(100, 100) if quality['clouds'] else None
+    cloud_layer = None
+    if clouds is not None:
+        cloud_layer = ax.imshow(clouds.rgba(0), extent=(0, 200, 0, 200), aspect='auto',
+                                interpolation='bilinear', zorder=0.5)
+
+    # info box: labels and a digit atlas are rasterized once, only the numbers change per frame
+    overlay = OverlayCompositor([f'Kyoto ({KYOTO_LAT}, {KYOTO_LON})',
+                                 'Rainfall: {rain:.1f} mm',
+                                 'Humidity: {rh:.1f}%',
+                                 'Temp: {temp:.1f}°C'], fontsize=12, dpi=quality['dpi'], box=(0, 0, 0, 0.5))
 
     # create a grid of spawn positions across the 0..200 coordinate space
     GRID_ROWS = 6
@@ -104,7 +128,11 @@ def render_frames(csv_path=None, max_frames=None):
     spawn_counter = {'c': 0}
 
     ripples = []
-    ripple_artists = []
+    # all rings share one collection; geometry detail follows the pixel radius (lod.py)
+    ring_layer = LineCollection([], linewidths=2, antialiaseds=quality['antialiased'], zorder=2)
+    ax.add_collection(ring_layer, autolim=False)
+    point_layer = ax.scatter([], [], s=4, linewidths=0, zorder=2)
+    px_per_unit = ax.get_position().width * fig.get_size_inches()[0] * quality['dpi'] / 200.0
 
     def spawn_ripple(frame_idx):
         rain = float(rainfall[frame_idx % frames])
@@ -124,10 +152,7 @@ def render_frames(csv_path=None, max_frames=None):
         color_val = min(1.0, rain / 30.0)
         color = plt.cm.rainbow(color_val)
         new_ripple = {'x': x, 'y': y, 'radius': 0.0, 'alpha': 1.0, 'color': color, 'angle': wind_angle}
-        artist = plt.Circle((x, y), 0.0, edgecolor=color, facecolor='none', alpha=1.0, lw=2, zorder=2)
         ripples.append(new_ripple)
-        ripple_artists.append(artist)
-        ax.add_patch(artist)
 
     for frame_idx in range(max_frames):
         # spawn
@@ -142,35 +167,60 @@ def render_frames(csv_path=None, max_frames=None):
             r['x'] += move_dist * math.cos(r['angle'])
             r['y'] += move_dist * math.sin(r['angle'])
 
-            if i < len(ripple_artists):
-                art = ripple_artists[i]
-                art.center = (r['x'], r['y'])
-                art.set_radius(r['radius'])
-                art.set_alpha(max(0.0, min(1.0, r['alpha'])))
-                color_val = min(1.0, float(rainfall[frame_idx % frames]) / 30.0)
-                art.set_edgecolor(plt.cm.rainbow(color_val))
-
         remove_indices = [i for i, r in enumerate(ripples) if r['alpha'] <= 0.0 or r['radius'] > MAX_RADIUS]
         for idx in sorted(remove_indices, reverse=True):
-            if idx < len(ripple_artists):
-                ripple_artists[idx].remove()
             ripples.pop(idx)
-            ripple_artists.pop(idx)
-
-        info_text.set_text(textwrap.dedent(f"""
-            Kyoto (35.0116, 135.7681)
-            Rainfall: {rainfall[frame_idx % frames]:.1f} mm
-            Humidity: {humidity[frame_idx % frames]:.1f}%
-            Temp: {temperature[frame_idx % frames]:.1f}°C
-        """))
-
-        # render to file
-        out_path = os.path.join(OUT_DIR, f'frame_{frame_idx:04d}.png')
-        fig.savefig(out_path, dpi=150)
+
+        # the simulation above runs every frame; only every stride-th one is rendered
+        if frame_idx % stride:
+            continue
+
+        if cloud_layer is not None:
+            cloud_layer.set_data(clouds.rgba(frame_idx))
+
+        # every live ripple takes the colour of the current rainfall sample
+        xs_ = np.array([r['x'] for r in ripples])
+        ys_ = np.array([r['y'] for r in ripples])
+        radii = np.array([r['radius'] for r in ripples])
+        rgba = np.tile(plt.cm.rainbow(min(1.0, float(rainfall[frame_idx % frames]) / 30.0)), (len(ripples), 1))
+        rgba[:, 3] = np.clip([r['alpha'] for r in ripples], 0.0, 1.0)
+        level = lod.classify(radii * px_per_unit, rgba[:, 3])
+        ring = level == lod.RING
+        segments = lod.segments_for_radius(radii[ring] * px_per_unit)
+        ring_layer.set_segments(lod.ring_polygons(xs_[ring], ys_[ring], radii[ring], radii[ring], segments))
+        ring_layer.set_color(rgba[ring])
+        point = level == lod.POINT
+        point_layer.set_offsets(np.column_stack([xs_[point], ys_[point]]))
+        point_layer.set_facecolor(rgba[point])
+
+        # render, then composite the overlay straight into the frame buffer
+        fig.canvas.draw()
+        buf = np.asarray(fig.canvas.buffer_rgba())
+        bb = ax.bbox
+        x, y = overlay.origin((bb.x0, buf.shape[0] - bb.y1, bb.x1, buf.shape[0] - bb.y0), anchor=(1.0, 0.02))
+        overlay.blit(buf, dict(rain=rainfall[frame_idx % frames], rh=humidity[frame_idx % frames],
+                               temp=temperature[frame_idx % frames]), x, y)
+        if writer is not None:
+            writer.append(buf, frame_idx)
+            continue
+        out_path = os.path.join(out_dir, f'frame_{frame_idx:04d}.png')
+        plt.imsave(out_path, buf)
         print('Saved', out_path)
 
     plt.close(fig)
+    if writer is not None:
+        writer.close()
+        print('Saved', len(writer), 'frames to', store)
 
 
 if __name__ == '__main__':
-    render_frames(csv_path=None, max_frames=200)
+    import argparse
+    parser = argparse.ArgumentParser(description='Render ripple frames into a frame store (headless)')
+    parser.add_argument('--draft', action='store_true', help='Fast low-resolution preview into frames_draft.rfs')
+    parser.add_argument('--store', metavar='PATH', default=None,
+                        help='frame_store file to write (default: frames.rfs, frames_draft.rfs with --draft)')
+    parser.add_argument('--png', action='store_true', help='Write a directory of frame_####.png instead of a store')
+    args = parser.parse_args()
+    if args.png and args.store:
+        parser.error('--store and --png are alternative outputs; pick one')
+    render_frames(csv_path=None, max_frames=200, draft=args.draft, store=args.store, png=args.png)
@@ -0,0 +1,247 @@
+"""Single-file frame store with O(1) random access.
+
+Exports used to be directories of frame_####.png; every consumer listed,
+sorted and PNG-decoded them one file at a time. A store is one file:
+
+  header   64 bytes: magic, version, width, height, channels, frame count,
+           codec, index offset, fps
+  frames   each frame's bytes back to back: raw pixels, or zlib / LZ4
+           (when the `lz4` package is installed) compressed per frame
+  index    per frame: (frame id, offset, size) as little-endian int64
+
+Frames are appended while rendering and the index is written on close
+(the file only appears under its final name then). Readers memory-map the
+file: a raw frame is a zero-copy view, a compressed one is a single
+decompress, and `store.find(frame_id)` maps simulation frame numbers
+(which skip with a draft stride) to positions.
+
+  with FrameWriter('clip.rfs', 1500, 1050, fps=20) as w:
+      w.append(rgb, frame_id=0)
+  store = FrameStore('clip.rfs'); img = store[10]
+
+`python frame_store.py info|pack|extract ...` covers QA and conversion.
+"""
+import os
+import mmap
+import zlib
+import struct
+import importlib.util
+
+import numpy as np
+
+
+MAGIC = b'RAINFRM1'
+VERSION = 1
+# magic, version, width, height, channels, count, codec, index offset, fps; padded to 64 bytes
+HEADER = struct.Struct('<8sIIIIII Q f')
+HEADER_SIZE = 64
+INDEX_DTYPE = np.dtype([('frame', '<i8'), ('offset', '<i8'), ('size', '<i8')])
+EXT = '.rfs'
+
+CODECS = {'raw': 0, 'zlib': 1, 'lz4': 2}
+CODEC_NAMES = {v: k for k, v in CODECS.items()}
+HAS_LZ4 = importlib.util.find_spec('lz4') is not None
+
+
+def _compress(codec, data, level):
+    if codec == 'zlib':
+        return zlib.compress(data, level)
+    if codec == 'lz4':
+        import lz4.frame
+        return lz4.frame.compress(data)
+    return data
+
+
+def _decompress(codec, data):
+    if codec == 'zlib':
+        return zlib.decompress(data)
+    if codec == 'lz4':
+        import lz4.frame
+        return lz4.frame.decompress(data)
+    return data
+
+
+class FrameWriter:
+    """Append frames of one size to a store; the index is written by `close()`."""
+
+    def __init__(self, path, width, height, channels=3, codec='zlib', level=1, fps=20.0):
+        if codec == 'lz4' and not HAS_LZ4:
+            codec = 'zlib'
+        if codec not in CODECS:
+            raise ValueError(f'unknown codec {codec!r} (one of {", ".join(CODECS)})')
+        self.path = path
+        self.shape = (int(height), int(width), int(channels))
+        self.codec = codec
+        self.level = level
+        self.fps = float(fps)
+        self._index = []
+        self._tmp = path + '.part'
+        self._f = open(self._tmp, 'wb')
+        self._f.write(b'\0' * HEADER_SIZE)
+
+    def append(self, frame, frame_id=None):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.shape != self.shape:
+            if frame.shape[:2] == self.shape[:2] and frame.shape[2] > self.shape[2]:
+                # e.g. an RGBA canvas buffer into an RGB store
+                frame = np.ascontiguousarray(frame[..., :self.shape[2]])
+            else:
+                raise ValueError(f'frame shape {frame.shape} does not match the store {self.shape}')
+        self._put(_compress(self.codec, frame.tobytes(), self.level), frame_id)
+
+    def _put(self, data, frame_id):
+        fid = len(self._index) if frame_id is None else int(frame_id)
+        self._index.append((fid, self._f.tell(), len(data)))
+        self._f.write(data)
+
+    def __len__(self):
+        return len(self._index)
+
+    def close(self):
+        if self._f is None:
+            return
+        index = np.array(self._index, dtype=INDEX_DTYPE)
+        index_offset = self._f.tell()
+        self._f.write(index.tobytes())
+        self._f.seek(0)
+        h, w, c = self.shape
+        self._f.write(HEADER.pack(MAGIC, VERSION, w, h, c, len(index), CODECS[self.codec], index_offset, self.fps))
+        self._f.close()
+        self._f = None
+        os.replace(self._tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # a failed export leaves no half-written store behind
+            self._f.close()
+            self._f = None
+            os.unlink(self._tmp)
+
+
+class FrameStore:
+    """Memory-mapped read access: `len(store)`, `store[i]`, `store.find(frame_id)`."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, w, h, c, count, codec, index_offset, fps = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a frame store')
+        if version != VERSION:
+            raise ValueError(f'{path}: unsupported frame store version {version}')
+        self.shape = (h, w, c)
+        self.codec = CODEC_NAMES[codec]
+        self.fps = fps
+        self.index = np.frombuffer(self._mm, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+        self.frame_ids = self.index['frame']
+        self._positions = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        _, offset, size = self.index[i]
+        if self.codec == 'raw':
+            return np.frombuffer(self._mm, dtype=np.uint8, count=size, offset=offset).reshape(self.shape)
+        data = _decompress(self.codec, self._mm[offset:offset + size])
+        return np.frombuffer(data, dtype=np.uint8).reshape(self.shape)
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def find(self, frame_id):
+        """Position of a simulation frame number (KeyError if it was not stored)."""
+        if self._positions is None:
+            self._positions = {int(f): i for i, f in enumerate(self.frame_ids)}
+        return self._positions[int(frame_id)]
+
+    def close(self):
+        self.index = self.frame_ids = None
+        try:
+            self._mm.close()
+        except BufferError:
+            # raw frames handed out are views of the map; it is released with them
+            pass
+
+    def __reduce__(self):
+        # pickled by path, so worker processes map the file themselves
+        return FrameStore, (self.path,)
+
+
+def concat(paths, out):
+    """Join stores of the same shape and codec into `out`, copying the encoded frames as they are."""
+    stores = [FrameStore(p) for p in paths]
+    if not stores:
+        raise ValueError('nothing to concatenate')
+    first = stores[0]
+    for s in stores[1:]:
+        if (s.shape, s.codec) != (first.shape, first.codec):
+            raise ValueError(f'{s.path}: {s.shape} {s.codec} does not match {first.path}: {first.shape} {first.codec}')
+    h, w, c = first.shape
+    with FrameWriter(out, w, h, c, codec=first.codec, fps=first.fps) as writer:
+        if writer.codec != first.codec:
+            raise ValueError(f'{first.codec} stores need the {first.codec} package to be written')
+        for s in stores:
+            for fid, offset, size in s.index.tolist():
+                writer._put(s._mm[offset:offset + size], fid)
+    for s in stores:
+        s.close()
+    return out
+
+
+def pack(png_dir, out, codec='zlib', fps=20.0):
+    """Convert a directory of frame_####.png into a store (frame ids from the file names)."""
+    import matplotlib.pyplot as plt
+    names = sorted(f for f in os.listdir(png_dir) if f.endswith('.png'))
+    writer = None
+    for name in names:
+        img = plt.imread(os.path.join(png_dir, name))
+        if img.dtype != np.uint8:
+            img = np.clip(img * 255 + 0.5, 0, 255).astype(np.uint8)
+        if writer is None:
+            writer = FrameWriter(out, img.shape[1], img.shape[0], img.shape[2], codec=codec, fps=fps)
+        digits = ''.join(ch for ch in name if ch.isdigit())
+        writer.append(img, int(digits) if digits else None)
+    if writer is None:
+        raise ValueError(f'no PNG frames in {png_dir}')
+    writer.close()
+    return out
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Inspect, create and unpack frame stores')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('info', help='Print the header and size of a store')
+    p.add_argument('store')
+    p = sub.add_parser('pack', help='Convert a directory of PNG frames into a store')
+    p.add_argument('png_dir')
+    p.add_argument('out')
+    p.add_argument('--codec', default='zlib', choices=list(CODECS))
+    p = sub.add_parser('extract', help='Write one frame (by simulation frame id) as PNG')
+    p.add_argument('store')
+    p.add_argument('frame', type=int)
+    p.add_argument('out')
+    args = parser.parse_args()
+
+    if args.cmd == 'info':
+        s = FrameStore(args.store)
+        ids = s.frame_ids
+        print(f'{args.store}: {len(s)} frames {s.shape[1]}x{s.shape[0]}x{s.shape[2]} {s.codec} @ {s.fps:g} fps, '
+              f'frames {ids.min() if len(ids) else "-"}..{ids.max() if len(ids) else "-"}, '
+              f'{os.path.getsize(args.store) / 1e6:.1f} MB')
+    elif args.cmd == 'pack':
+        print('Wrote', pack(args.png_dir, args.out, args.codec))
+    else:
+        import matplotlib.pyplot as plt
+        s = FrameStore(args.store)
+        plt.imsave(args.out, s[s.find(args.frame)])
+        print('Wrote', args.out)
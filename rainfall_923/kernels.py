@@ -0,0 +1,176 @@
+"""Optional Numba kernels for the hot loops, with NumPy fallbacks.
+
+Three operations dominate long raster renders:
+
+- `step_ripples`: grow/fade the ripple pool and flag the survivors,
+- `draw_rings`: rasterize anti-aliased (elliptical) rings and blend them
+  "over" a float region in draw order,
+- `blend`: alpha-blend a colour layer into a uint8 frame region.
+
+The NumPy versions allocate several full-size temporaries per ring; the
+Numba versions are fused per-pixel loops that allocate nothing. Numba is
+optional and only imported on first use (kernels_jit.py): without it, or
+with RAINFALL_NO_JIT=1, every kernel is the NumPy implementation. Compiled
+kernels are cached on disk (`cache=True`, under $NUMBA_CACHE_DIR or the
+asset cache) so short renders do not pay the JIT warm-up again.
+
+`python kernels.py --check` runs the parity checks: stepping against the
+reference `main.Ripple.step`, and both ring/blend paths against each other.
+"""
+import os
+import importlib.util
+import numpy as np
+
+import assets
+
+os.environ.setdefault('NUMBA_CACHE_DIR', os.path.join(assets.CACHE_DIR, 'numba'))
+
+# numba itself is imported lazily (see jit_module) so viewers do not pay for it at startup
+JIT = not os.environ.get('RAINFALL_NO_JIT') and importlib.util.find_spec('numba') is not None
+
+
+# --- NumPy implementations ---------------------------------------------
+
+def step_ripples_numpy(r, alpha, grow, fade, min_alpha, max_r):
+    """Grow/fade in place (same float64 arithmetic as Ripple.step); returns the alive mask."""
+    r += grow
+    alpha -= fade
+    return (alpha > min_alpha) & (r < max_r)
+
+
+def draw_rings_numpy(region, ox, oy, x, y, rx, ry, rgba, linewidth, antialiased=True):
+    h, w = region.shape[:2]
+    half = linewidth / 2.0
+    for i in range(len(x)):
+        # ring bbox clipped to the region, in region coordinates
+        x0 = max(0, int(np.floor(x[i] - rx[i] - half - 1)) - ox)
+        x1 = min(w, int(np.ceil(x[i] + rx[i] + half + 2)) - ox)
+        y0 = max(0, int(np.floor(y[i] - ry[i] - half - 1)) - oy)
+        y1 = min(h, int(np.ceil(y[i] + ry[i] + half + 2)) - oy)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        # pixel centres relative to the ring centre
+        dx = (np.arange(x0, x1, dtype=np.float32) + ox + 0.5 - x[i])[None, :]
+        dy = (np.arange(y0, y1, dtype=np.float32) + oy + 0.5 - y[i])[:, None]
+        dist = np.sqrt(dx * dx + dy * dy)
+        # distance to the ellipse measured along the ray through the pixel
+        rho = np.sqrt((dx / rx[i]) ** 2 + (dy / ry[i]) ** 2)
+        d = np.abs(dist - dist / np.maximum(rho, 1e-6))
+        if antialiased:
+            cov = np.clip(half + 0.5 - d, 0.0, 1.0)
+        else:
+            cov = (d <= half).astype(np.float32)
+        a = (cov * rgba[i, 3])[..., None]
+        sub = region[y0:y1, x0:x1]
+        sub += (rgba[i, :3].astype(np.float32) - sub) * a
+
+
+def blend_numpy(dst, color, alpha):
+    """dst (h, w, >=3) uint8 <- dst over-blended with `color` (3,) at `alpha` (h, w)."""
+    a = alpha[..., None]
+    out = dst[..., :3].astype(np.float32) * (1 - a) + np.asarray(color, dtype=np.float32) * 255.0 * a
+    dst[..., :3] = np.clip(out + 0.5, 0, 255).astype(np.uint8)
+
+
+# --- dispatch ------------------------------------------------------------
+
+_jit = None
+
+
+def jit_module():
+    """kernels_jit, imported (and numba with it) on first use; None without numba."""
+    global _jit, JIT
+    if _jit is None and JIT:
+        try:
+            import kernels_jit
+            _jit = kernels_jit
+        except ImportError:
+            JIT = False
+    return _jit
+
+
+def step_ripples(r, alpha, grow, fade, min_alpha, max_r):
+    jit = jit_module()
+    if jit is not None:
+        return jit.step_ripples(r, alpha, grow, fade, min_alpha, max_r)
+    return step_ripples_numpy(r, alpha, grow, fade, min_alpha, max_r)
+
+
+def draw_rings(region, ox, oy, x, y, rx, ry, rgba, linewidth, antialiased=True):
+    """Rasterize rings over a float32 (h, w, 3) region whose top-left pixel is (ox, oy)."""
+    jit = jit_module()
+    if jit is not None:
+        f32 = [np.ascontiguousarray(v, dtype=np.float32) for v in (x, y, rx, ry, rgba)]
+        jit.draw_rings(region, int(ox), int(oy), *f32, np.float32(linewidth / 2.0), bool(antialiased))
+    else:
+        draw_rings_numpy(region, ox, oy, x, y, rx, ry, rgba, linewidth, antialiased)
+
+
+def blend(dst, color, alpha):
+    jit = jit_module()
+    if jit is not None:
+        jit.blend(dst, np.asarray(color, dtype=np.float32), np.ascontiguousarray(alpha, dtype=np.float32))
+    else:
+        blend_numpy(dst, color, alpha)
+
+
+# --- parity checks -------------------------------------------------------
+
+def check(n_ripples=400, steps=200, seed=41):
+    """Compare the active kernels against the reference semantics; returns a dict of errors."""
+    import main as m
+    from simulation import GROW, FADE, MIN_ALPHA, max_ripple_radius
+    rng = np.random.RandomState(seed)
+    max_r = max_ripple_radius()
+    errors = {}
+
+    # stepping: kernel pool vs a list of main.Ripple, dropping the dead ones the same way
+    ref = [m.Ripple(0.5, 0.5, None, r0=r0, max_r=max_r) for r0 in rng.uniform(0.0, max_r, n_ripples)]
+    for rp, a0 in zip(ref, rng.uniform(0.1, 0.95, n_ripples)):
+        rp.alpha = a0
+    r = np.array([rp.r for rp in ref])
+    alpha = np.array([rp.alpha for rp in ref])
+    worst = 0.0
+    for _ in range(steps):
+        ref = [rp for rp in ref if rp.step()]
+        alive = step_ripples(r, alpha, GROW, FADE, MIN_ALPHA, max_r)
+        r, alpha = r[alive], alpha[alive]
+        if len(r) != len(ref):
+            worst = np.inf
+            break
+        if len(r):
+            worst = max(worst, np.abs(r - [rp.r for rp in ref]).max(), np.abs(alpha - [rp.alpha for rp in ref]).max())
+    errors['step'] = float(worst)
+
+    # rings and blend: active kernels vs the NumPy implementations
+    h, w = 96, 128
+    x, y = rng.uniform(-20, w + 20, 40).astype(np.float32), rng.uniform(-20, h + 20, 40).astype(np.float32)
+    rx = rng.uniform(0.5, 60, 40).astype(np.float32)
+    ry = (rx * rng.uniform(0.7, 1.3, 40)).astype(np.float32)
+    rgba = rng.uniform(0, 1, (40, 4)).astype(np.float32)
+    base = rng.uniform(0, 1, (h, w, 3)).astype(np.float32)
+    for aa in (True, False):
+        a, b = base.copy(), base.copy()
+        draw_rings(a, 7, 3, x, y, rx, ry, rgba, 3.0, aa)
+        draw_rings_numpy(b, 7, 3, x, y, rx, ry, rgba, 3.0, aa)
+        errors['rings_aa' if aa else 'rings'] = float(np.abs(a - b).max())
+    frame = rng.randint(0, 256, (h, w, 4)).astype(np.uint8)
+    alpha_map = rng.uniform(0, 1, (h, w)).astype(np.float32)
+    f1, f2 = frame.copy(), frame.copy()
+    blend(f1, (0.2, 0.5, 0.9), alpha_map)
+    blend_numpy(f2, (0.2, 0.5, 0.9), alpha_map)
+    errors['blend'] = float(np.abs(f1.astype(int) - f2).max())
+    return errors
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    if '--check' in sys.argv:
+        t0 = time.perf_counter()
+        errors = check()
+        print('jit' if jit_module() is not None else 'numpy', f'({time.perf_counter() - t0:.2f}s)', errors)
+        # stepping must be exact; rasterization may differ by float rounding only
+        ok = errors['step'] == 0.0 and errors['blend'] <= 1 and max(errors['rings'], errors['rings_aa']) < 1e-3
+        print('OK' if ok else 'MISMATCH')
+        sys.exit(0 if ok else 1)
@@ -0,0 +1,56 @@
+"""Numba-compiled kernels behind kernels.py (imported only when numba is installed).
+
+Fused per-pixel loops: no temporaries, compiled once and cached on disk.
+The pixel kernels drop the GIL so raster.py's tile threads run in parallel.
+Call them through kernels.py, which converts arguments and falls back to
+NumPy.
+"""
+import numba
+import numpy as np
+
+
+@numba.njit(cache=True)
+def step_ripples(r, alpha, grow, fade, min_alpha, max_r):
+    alive = np.empty(r.shape[0], dtype=np.bool_)
+    for i in range(r.shape[0]):
+        r[i] += grow
+        alpha[i] -= fade
+        alive[i] = alpha[i] > min_alpha and r[i] < max_r
+    return alive
+
+
+@numba.njit(cache=True, nogil=True)
+def draw_rings(region, ox, oy, x, y, rx, ry, rgba, half, antialiased):
+    h, w = region.shape[0], region.shape[1]
+    for i in range(x.shape[0]):
+        x0 = max(0, int(np.floor(x[i] - rx[i] - half - 1)) - ox)
+        x1 = min(w, int(np.ceil(x[i] + rx[i] + half + 2)) - ox)
+        y0 = max(0, int(np.floor(y[i] - ry[i] - half - 1)) - oy)
+        y1 = min(h, int(np.ceil(y[i] + ry[i] + half + 2)) - oy)
+        for py in range(y0, y1):
+            dy = np.float32(py + oy + 0.5) - y[i]
+            for px in range(x0, x1):
+                dx = np.float32(px + ox + 0.5) - x[i]
+                dist = np.sqrt(dx * dx + dy * dy)
+                rho = np.sqrt((dx / rx[i]) ** 2 + (dy / ry[i]) ** 2)
+                d = abs(dist - dist / max(rho, 1e-6))
+                if antialiased:
+                    cov = min(1.0, max(0.0, half + 0.5 - d))
+                else:
+                    cov = 1.0 if d <= half else 0.0
+                a = cov * rgba[i, 3]
+                if a > 0.0:
+                    for c in range(3):
+                        region[py, px, c] += (rgba[i, c] - region[py, px, c]) * a
+
+
+@numba.njit(cache=True, nogil=True)
+def blend(dst, color, alpha):
+    for py in range(dst.shape[0]):
+        for px in range(dst.shape[1]):
+            a = alpha[py, px]
+            if a <= 0.0:
+                continue
+            for c in range(3):
+                v = dst[py, px, c] * (1 - a) + color[c] * 255.0 * a + 0.5
+                dst[py, px, c] = min(255, max(0, int(v)))
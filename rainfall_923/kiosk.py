@@ -0,0 +1,229 @@
+"""Pre-rendered seamless loops for kiosk displays.
+
+A lobby display running the live viewer all day spends its CPU showing the
+same data on repeat. Here one loop cycle is rendered ahead of time instead:
+
+- a window of `period` frames of spawn events is taken from the closed-form
+  timeline (timeline.SpawnTable) and repeated with that period, so the
+  ripples still alive when the loop wraps are exactly the ones alive at its
+  first frame: the last frame runs into the first with no jump,
+- the window start is picked where the original timeline already looks the
+  same `period` frames later (same live count, closest positions, radii and
+  colours), so the repetition is as unnoticeable as it can be,
+- the loop is rendered with the tiled raster exporter into a .npy memmap in
+  the asset cache, keyed by the CSV's content hash, canvas size and period,
+  and can be encoded as a video with `--video`.
+
+Viewers play the cached frames (a memcpy and a blit per frame) and fall
+back to the live simulation only while the data has changed and the new
+loop is being built (`--kiosk` in both viewers; `LoopCache` runs the
+build). The matplotlib viewer plays the tiled loop, which is its own look;
+the pygame viewer renders its loops with its own drawing code instead
+(`loop_path(..., kind='pygame')`, a frame store).
+
+Run with:
+  python kiosk.py --csv kyotov03.csv --width 1000 --height 700
+"""
+import os
+import sys
+import signal
+import subprocess
+
+import numpy as np
+
+import assets
+from frame_store import EXT as STORE_EXT
+from simulation import SPAWN_EVERY, max_ripple_radius
+from timeline import SpawnTable, age_tables
+
+# main (and tiled_export, which imports it) are imported where needed: the
+# pygame viewer has its own `main` module and only calls loop_path()
+
+LOOP_FRAMES = 400  # 20 s at 20 fps
+LOOP_FPS = 20
+# loop starts are searched over this many frames of the timeline
+SEARCH_FRAMES = 2000
+LOOP_DIR = os.path.join(assets.CACHE_DIR, 'loops')
+
+
+def loop_period(frames):
+    """Loop length rounded to whole spawn intervals, so the spawn rhythm continues across the wrap."""
+    return max(SPAWN_EVERY, int(frames) - int(frames) % SPAWN_EVERY)
+
+
+def loop_path(csv_path, width, height, period=LOOP_FRAMES, kind=None):
+    """Cache file of the loop for this CSV content, canvas size and period (cheap: a hash lookup).
+
+    The default is build_loop's .npy; `kind` names a frame store of `period`
+    frames rendered by a viewer's own drawing code (e.g. 'pygame').
+    """
+    src = assets.source_hash(csv_path) if csv_path and os.path.exists(csv_path) else 'synthetic'
+    if kind is None:
+        return os.path.join(LOOP_DIR, f'{src}_{int(width)}x{int(height)}_p{loop_period(period)}.npy')
+    return os.path.join(LOOP_DIR, f'{src}_{kind}_{int(width)}x{int(height)}_p{int(period)}{STORE_EXT}')
+
+
+class LoopCache:
+    """Viewer side: the cached loop for the current data, built by a separate process when missing.
+
+    `path()` names the loop for the data as it is now, `command(path)` is
+    the command line that builds it and `load(path)` opens a finished one.
+    """
+
+    def __init__(self, path, command, load, cwd=None):
+        self._path = path
+        self._command = command
+        self._load = load
+        self.cwd = cwd
+        self.path = None
+        self.frames = None
+        self.proc = None
+        self.refresh()
+
+    def refresh(self):
+        """Follow the data: drop a loop made from older data and build the current one."""
+        path = self._path()
+        if path == self.path:
+            return
+        self.path = path
+        self.frames = None
+        self.stop()
+        if os.path.exists(path):
+            self.frames = self._load(path)
+            return
+        # own process group, so a stale build is stopped together with its tile workers
+        self.proc = subprocess.Popen(self._command(path), cwd=self.cwd, start_new_session=True)
+
+    def ready(self):
+        if self.frames is None and self.proc is not None and self.proc.poll() is not None:
+            self.proc = None
+            if os.path.exists(self.path):
+                self.frames = self._load(self.path)
+        return self.frames is not None
+
+    def stop(self):
+        if self.proc is not None and self.proc.poll() is None:
+            os.killpg(self.proc.pid, signal.SIGTERM)
+        self.proc = None
+
+
+def tiled_loop(csv_path, width, height, period=LOOP_FRAMES):
+    """LoopCache of build_loop's loop (frames of `height` x `width` RGB), built by running this script."""
+    csv_path = os.path.abspath(csv_path) if csv_path and os.path.exists(csv_path) else None
+
+    def command(path):
+        cmd = [sys.executable, os.path.abspath(__file__), '--width', str(int(width)), '--height', str(int(height)),
+               '--frames', str(int(period)), '--out', path]
+        return cmd + ['--csv', csv_path] if csv_path else cmd
+
+    return LoopCache(lambda: loop_path(csv_path, width, height, period), command,
+                     lambda path: np.load(path, mmap_mode='r'), cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def loop_table(table, start, period):
+    """SpawnTable whose events and samples in [start, start + period) repeat with `period`.
+
+    Frames start .. start + period of the returned table form one cycle and
+    the state at start + period equals the state at start exactly, overlay
+    readings included.
+    """
+    window = (table.spawn >= start) & (table.spawn < start + period)
+    # enough earlier copies to cover every ripple still alive at `start`
+    copies = -(-table.lifetime // period)
+    spawn, x, y, rain = [], [], [], []
+    for k in range(-copies, 1):
+        spawn.append(table.spawn[window] + k * period)
+        x.append(table.x[window])
+        y.append(table.y[window])
+        rain.append(table.rain[window])
+    # the overlay reads samples[t]: repeat the window's readings like the events
+    frames = np.arange(len(table.samples))
+    samples = table.samples[start + (frames - start) % period]
+    return SpawnTable(table.data, np.concatenate(spawn), np.concatenate(x), np.concatenate(y),
+                      np.concatenate(rain), samples, table.max_r)
+
+
+def loop_cost(table, start, period):
+    """How different the timeline looks at `start` and `start + period` (0 = identical)."""
+    a, b = table.frame(start), table.frame(start + period)
+    if len(a) != len(b):
+        return np.inf
+    if not len(a):
+        return 0.0
+    # both are in spawn order, so ripples pair up by age
+    return float(np.mean(np.abs(a.x - b.x) + np.abs(a.y - b.y) + np.abs(a.r - b.r))
+                 + np.mean(np.abs(a.rain - b.rain)) / 30.0)
+
+
+def choose_start(table, period, search=SEARCH_FRAMES):
+    """Loop start (after the first ripples have died once) with the lowest `loop_cost`."""
+    first = table.lifetime + 1
+    last = min(first + search, table.n_frames - period)
+    candidates = range(first, max(first + 1, last), SPAWN_EVERY)
+    return min(candidates, key=lambda s: loop_cost(table, s, period))
+
+
+def build_loop(csv_path, width, height, period=LOOP_FRAMES, out=None, tiles=(2, 1), search=SEARCH_FRAMES):
+    """Render one seamless cycle into the cache (or `out`); returns the .npy path."""
+    import main as m
+    from tiled_export import export_tiled
+    period = loop_period(period)
+    out = out or loop_path(csv_path, width, height, period)
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+
+    data = m.load_data(csv_path or m.CSV_CANDIDATE)
+    lifetime = len(age_tables(max_ripple_radius())[0]) - 1
+    table = SpawnTable.build(data, lifetime + 1 + search + 2 * period)
+    start = choose_start(table, period, search)
+    # export_tiled renders the state after stepping frame f, i.e. frames start .. start + period - 1
+    tmp = out + '.part.npy'
+    export_tiled(tmp, width, height, tiles, n_frames=period, start_frame=start - 1,
+                 table=loop_table(table, start, period))
+    # readers never see a half-written loop
+    os.replace(tmp, out)
+    print(f'Loop of {period} frames from frame {start} (cost {loop_cost(table, start, period):.4f}) -> {out}')
+    return out
+
+
+def encode_loop(npy_path, video_path, fps=LOOP_FPS):
+    import imageio
+    frames = np.load(npy_path, mmap_mode='r')
+    with imageio.get_writer(video_path, fps=fps) as writer:
+        for frame in frames:
+            writer.append_data(frame)
+    return video_path
+
+
+def check_seam(csv_path=None, period=LOOP_FRAMES):
+    """Max state difference between the loop's wrap point and its first frame (0.0 = seamless)."""
+    import main as m
+    period = loop_period(period)
+    data = m.load_data(csv_path or m.CSV_CANDIDATE)
+    table = SpawnTable.build(data, 3 * period + 400)
+    start = choose_start(table, period, search=period)
+    lt = loop_table(table, start, period)
+    a, b = lt.frame(start), lt.frame(start + period)
+    if len(a) != len(b) or a.current_sample() != b.current_sample():
+        return np.inf
+    return max(float(np.abs(getattr(a, k) - getattr(b, k)).max()) if len(a) else 0.0
+               for k in ('x', 'y', 'r', 'alpha', 'rain'))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Render a seamless loop for kiosk playback')
+    parser.add_argument('--csv', default=None, help='Weather CSV (default: the one main.py uses)')
+    parser.add_argument('--width', type=int, default=1000)
+    parser.add_argument('--height', type=int, default=700)
+    parser.add_argument('--frames', type=int, default=LOOP_FRAMES, help='Loop length in frames')
+    parser.add_argument('--out', default=None, help='Output .npy (default: the loop cache)')
+    parser.add_argument('--video', default=None, help='Also encode the loop to this video file')
+    parser.add_argument('--check', action='store_true', help='Only verify that the loop wraps seamlessly')
+    args = parser.parse_args()
+    if args.check:
+        err = check_seam(args.csv, args.frames)
+        print('seam difference:', err)
+        sys.exit(0 if err == 0.0 else 1)
+    path = build_loop(args.csv, args.width, args.height, args.frames, args.out)
+    if args.video:
+        print('Wrote', encode_loop(path, args.video))
@@ -0,0 +1,256 @@
+"""Asyncio live weather feed for the viewers.
+
+`LiveFeed` polls an Open-Meteo shaped JSON endpoint
+(`{"hourly": {"time": [...], "rain": [...], ...}}`) on its own asyncio
+loop in a daemon thread, so the render loop never waits on the network:
+
+- connections are HTTP/1.1 keep-alive and reused from a small pool,
+- requests are conditional (If-None-Match / If-Modified-Since), so an
+  unchanged feed costs a 304 with no body,
+- failures back off exponentially (with jitter) up to `max_backoff`.
+
+New samples are queued; the render thread calls `drain()` once per frame,
+which appends them to `feed.data` (same dict shape as `main.load_data`)
+without blocking. `live_feed_stub.py` serves a local endpoint for offline
+runs.
+"""
+import json
+import random
+import asyncio
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from tail_reader import Section
+
+
+# Open-Meteo hourly variable names for the columns the spawners use
+VARIABLES = {
+    'rain': ['rain', 'precipitation'],
+    'wind_dir': ['wind_direction_10m', 'wind_direction'],
+    'rh': ['relative_humidity_2m', 'relative_humidity'],
+    'temp': ['temperature_2m', 'temperature'],
+}
+KEYS = tuple(VARIABLES)
+
+
+class ConnectionPool:
+    """Idle keep-alive connections per (host, port), reused across polls."""
+
+    def __init__(self, size=2, timeout=10.0):
+        self.size = size
+        self.timeout = timeout
+        self._idle = {}
+
+    async def request(self, url, headers=None):
+        """GET `url`; returns (status, headers, body bytes)."""
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        lines = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive', 'Accept: application/json']
+        lines += [f'{k}: {v}' for k, v in (headers or {}).items()]
+        payload = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+        # a pooled connection may have been closed by the server; retry once on a fresh one
+        for attempt in range(2):
+            reader, writer = await self._acquire(host, port, parts.scheme == 'https', fresh=attempt > 0)
+            try:
+                writer.write(payload)
+                await writer.drain()
+                status, resp_headers, body = await asyncio.wait_for(self._read_response(reader), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if attempt:
+                    raise
+                continue
+            except BaseException:
+                writer.close()
+                raise
+            if resp_headers.get('connection', '').lower() == 'close':
+                writer.close()
+            else:
+                self._release(host, port, reader, writer)
+            return status, resp_headers, body
+
+    async def _acquire(self, host, port, ssl, fresh=False):
+        idle = self._idle.setdefault((host, port), [])
+        while idle and not fresh:
+            reader, writer = idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return await asyncio.wait_for(asyncio.open_connection(host, port, ssl=ssl or None), self.timeout)
+
+    def _release(self, host, port, reader, writer):
+        idle = self._idle.setdefault((host, port), [])
+        if len(idle) < self.size:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('connection closed')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            k, _, v = line.partition(':')
+            headers[k.strip().lower()] = v.strip()
+        if status == 304 or status < 200:
+            return status, headers, b''
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readline()
+            return status, headers, bytes(body)
+        return status, headers, await reader.readexactly(int(headers.get('content-length', 0)))
+
+    def close(self):
+        for idle in self._idle.values():
+            for _, writer in idle:
+                writer.close()
+        self._idle.clear()
+
+
+def parse_samples(payload):
+    """Open-Meteo JSON -> (times, {key: values}) from the `hourly` block."""
+    block = payload.get('hourly') or {}
+    times = list(block.get('time', []))
+    cols = {}
+    for key, names in VARIABLES.items():
+        values = next((block[n] for n in names if n in block), None)
+        cols[key] = np.array([np.nan if v is None else v for v in values], dtype=float) if values else np.zeros(len(times))
+    return times, cols
+
+
+class LiveFeed:
+    def __init__(self, url, interval=60.0, seed=None, max_backoff=600.0, pool_size=2):
+        self.url = url
+        self.interval = float(interval)
+        self.max_backoff = float(max_backoff)
+        self.pool = ConnectionPool(pool_size)
+        self.failures = 0
+        self.last_status = None
+        self._etag = None
+        self._modified = None
+        self._last_time = None
+        self._queue = deque()
+        self._store = Section(list(KEYS), 0)
+        if seed is not None and len(seed['rain']):
+            self._store.append(np.column_stack([np.asarray(seed[k], dtype=float) for k in KEYS]).tolist())
+        self.data = {}
+        self._publish()
+        self._loop = None
+        self._thread = None
+        # set by stop() from any thread; the asyncio event wakes the poll loop's sleep
+        self._stopping = threading.Event()
+        self._stop = None
+
+    # --- render-thread side ----------------------------------------------
+
+    def drain(self, limit=None):
+        """Append queued samples to `self.data`; never blocks. Returns the count."""
+        rows = []
+        while self._queue and (limit is None or len(rows) < limit):
+            rows.append(self._queue.popleft())
+        if rows:
+            self._store.append(rows)
+            self._publish()
+        return len(rows)
+
+    def _publish(self):
+        for i, key in enumerate(KEYS):
+            self.data[key] = self._store.column(i)
+
+    # --- background loop -------------------------------------------------
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stopping.clear()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        # the flag first: a worker that has not created its asyncio event yet picks it up in _run
+        self._stopping.set()
+        if self._thread is None:
+            return
+        if self._stop is not None and self._thread.is_alive():
+            try:
+                self._loop.call_soon_threadsafe(self._stop.set)
+            except RuntimeError:
+                pass  # the loop already finished and closed
+        self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._stop = asyncio.Event()
+        if self._stopping.is_set():
+            self._stop.set()
+        try:
+            self._loop.run_until_complete(self._poll_forever())
+        finally:
+            self.pool.close()
+            self._loop.close()
+
+    def next_delay(self):
+        """Poll interval, or exponential backoff with jitter after failures."""
+        if not self.failures:
+            return self.interval
+        backoff = min(self.max_backoff, self.interval * 2 ** (self.failures - 1))
+        return backoff * random.uniform(0.5, 1.0)
+
+    async def _poll_forever(self):
+        while not self._stop.is_set():
+            try:
+                await self.poll_once()
+                self.failures = 0
+            except Exception:
+                self.failures += 1
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.next_delay())
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll_once(self):
+        headers = {}
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._modified:
+            headers['If-Modified-Since'] = self._modified
+        status, resp_headers, body = await self.pool.request(self.url, headers)
+        self.last_status = status
+        if status == 304:
+            return 0
+        if status != 200:
+            raise ConnectionError(f'HTTP {status}')
+        self._etag = resp_headers.get('etag', self._etag)
+        self._modified = resp_headers.get('last-modified', self._modified)
+        times, cols = parse_samples(json.loads(body))
+        # only samples newer than the last one we queued (ISO timestamps sort as strings)
+        start = 0
+        if self._last_time is not None:
+            start = next((i for i, t in enumerate(times) if t > self._last_time), len(times))
+        for i in range(start, len(times)):
+            self._queue.append([cols[k][i] for k in KEYS])
+        if times:
+            self._last_time = max(self._last_time or times[-1], times[-1])
+        return len(times) - start
@@ -0,0 +1,104 @@
+"""Local stand-in for an Open-Meteo style forecast endpoint.
+
+Serves `GET /v1/forecast` with an `hourly` block built from the Kyoto CSV
+(or synthetic data) and reveals one more hourly sample every `tick`
+seconds, so `live_feed.LiveFeed` can be exercised with no network. It
+honours keep-alive, sends ETag/Last-Modified and answers conditional
+requests with 304 while nothing new has been revealed.
+
+Run with:
+  python live_feed_stub.py --port 8765 --tick 5
+  python main.py --live http://127.0.0.1:8765/v1/forecast
+"""
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main as m
+
+
+class StubFeed:
+    """The data behind the stub: a fixed series revealed over time."""
+
+    def __init__(self, data, start=48, tick=5.0, window=48):
+        self.data = data
+        self.start = start
+        self.tick = float(tick)
+        self.window = window
+        self.t0 = time.time()
+        self.base = datetime(2025, 9, 4)
+
+    def visible(self):
+        n = len(self.data['rain'])
+        return min(n, self.start + int((time.time() - self.t0) / self.tick))
+
+    def payload(self, count):
+        lo = max(0, count - self.window)
+        idx = range(lo, count)
+        return {
+            'latitude': 35.0, 'longitude': 135.75, 'timezone': 'Asia/Tokyo',
+            'hourly': {
+                'time': [(self.base + timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M') for i in idx],
+                'rain': [float(self.data['rain'][i]) for i in idx],
+                'wind_direction_10m': [float(self.data['wind_dir'][i]) for i in idx],
+                'relative_humidity_2m': [float(self.data['rh'][i]) for i in idx],
+                'temperature_2m': [float(self.data['temp'][i]) for i in idx],
+            },
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    feed = None
+
+    def do_GET(self):
+        if not self.path.startswith('/v1/forecast'):
+            self.send_error(404)
+            return
+        count = self.feed.visible()
+        etag = f'"{count}"'
+        modified = formatdate(self.feed.t0 + count * self.feed.tick, usegmt=True)
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = json.dumps(self.feed.payload(count)).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(port=0, tick=5.0, csv_path=None):
+    """Start the stub on a daemon thread; returns (server, url)."""
+    handler = type('StubHandler', (Handler,), {'feed': StubFeed(m.load_data(csv_path), tick=tick)})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1/forecast'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Open-Meteo style stub server')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--tick', type=float, default=5.0, help='Seconds between newly revealed samples')
+    parser.add_argument('--csv', default=None, help='Weather CSV to serve (synthetic if omitted)')
+    args = parser.parse_args()
+    server, url = serve(args.port, args.tick, args.csv)
+    print('Serving', url)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,58 @@
+"""Level-of-detail rules for ripple rings.
+
+Ripples are classified by their rendered size and opacity:
+- alpha below `MIN_ALPHA`: skipped entirely (invisible after blending),
+- pixel radius below `POINT_RADIUS_PX`: drawn as a single point,
+- everything else: drawn as a closed polygon whose segment count is
+  chosen from the pixel radius so the chord error stays under
+  `MAX_ERROR_PX` (small rings get 8 segments, large ones up to 128).
+
+Only numpy is used here so the matplotlib exporters and the pygame viewer
+can share it.
+"""
+import numpy as np
+
+
+POINT_RADIUS_PX = 1.5
+MIN_ALPHA = 0.04
+MAX_ERROR_PX = 0.35
+MIN_SEGMENTS = 8
+MAX_SEGMENTS = 128
+
+SKIP, POINT, RING = 0, 1, 2
+
+_unit_circles = {}
+
+
+def classify(r_px, alpha, point_px=POINT_RADIUS_PX, min_alpha=MIN_ALPHA):
+    """Per-ripple LOD level (SKIP, POINT or RING) as an int8 array."""
+    r_px = np.asarray(r_px, dtype=float)
+    level = np.full(r_px.shape, RING, dtype=np.int8)
+    level[r_px < point_px] = POINT
+    level[np.asarray(alpha) < min_alpha] = SKIP
+    return level
+
+
+def segments_for_radius(r_px, max_error_px=MAX_ERROR_PX):
+    """Polygon segment count keeping the sagitta r*(1-cos(pi/n)) under max_error_px."""
+    r_px = np.maximum(np.asarray(r_px, dtype=float), max_error_px * 2)
+    n = np.pi / np.arccos(1.0 - max_error_px / r_px)
+    # round up to a multiple of 4 so cached unit circles are shared widely
+    n = np.ceil(n / 4.0) * 4
+    return np.clip(n, MIN_SEGMENTS, MAX_SEGMENTS).astype(int)
+
+
+def unit_circle(segments):
+    """Closed (segments + 1, 2) polygon on the unit circle, cached per count."""
+    pts = _unit_circles.get(segments)
+    if pts is None:
+        t = np.linspace(0.0, 2 * np.pi, segments + 1)
+        pts = np.column_stack([np.cos(t), np.sin(t)])
+        _unit_circles[segments] = pts
+    return pts
+
+
+def ring_polygons(x, y, rx, ry, segments):
+    """Closed polylines for each ring; rx/ry allow rings on non-square axes."""
+    return [unit_circle(int(n)) * (a, b) + (cx, cy)
+            for cx, cy, a, b, n in zip(x, y, rx, ry, segments)]
@@ -1,7 +1,3 @@
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from mpl_toolkits.basemap import Basemap
 """Matplotlib ripple animation driven by rainfall CSV.
 
 This script looks for `kyotov03 copy.csv` in the same directory and uses
@@ -11,32 +7,82 @@ deterministic synthetic data so the animation still runs.
 
 Run with:
   python main.py
+  python main.py --draft          # fast low-res preview of Ripple tweaks
+  python main.py --stations 120   # ripples at (synthetic) station positions
+  python main.py --raster         # rings composited tile-parallel (raster.py)
+  python main.py --kiosk          # play the cached seamless loop (kiosk.py)
+
+In the interactive window the arrow keys seek by 100 frames, PageUp/PageDown
+by 1000 and Home rewinds (see simulation.RippleSimulation.seek). The window
+opens on the first rows of the CSV while the rest loads in the background
+(see data_loader.py).
 """
 
 import os
-import math
+import time
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from matplotlib.patches import Circle
+from matplotlib.collections import LineCollection
 import argparse
 
+import assets
+import kiosk
+import lod
+from budget import FrameBudget
+from data_loader import BackgroundLoad, matching_samples
+from overlay import OverlayCompositor
+import raster
+from raster import RasterCompositor
+from simulation import RippleSimulation, SPAWN_EVERY
+from tail_reader import TailFollowReader
+from live_feed import LiveFeed
+from weather import WeatherSeries
+from stations import KYOTO_LAT, KYOTO_LON, StationSpawner, load_station_csv, synthetic_network
+
 
 CSV_CANDIDATE = os.path.join(os.path.dirname(__file__), 'kyotov03 copy.csv')
 
+# column candidates per series, first case-insensitive substring match wins
+COLUMNS = {
+    'rain': ['rain', 'precip', 'precipitation'],
+    'wind_dir': ['wind', 'wind_direction', 'winddir'],
+    'rh': ['relative_humidity', 'humidity', 'rh'],
+    'temp': ['temperature', 'temp', 'air_temperature'],
+}
+
+# how often --follow checks the CSV for appended rows
+FOLLOW_POLL_MS = 2000
+
+# ripples drawn at most once the adaptive quality controller hits its 'ripples' step
+MAX_LIVE_RIPPLES = 90
+
+# render quality presets. draft skips the map/cloud layers, draws aliased
+# rings and only renders every `stride`-th simulation frame; the simulation
+# itself is stepped identically in both modes so timing matches exactly.
+QUALITY_PRESETS = {
+    'draft': dict(dpi=60, stride=4, background=False, clouds=False, antialiased=False, linewidth=1.5),
+    'final': dict(dpi=150, stride=1, background=True, clouds=True, antialiased=True, linewidth=2.5),
+}
+
+
+def render_quality(draft=False, **overrides):
+    """Return the quality settings for a draft preview or the final export."""
+    q = dict(QUALITY_PRESETS['draft' if draft else 'final'])
+    q.update({k: v for k, v in overrides.items() if v is not None})
+    return q
+
 
 def load_data(path):
     # if file missing, deterministic synthetic fallback
     if not path or not os.path.exists(path):
         rng = np.random.RandomState(12345)
         n = 1000
-        return {
-            'rain': rng.uniform(0, 30, n),
-            'wind_dir': rng.uniform(0, 360, n),
-            'rh': rng.uniform(30, 100, n),
-            'temp': rng.uniform(0, 30, n)
-        }
+        return WeatherSeries(rain=rng.uniform(0, 30, n), wind_dir=rng.uniform(0, 360, n),
+                             rh=rng.uniform(30, 100, n), temp=rng.uniform(0, 30, n))
+
+    # imported here: it alone costs a noticeable part of the viewer's startup
+    import pandas as pd
 
     # Try reading directly; if pandas ParserError occurs (multi-section CSV),
     # attempt to detect a proper header line that starts with 'time,' and read from there.
@@ -63,42 +109,11 @@ def load_data(path):
             # final fallback: deterministic synthetic
             rng = np.random.RandomState(12345)
             n = 1000
-            return {
-                'rain': rng.uniform(0, 30, n),
-                'wind_dir': rng.uniform(0, 360, n),
-                'rh': rng.uniform(30, 100, n),
-                'temp': rng.uniform(0, 30, n)
-            }
-
-    cols = {c.lower(): c for c in df.columns}
-
-    def find(candidates):
-        for cand in candidates:
-            for k, orig in cols.items():
-                if cand in k:
-                    # coerce to numeric, replace non-numeric with NaN then fill with 0
-                    try:
-                        series = pd.to_numeric(df[orig], errors='coerce').fillna(0)
-                        return series.values
-                    except Exception:
-                        try:
-                            return df[orig].astype(float).fillna(0).values
-                        except Exception:
-                            return df[orig].values
-        return None
-
-    rain = find(['rain', 'precip', 'precipitation'])
-    wind = find(['wind', 'wind_direction', 'winddir'])
-    rh = find(['relative_humidity', 'humidity', 'rh'])
-    temp = find(['temperature', 'temp', 'air_temperature'])
-
-    n = len(df)
-    if rain is None: rain = np.zeros(n)
-    if wind is None: wind = np.zeros(n)
-    if rh is None: rh = np.zeros(n)
-    if temp is None: temp = np.zeros(n)
-
-    return {'rain': rain, 'wind_dir': wind, 'rh': rh, 'temp': temp}
+            return WeatherSeries(rain=rng.uniform(0, 30, n), wind_dir=rng.uniform(0, 360, n),
+                                 rh=rng.uniform(30, 100, n), temp=rng.uniform(0, 30, n))
+
+    # numeric coercion, NaN/outlier handling and wind sin/cos happen once, vectorized
+    return WeatherSeries.from_frame(df, COLUMNS)
 
 
 def color_from_rain(r):
@@ -133,25 +148,213 @@ class Ripple:
         return (self.alpha > 0.02) and (self.r < self.max_r)
 
 
+class RippleLayer:
+    """Draws the live ripples of a simulation with level-of-detail geometry.
+
+    Rings go into a single LineCollection as polygons whose segment count
+    follows the rendered pixel radius, tiny ripples become points and
+    near-transparent ones are skipped (see lod.py).
+    """
+
+    def __init__(self, ax, quality, dpi=None):
+        self.ax = ax
+        self.dpi = dpi or quality['dpi']
+        self.rings = LineCollection([], linewidths=quality['linewidth'],
+                                    antialiaseds=quality['antialiased'], zorder=2)
+        ax.add_collection(self.rings, autolim=False)
+        self.points = ax.scatter([], [], s=quality['linewidth'] ** 2, linewidths=0, zorder=2)
+        # render-side thinning set by the adaptive quality controller (see budget.py);
+        # the simulation itself is never changed, so seeking stays exact
+        self.max_ripples = None
+        self.thin_spawns = False
+
+    def pixel_scale(self):
+        """Pixels per axis-fraction unit along x and y at the render dpi."""
+        pos = self.ax.get_position()
+        w, h = self.ax.figure.get_size_inches() * self.dpi
+        return pos.width * w, pos.height * h
+
+    def levels(self, sim, r_px, rgba):
+        """lod level per ripple, with the quality controller's thinning applied."""
+        level = lod.classify(r_px, rgba[:, 3])
+        if self.thin_spawns:
+            # every other spawn batch, by spawn frame so a ripple never flickers in and out
+            level[sim.spawn_frames() // SPAWN_EVERY % 2 == 1] = lod.SKIP
+        if self.max_ripples is not None and len(level) > self.max_ripples:
+            # arrays are in spawn order: the oldest (faintest) ripples go first
+            level[:-self.max_ripples] = lod.SKIP
+        return level
+
+    def set_antialiased(self, on):
+        self.rings.set_antialiased(on)
+
+    def update(self, sim):
+        r_px = sim.r * max(self.pixel_scale())
+        rgba = sim.rgba()
+        level = self.levels(sim, r_px, rgba)
+
+        ring = level == lod.RING
+        segments = lod.segments_for_radius(r_px[ring])
+        self.rings.set_segments(lod.ring_polygons(sim.x[ring], sim.y[ring], sim.r[ring], sim.r[ring], segments))
+        self.rings.set_color(rgba[ring])
+
+        point = level == lod.POINT
+        self.points.set_offsets(np.column_stack([sim.x[point], sim.y[point]]))
+        self.points.set_facecolor(rgba[point])
+        return [self.rings, self.points]
+
+
+class DamageRedraw:
+    """Agg redraws of a RippleLayer's figure that only touch the damaged pixels (exporters).
+
+    The figure is drawn once without the ripple artists and the axes spines
+    and kept as the background. Each frame restores only the damaged tiles
+    from it (where rings were last frame and are now, tracked like
+    raster.RasterCompositor does, plus `extra` boxes such as a blitted
+    overlay and the thin spine strips), then draws the ripple artists and
+    the spines on top, instead of re-rendering the map, axes and every
+    artist. The result is the same as a full canvas draw.
+    """
+
+    def __init__(self, fig, layer):
+        self.fig = fig
+        self.layer = layer
+        self.ax = layer.ax
+        # spines go over the rings, so they are redrawn after them every frame
+        self.artists = [layer.rings, layer.points] + list(self.ax.spines.values())
+        for artist in self.artists:
+            artist.set_animated(True)
+        fig.canvas.draw()
+        self.buffer = np.asarray(fig.canvas.buffer_rgba())
+        self.background = self.buffer.copy()
+        self.height, self.width = self.buffer.shape[:2]
+        self.cols = -(-self.width // raster.TILE)
+        self.rows = -(-self.height // raster.TILE)
+        renderer = fig.canvas.get_renderer()
+        self._spines = np.array([self._box(s.get_window_extent(renderer), 2) for s in self.ax.spines.values()],
+                                dtype=np.int64).reshape(-1, 4)
+        self._prev = np.zeros((self.rows, self.cols), dtype=bool)
+        self.damaged_pixels = 0
+
+    def _box(self, bbox, pad):
+        # display bbox (y up) -> pixel box x0, y0, x1, y1 (y down)
+        return [max(0, int(bbox.x0) - pad), max(0, int(self.height - bbox.y1) - pad),
+                min(self.width, int(np.ceil(bbox.x1)) + pad), min(self.height, int(np.ceil(self.height - bbox.y0)) + pad)]
+
+    def draw(self, sim, extra=()):
+        """Render the simulation's current state into the canvas buffer; returns the (h, w, 4) buffer."""
+        self.layer.update(sim)
+        sx, sy = self.layer.pixel_scale()
+        cx, cy = self.ax.transAxes.transform(np.column_stack([sim.x, sim.y])).reshape(-1, 2).T
+        # stroke plus antialiasing; points are drawn linewidth wide
+        linewidth = self.layer.rings.get_linewidth()[0] * self.layer.dpi / 72.0 + 4
+        current = raster.ring_tiles(cx, self.height - cy, sim.r * sx, sim.r * sy, linewidth, self.cols, self.rows)
+        boxes = np.concatenate([self._spines, np.asarray(extra, dtype=np.int64).reshape(-1, 4)])
+        dirty = self._prev | current | raster.box_tiles(boxes, self.cols, self.rows)
+        self._prev = current
+        rects = raster.merge_rects(dirty, self.width, self.height)
+        for x0, y0, x1, y1 in rects:
+            self.buffer[y0:y1, x0:x1] = self.background[y0:y1, x0:x1]
+        for artist in self.artists:
+            self.ax.draw_artist(artist)
+        self.damaged_pixels = sum((r[2] - r[0]) * (r[3] - r[1]) for r in rects)
+        return self.buffer
+
+
+class RasterLayer(RippleLayer):
+    """Draws the live ripples with raster.RasterCompositor into one axes image.
+
+    The map is the compositor's background, so only the damaged tiles are
+    recomposited per frame, on `threads` threads when that pays off (see
+    raster.py). Ripples are thinned like RippleLayer's; small ones stay rings.
+    """
+
+    def __init__(self, ax, quality, dpi=None, threads=None):
+        self.ax = ax
+        self.dpi = dpi or quality['dpi']
+        self.width, self.height = assets.axes_pixel_size(ax, self.dpi)
+        background = assets.map_background(self.width, self.height) if quality['background'] else None
+        if background is None:
+            background = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        # linewidths are in points like matplotlib's
+        self.comp = RasterCompositor(background, linewidth=quality['linewidth'] * self.dpi / 72.0,
+                                     antialiased=quality['antialiased'], threads=threads)
+        self.image = ax.imshow(self.comp.frame, extent=(0, 1, 0, 1), aspect='auto', interpolation='none', zorder=0)
+        self.max_ripples = None
+        self.thin_spawns = False
+        self._full = False
+
+    def set_antialiased(self, on):
+        if on != self.comp.antialiased:
+            self.comp.antialiased = on
+            # rings left from the old setting are outside this frame's damage
+            self._full = True
+
+    def update(self, sim):
+        rgba = sim.rgba()
+        draw = self.levels(sim, sim.r * max(self.width, self.height), rgba) != lod.SKIP
+        self.comp.render(sim.x[draw] * self.width, (1 - sim.y[draw]) * self.height,
+                         sim.r[draw] * self.width, sim.r[draw] * self.height, rgba[draw], full=self._full)
+        self._full = False
+        self.image.set_data(self.comp.frame)
+        return [self.image]
+
+
 def main():
     parser = argparse.ArgumentParser(description='Rain ripple animation (interactive or save mode)')
     parser.add_argument('--save', action='store_true', help='Render and save the animation to file (non-interactive)')
+    parser.add_argument('--draft', action='store_true', help='Fast low-resolution preview (no map, aliased rings, frame stride)')
+    parser.add_argument('--csv', default=CSV_CANDIDATE, help='Weather CSV to animate')
+    parser.add_argument('--follow', action='store_true', help='Keep reading rows appended to the CSV while running')
+    parser.add_argument('--live', metavar='URL', default=None, help='Poll an Open-Meteo style JSON endpoint for new samples')
+    parser.add_argument('--stations', metavar='N|CSV', default=None,
+                        help='Place ripples at station lat/lon: a count for a synthetic network or a station CSV')
+    parser.add_argument('--raster', action='store_true',
+                        help='Composite rings into one image, redrawing only damaged tiles (see raster.py)')
+    parser.add_argument('--threads', type=int, default=os.cpu_count(), help='Compositing threads for --raster')
+    parser.add_argument('--kiosk', action='store_true',
+                        help='Play a cached seamless loop (kiosk.py); run live only while it is (re)built')
     args = parser.parse_args()
-
-    data = load_data(CSV_CANDIDATE)
-    n = len(data['rain'])
-
-    fig, ax = plt.subplots(figsize=(10, 7))
-    # load the Kyoto map image as the background (preferred)
+    if args.follow and args.live:
+        # each replaces the data source; the feed would silently shadow the tail reader
+        parser.error('--follow and --live are alternative data sources; pick one')
+    if args.kiosk and (args.save or args.live or args.stations):
+        parser.error('--kiosk loops the CSV; it does not combine with --save, --live or --stations')
+
+    quality = render_quality(draft=args.draft)
+    stride = quality['stride']
+
+    reader = None
+    if args.follow and os.path.exists(args.csv):
+        # tail-follow: the reader's data dict is updated in place on refresh
+        reader = TailFollowReader(args.csv)
+        reader.subscribe(lambda rd, added: print(f'Picked up {added} new rows'))
+    loading = None
+    if reader is not None and reader.data:
+        data = reader.data
+    elif not args.save and not args.live and not args.stations and args.csv and os.path.exists(args.csv):
+        # open on the first rows right away; the full series is swapped in once parsed.
+        # --live and --stations build on the whole series, saving needs it from frame 0
+        loading = BackgroundLoad(load_data, args.csv, COLUMNS)
+        data = loading.preview or loading.wait()
+    else:
+        data = load_data(args.csv)
+    feed = None
+    if args.live:
+        # polled on a background asyncio loop; update() only drains its queue
+        feed = LiveFeed(args.live, seed=data).start()
+        data = feed.data
+
+    # saving draws at the export dpi; keep the figure there so the pixel-exact overlay lines up
+    fig, ax = plt.subplots(figsize=(10, 7), dpi=quality['dpi'] if args.save else None)
+    # load the Kyoto map image as the background (preferred); the asset cache
+    # hands back the map already decoded, scaled to the axes and dimmed
     try:
-        kyoto_img_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'Kyoto_rain_art', 'Kyoto_map.jpg'))
-        if os.path.exists(kyoto_img_path):
-            img = plt.imread(kyoto_img_path)
-            # draw the image to fill the axes (axes coordinates 0..1), slightly dimmed so ripples show
-            ax.imshow(img, extent=(0, 1, 0, 1), aspect='auto', interpolation='bilinear', zorder=0, alpha=0.75)
-            ax.set_xlim(0, 1)
-            ax.set_ylim(0, 1)
-        else:
+        background = None
+        # --raster draws the map into its own frame buffer
+        if quality['background'] and not args.raster:
+            background = assets.add_map_background(ax, quality['dpi'] if args.save else fig.dpi)
+        if background is None:
             # if the image is missing, use a black background (do not use the previous blue)
             ax.set_facecolor('#000000')
     except Exception:
@@ -161,108 +364,127 @@ def main():
     ax.set_xticks([])
     ax.set_yticks([])
 
-    ripples = []
-    artists = []
-
-    info_text = ax.text(0.98, 0.02, '', ha='right', va='bottom', color='white', fontsize=10, transform=ax.transAxes,
-                        bbox=dict(facecolor=(0,0,0,0.45), edgecolor='none', boxstyle='round'), zorder=4)
-
-    # limit ripple area to ~1/20 of canvas area
-    # circle area = pi * r^2 ; solve for r where area = (1/20) * canvas_area (canvas area = 1 for axes coords)
-    max_area_frac = 1.0 / 20.0
-    max_r = float(np.sqrt(max_area_frac / math.pi))  # in axis fraction units
-
-    # create an evenly spaced grid of spawn positions across the axes
-    MARGIN = 0.06
-    span = 1.0 - 2 * MARGIN
-    # ensure grid cells are at least 2*max_r apart to avoid excessive overlap
-    min_spacing = 2.0 * max_r
-    # compute grid cols/rows to fit spacing (cap to reasonable defaults)
-    max_cols = max(1, int(np.floor(span / min_spacing)) + 1)
-    max_rows = max(1, int(np.floor(span / min_spacing)) + 1)
-    GRID_COLS = min(8, max_cols)
-    GRID_ROWS = min(6, max_rows)
-    xs = np.linspace(MARGIN, 1 - MARGIN, GRID_COLS)
-    ys = np.linspace(MARGIN, 1 - MARGIN, GRID_ROWS)
-    grid_positions = [(x, y) for y in ys for x in xs]
-    # counter for round-robin selection of grid cells
-    spawn_counter = {'c': 0}
-
-    def spawn(idx):
-        # choose next grid cell in round-robin, add small jitter and wind nudging
-        rain = float(data['rain'][idx % n])
-        wind = float(data['wind_dir'][idx % n])
-        ang = math.radians(wind)
-
-        pos = grid_positions[spawn_counter['c'] % len(grid_positions)]
-        spawn_counter['c'] += 1
-
-        # jitter so ripples don't look mechanically aligned
-        jitter = 0.03
-        x = pos[0] + (np.random.rand() - 0.5) * jitter
-        y = pos[1] + (np.random.rand() - 0.5) * jitter
-
-        # gentle wind nudge so ripples feel like they're affected by wind
-        offx = 0.02 * math.cos(ang)
-        offy = 0.02 * math.sin(ang)
-        x += offx
-        y += offy
-
-        # clamp to axes bounds
-        x = float(np.clip(x, 0.02, 0.98))
-        y = float(np.clip(y, 0.02, 0.98))
-
-        col = color_from_rain(rain)
-        # use the computed max_r so ripples never exceed ~1/20 canvas area
-        r = Ripple(x, y, col, r0=0.02, max_r=max_r)
-        # ensure RGBA tuple; use matplotlib helper
-        from matplotlib.colors import to_rgba
-        rgba = to_rgba(r.color, r.alpha)
-        c = Circle((r.x, r.y), r.r, fill=False, edgecolor=rgba, linewidth=2.5, zorder=2)
-        ax.add_patch(c)
-        ripples.append(r)
-        artists.append(c)
-
-    frame_idx = {'i': 0}
-
-    def update(frame):
-        # spawn a few ripples
-        if frame % 5 == 0:
-            for _ in range(6):
-                spawn(frame_idx['i'])
-                frame_idx['i'] += 1
-
-        # step ripples
-        to_remove = []
-        for rp, art in zip(ripples[:], artists[:]):
-            alive = rp.step()
-            art.set_radius(rp.r)
-            from matplotlib.colors import to_rgba
-            art.set_edgecolor(to_rgba(rp.color, max(0.0, rp.alpha)))
-            if not alive:
-                to_remove.append((rp, art))
-
-        for rp, art in to_remove:
-            try:
-                ripples.remove(rp)
-                artists.remove(art)
-                art.remove()
-            except ValueError:
-                pass
+    # multi-station mode: ripples at projected station positions instead of the grid
+    spawner = None
+    title = f'Kyoto: {KYOTO_LAT}, {KYOTO_LON}'
+    if args.stations:
+        network = synthetic_network(data, n=int(args.stations)) if args.stations.isdigit() else load_station_csv(args.stations)
+        spawner = StationSpawner(network)
+        data = network.mean_data()
+        title = f'{len(network)} stations (mean)'
+
+    # info overlay: pre-rasterized labels + digit atlas, shown unscaled as a figure image
+    # interactive viewing adapts quality to the frame budget (the interval); saving never does
+    budget = None if args.save else FrameBudget(0.05 * stride, steps=('antialias', 'ripples', 'spawn'))
+    lines = [title, 'Rain: {rain:.2f} mm', 'RH: {rh:.1f}%', 'Temp: {temp:.1f} °C']
+    if budget is not None:
+        lines.append('Quality level: {level:.0f}')
+    overlay = OverlayCompositor(lines, fontsize=10, dpi=fig.dpi)
+    info_image = fig.figimage(np.zeros((overlay.height, overlay.width, 4), dtype=np.uint8), zorder=4)
+
+    # all ripple state (arrays, spawn counters, rng) lives in the seekable simulation
+    sim = RippleSimulation(data, spawner=spawner)
+    if args.raster:
+        layer = RasterLayer(ax, quality, dpi=quality['dpi'] if args.save else fig.dpi, threads=args.threads)
+    else:
+        layer = RippleLayer(ax, quality, dpi=None if args.save else fig.dpi)
+
+    loop = None
+    if args.kiosk:
+        # the loop's frames are the whole picture (map, rings and overlay), shown on top of everything
+        width, height = fig.canvas.get_width_height()
+        loop = kiosk.tiled_loop(args.csv, width, height)
+        loop_ax = fig.add_axes([0, 0, 1, 1], zorder=5)
+        loop_ax.set_axis_off()
+        loop_image = loop_ax.imshow(np.zeros((height, width, 3), dtype=np.uint8), aspect='auto',
+                                    interpolation='nearest')
+        loop_ax.set_visible(False)
+        fig.canvas.mpl_connect('close_event', lambda event: loop.stop())
+
+    work = {'start': None, 'loop_frame': 0}
+
+    def update(shown):
+        nonlocal data
+        work['start'] = time.perf_counter()
+        if loop is not None:
+            loop_ax.set_visible(loop.ready())
+            if loop.ready():
+                # kiosk playback: the loop runs at 20 fps like the live view, so a draft stride skips frames too
+                loop_image.set_data(loop.frames[work['loop_frame'] % len(loop.frames)])
+                work['loop_frame'] += stride
+                return [loop_image]
+        if feed is not None:
+            feed.drain()
+        full = loading.take() if loading is not None else None
+        if full is not None:
+            # between two frames, so no frame mixes preview and full data
+            sim.set_data(full, matching_samples(data, full))
+            data = full
+        # advance every simulation frame, even the ones a draft stride skips
+        sim.advance(stride)
+        return redraw()
+
+    def redraw():
+        artists = layer.update(sim)
+
+        # update overlay, anchored bottom-right of the axes (figure pixels, y up)
+        idx = sim.current_sample()
+        values = {k: data[k][idx] for k in ('rain', 'rh', 'temp')}
+        values['level'] = budget.level if budget is not None else 0
+        info_image.set_data(overlay.rgba(values))
+        bb = ax.bbox
+        info_image.ox = bb.x0 + 0.98 * bb.width - overlay.width
+        info_image.oy = bb.y0 + 0.02 * bb.height
+        return artists + [info_image]
+
+    def on_draw(event):
+        # frame work time = update() through the end of the canvas draw
+        if budget is None or work['start'] is None:
+            return
+        elapsed = time.perf_counter() - work['start']
+        work['start'] = None
+        if budget.record(elapsed):
+            layer.set_antialiased(quality['antialiased'] and not budget.active('antialias'))
+            layer.max_ripples = MAX_LIVE_RIPPLES if budget.active('ripples') else None
+            layer.thin_spawns = budget.active('spawn')
+
+    fig.canvas.mpl_connect('draw_event', on_draw)
+
+    # scrubbing: arrows step 100 frames, page keys 1000, home rewinds
+    SEEK_KEYS = {'left': -100, 'right': 100, 'pagedown': -1000, 'pageup': 1000}
+
+    def on_key(event):
+        if event.key == 'home':
+            sim.seek(0)
+        elif event.key in SEEK_KEYS:
+            sim.seek(sim.frame + SEEK_KEYS[event.key])
+        else:
+            return
+        redraw()
+        fig.canvas.draw_idle()
+
+    fig.canvas.mpl_connect('key_press_event', on_key)
+
+    if reader is not None:
+        def poll_reader():
+            # returns None: matplotlib drops timer callbacks that return 0, as refresh() does when idle
+            if reader.refresh() and loop is not None:
+                loop.refresh()
 
-        # update overlay
-        idx = frame_idx['i'] % n
-        info_text.set_text(f'Kyoto: 35.0116, 135.7681\nRain: {data["rain"][idx]:.2f} mm\nRH: {data["rh"][idx]:.1f}%\nTemp: {data["temp"][idx]:.1f} °C')
-        return artists + [info_text]
+        poll = fig.canvas.new_timer(interval=FOLLOW_POLL_MS)
+        poll.add_callback(poll_reader)
+        poll.start()
 
-    anim = FuncAnimation(fig, update, frames=2000, interval=50, blit=False)
+    anim = FuncAnimation(fig, update, frames=2000 // stride, interval=50 * stride, blit=False)
 
     if args.save:
         # Try to save as mp4 using ffmpeg; if that fails, fall back to exporting frames
-        out_mp4 = os.path.join(os.path.dirname(__file__), 'main_animation.mp4')
+        name = 'main_animation_draft.mp4' if args.draft else 'main_animation.mp4'
+        out_mp4 = os.path.join(os.path.dirname(__file__), name)
         try:
             print('Attempting to save animation to', out_mp4)
-            anim.save(out_mp4, fps=20, dpi=150, codec='h264', writer='ffmpeg')
+            # a draft keeps the clip duration by dropping the fps along with the stride
+            anim.save(out_mp4, fps=20 / stride, dpi=quality['dpi'], codec='h264', writer='ffmpeg')
             print('Saved animation to', out_mp4)
         except Exception as e:
             print('MP4 save failed:', e)
@@ -275,12 +497,13 @@ def main():
                     sys.path.insert(0, script_dir)
                 try:
                     from export_frames import save_frames
-                    save_frames()
+                    written = save_frames(draft=args.draft)
                 except Exception:
                     # final fallback: execute the file directly
                     import runpy
                     runpy.run_path(os.path.join(script_dir, 'export_frames.py'), run_name='__main__')
-                print('Frames exported to frames/ directory')
+                    written = 'frames.rfs'
+                print('Frames exported to', written)
             except Exception as e2:
                 print('Fallback frame export failed:', e2)
         return
@@ -0,0 +1,185 @@
+"""Pre-rasterized info overlay for headless exports.
+
+The info box used to be a matplotlib `Text` artist whose string was
+rebuilt every frame, so every exported frame paid for text layout and font
+shaping. `OverlayCompositor` rasterizes the fixed parts of the template
+(labels, units, the rounded box) once, plus a small atlas of the glyphs
+numbers are made of. Per frame it only formats the numeric fields, pastes
+their glyph masks into a copy of the cached text mask and alpha-blends the
+panel into the frame buffer (or hands back an RGBA panel for `figimage`).
+
+Templates are format strings, one per line:
+
+  ['Kyoto (35.0116, 135.7681)', 'Rain: {rain:.1f} mm', 'Temp: {temp:.1f}°C']
+
+Numbers sit right-aligned in a fixed slot, so the panel never changes size
+while it animates. A slot is as wide as the field's format applied to the
+widest value of its range (`ranges`, by default weather.LIMITS), and at
+least `field_chars` digits; a value that still does not fit is shown as
+'#' marks rather than with digits cut off.
+"""
+import string
+import numpy as np
+
+import kernels
+from weather import LIMITS
+
+
+# characters formatted numbers are made of, plus the overflow mark
+ATLAS_CHARS = '0123456789.-+%e #'
+
+
+def _font(fontsize, dpi):
+    from matplotlib import font_manager
+    from matplotlib.ft2font import FT2Font
+    font = FT2Font(font_manager.findfont(font_manager.FontProperties()))
+    font.set_size(fontsize, dpi)
+    return font
+
+
+class Glyph:
+    """An alpha mask plus where it sits relative to the pen position and baseline."""
+
+    __slots__ = ('mask', 'dx', 'dy', 'advance')
+
+    def __init__(self, mask, dx, dy, advance):
+        self.mask = mask
+        self.dx = dx
+        self.dy = dy
+        self.advance = advance
+
+
+def rasterize(font, text):
+    """Render `text` once with FreeType (as the Agg backend would) into a Glyph."""
+    font.set_text(text, 0.0)
+    font.draw_glyphs_to_bitmap(antialiased=True)
+    mask = np.asarray(font.get_image(), dtype=np.float32) / 255.0
+    descent = font.get_descent() / 64.0
+    # pen advance is the sum of the glyph advances, not the ink width
+    advance = sum(font.load_char(ord(c)).horiAdvance for c in text) / 64.0
+    bearing = font.load_char(ord(text[0])).horiBearingX / 64.0 if text else 0.0
+    return Glyph(mask, int(round(bearing)), int(round(descent)) + 1 - mask.shape[0], advance)
+
+
+class OverlayCompositor:
+    def __init__(self, lines, fontsize=10, dpi=100, color=(1.0, 1.0, 1.0), box=(0.0, 0.0, 0.0, 0.45),
+                 field_chars=5, linespacing=1.2, ranges=LIMITS):
+        font = _font(fontsize, dpi)
+        px = fontsize * dpi / 72.0
+        self.color = np.asarray(color[:3], dtype=np.float32)
+        self.box_rgb = np.asarray(box[:3], dtype=np.float32)
+        self.field_chars = field_chars
+        self.atlas = {c: rasterize(font, c) for c in ATLAS_CHARS}
+        digit = self.atlas['0'].advance
+        ascent = font.ascender / font.units_per_EM * px
+        line_h = int(round(px * linespacing))
+        pad = int(round(0.3 * px))
+
+        # lay out every line once: literal glyphs are fixed, fields get a slot
+        parsed = []
+        width = 0
+        for line in lines:
+            pen = 0.0
+            items = []
+            for literal, name, spec, _ in string.Formatter().parse(line):
+                if literal:
+                    g = rasterize(font, literal)
+                    items.append(('text', pen, g))
+                    pen += g.advance
+                if name is not None:
+                    chars = max([field_chars] + [len(format(v, spec)) for v in ranges.get(name, ())])
+                    # digits are tabular in the matplotlib fonts, so a slot is `chars` digit advances
+                    slot = int(np.ceil(digit * chars))
+                    items.append(('field', pen, (name, spec, chars, slot)))
+                    pen += slot
+            parsed.append(items)
+            width = max(width, pen)
+        self.width = int(np.ceil(width)) + 2 * pad
+        self.height = line_h * len(lines) + 2 * pad
+
+        self._text = np.zeros((self.height, self.width), dtype=np.float32)
+        self._fields = []
+        for row, items in enumerate(parsed):
+            baseline = pad + row * line_h + int(round(ascent))
+            for kind, pen, item in items:
+                x = pad + int(round(pen))
+                if kind == 'text':
+                    self._paste(self._text, item, x, baseline)
+                else:
+                    self._fields.append(item + (x, baseline))
+        self._box = self._rounded_box(self.height, self.width, pad, box[3])
+
+    @staticmethod
+    def _rounded_box(h, w, radius, alpha):
+        a = np.full((h, w), alpha, dtype=np.float32)
+        if radius <= 0:
+            return a
+        ys, xs = np.mgrid[0:radius, 0:radius]
+        d = np.hypot(radius - 0.5 - xs, radius - 0.5 - ys)
+        corner = np.clip(radius - d, 0.0, 1.0) * alpha
+        a[:radius, :radius] = corner
+        a[:radius, -radius:] = corner[:, ::-1]
+        a[-radius:, :radius] = corner[::-1]
+        a[-radius:, -radius:] = corner[::-1, ::-1]
+        return a
+
+    @staticmethod
+    def _paste(target, glyph, x, baseline):
+        y0, x0 = baseline + glyph.dy, x + glyph.dx
+        h, w = glyph.mask.shape
+        ty0, tx0 = max(0, y0), max(0, x0)
+        ty1, tx1 = min(target.shape[0], y0 + h), min(target.shape[1], x0 + w)
+        if ty1 <= ty0 or tx1 <= tx0:
+            return
+        region = target[ty0:ty1, tx0:tx1]
+        np.maximum(region, glyph.mask[ty0 - y0:ty1 - y0, tx0 - x0:tx1 - x0], out=region)
+
+    def text_mask(self, values):
+        """(h, w) float alpha of the text with `values` filled into the fields."""
+        mask = self._text.copy()
+        for name, spec, chars, slot, x, baseline in self._fields:
+            text = format(values[name], spec)
+            if len(text) > chars:
+                # never drop digits: a wrong number is worse than a visibly clipped one
+                text = '#' * max(1, int(slot // self.atlas['#'].advance))
+            glyphs = [self.atlas[c] for c in text if c in self.atlas]
+            # right-align inside the slot so the decimal point does not wander
+            pen = x + slot - sum(g.advance for g in glyphs)
+            for glyph in glyphs:
+                self._paste(mask, glyph, int(round(pen)), baseline)
+                pen += glyph.advance
+        return mask
+
+    def rgba(self, values):
+        """Straight-alpha (h, w, 4) uint8 panel, e.g. for `fig.figimage`."""
+        ta = self.text_mask(values)[..., None]
+        ba = self._box[..., None]
+        alpha = ta + ba * (1 - ta)
+        rgb = (self.color * ta + self.box_rgb * ba * (1 - ta)) / np.maximum(alpha, 1e-6)
+        out = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        out[..., :3] = np.clip(rgb * 255 + 0.5, 0, 255)
+        out[..., 3:] = np.clip(alpha * 255 + 0.5, 0, 255)
+        return out
+
+    def origin(self, bbox, anchor=(0.98, 0.02)):
+        """Top-left pixel of the panel whose bottom-right corner sits at `anchor` of `bbox`.
+
+        `bbox` is (x0, y0, x1, y1) in image coordinates (y down) and `anchor`
+        is in axes fractions (y up), like `ax.text(..., ha='right', va='bottom')`.
+        """
+        x0, y0, x1, y1 = bbox
+        right = x0 + anchor[0] * (x1 - x0)
+        bottom = y1 - anchor[1] * (y1 - y0)
+        return int(round(right)) - self.width, int(round(bottom)) - self.height
+
+    def blit(self, frame, values, x, y):
+        """Blend the panel into an (H, W, 3|4) uint8 frame with its top-left at (x, y)."""
+        H, W = frame.shape[:2]
+        fx0, fy0 = max(0, x), max(0, y)
+        fx1, fy1 = min(W, x + self.width), min(H, y + self.height)
+        if fx1 <= fx0 or fy1 <= fy0:
+            return
+        sl = (slice(fy0 - y, fy1 - y), slice(fx0 - x, fx1 - x))
+        region = frame[fy0:fy1, fx0:fx1]
+        kernels.blend(region, self.box_rgb, self._box[sl])
+        kernels.blend(region, self.color, self.text_mask(values)[sl])
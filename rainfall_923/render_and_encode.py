@@ -1,71 +1,81 @@
-"""Render frames from the existing animation code and encode to MP4 using imageio.
+"""Render the ripple animation into a frame store and encode it to MP4 using imageio.
 
-This script imports the animation setup from `main.py` by running it in a special mode:
-- It sets matplotlib to Agg backend, executes the code to obtain `fig` and the `update` function, then renders a number of frames and saves them as PNGs and tries to write an MP4 via imageio.
+The frames are rendered into one frame_store file (frames.rfs, see
+frame_store.py) by the resident render server (render_server.py) when one
+is running, so the job skips the matplotlib/pandas/map cold start; without
+a server they are rendered in this process with export_frames.save_frames.
+The encoder then reads them straight from the memory-mapped store: no
+frames/ directory to list, sort and PNG-decode.
 
-If imageio/ffmpeg isn't available, it will still write the PNG frames to `rainfall_chart/frames/`.
+If imageio/ffmpeg isn't available, the frames stay in the store
+(`python frame_store.py extract` writes single PNGs).
+
+Run with:
+  python render_server.py &            # optional, keeps everything warm
+  python render_and_encode.py
+  python render_and_encode.py --frames 400 --draft
 """
 import os
-import sys
-import importlib.util
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-import numpy as np
+
+from frame_store import FrameStore
 
 ROOT = os.path.dirname(__file__)
-MAIN_PY = os.path.join(ROOT, 'main.py')
-FRAMES_DIR = os.path.join(ROOT, 'frames')
-os.makedirs(FRAMES_DIR, exist_ok=True)
+OUT_MP4 = os.path.join(ROOT, 'animation.mp4')
+STORE = os.path.join(ROOT, 'frames.rfs')
+DRAFT_STORE = os.path.join(ROOT, 'frames_draft.rfs')
 
-# execute main.py in a controlled namespace to extract the required objects
-spec = importlib.util.spec_from_file_location('rain_main', MAIN_PY)
-mod = importlib.util.module_from_spec(spec)
-# Provide a flag so main.py can detect headless rendering if needed (we'll not modify main.py; it should define everything at module-level)
-sys.modules['rain_main'] = mod
-try:
-    spec.loader.exec_module(mod)
-except Exception as e:
-    print('Error importing main.py:', e)
-    raise
 
-# We expect main.py defines `fig`, `update`, and possibly `frame_idx` in global scope; if not, we will recreate a simple runner
-# Search for a FuncAnimation instance named `anim` or for `update` and `fig`
-fig = getattr(mod, 'plt', None)
+def render(n_frames=200, draft=False, store=None, server=None):
+    """Frames into `store` via the render server at `server`, else in process; returns the store path."""
+    store = os.path.abspath(store or (DRAFT_STORE if draft else STORE))
+    if server:
+        from render_server import submit
+        import main as m
+        dpi = m.render_quality(draft=draft)['dpi']
+        # the same 10 x 7 in canvas export_frames renders
+        job = {'frames': n_frames, 'draft': draft, 'width': int(10 * dpi), 'height': int(7 * dpi), 'out': store}
+        try:
+            reply = submit(job, server)
+            print(f'Rendered {reply["frames"]} frames on {server} in {reply["seconds"]} s')
+            return store
+        except OSError as e:
+            # refused connection or missing socket: no server is running
+            print(f'No render server at {server} ({e}); rendering in process')
+    from export_frames import save_frames
+    return save_frames(n_frames=n_frames, draft=draft, store=store)
 
-# Fallback: re-run main to build the animation but prevent plt.show() from blocking
-# We'll run the main() function with a modified argv so it doesn't call plt.show() or we rely on mod.anim
 
-# Try to use mod.anim
-anim = getattr(mod, 'anim', None)
-if anim is None:
-    # as a safer fallback, re-import by executing main with a flag
-    import runpy
-    # provide argv to use save mode if available
-    sys.argv = ['main.py', '--save']
+def render_and_encode(n_frames=200, draft=False, store=None, out=OUT_MP4, server=None):
+    """Render `n_frames` simulation frames into `store`, then encode them into `out`."""
+    store = render(n_frames, draft, store, server)
+    frames = FrameStore(store)
+    print('Found', len(frames), 'frames in', store)
     try:
-        runpy.run_path(MAIN_PY, run_name='__main__')
-        print('Ran main.py in save mode')
+        from encode_frames import encode
+        print('Writing', out)
+        encode(frames, out, fps=frames.fps)
+        print('Wrote', out)
     except Exception as e:
-        print('Failed to run main.py save mode:', e)
+        print('Could not write mp4 via imageio:', e)
+        print('Frames are available in', store)
+    return out
 
-# If frames were created to frames/ by main.py, list them
-pngs = sorted([os.path.join(FRAMES_DIR, f) for f in os.listdir(FRAMES_DIR) if f.endswith('.png')])
-if not pngs:
-    print('No frames found in', FRAMES_DIR)
-else:
-    print('Found', len(pngs), 'frames')
 
-# Try to encode using imageio
-try:
-    import imageio
-    out_mp4 = os.path.join(ROOT, 'animation.mp4')
-    print('Writing', out_mp4)
-    with imageio.get_writer(out_mp4, fps=20) as writer:
-        for p in pngs:
-            img = imageio.imread(p)
-            writer.append_data(img)
-    print('Wrote', out_mp4)
-except Exception as e:
-    print('Could not write mp4 via imageio:', e)
-    print('Frames are available in', FRAMES_DIR)
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Render the animation and encode it to MP4')
+    parser.add_argument('--frames', type=int, default=200, help='Number of simulation frames')
+    parser.add_argument('--draft', action='store_true', help='Fast low-resolution preview')
+    parser.add_argument('--store', metavar='PATH', default=None, help='frame_store file (default: frames.rfs)')
+    parser.add_argument('--out', default=OUT_MP4)
+    parser.add_argument('--server', default=None,
+                        help='Render server URL or Unix socket (default: the local render_server.py port)')
+    parser.add_argument('--local', action='store_true', help='Always render in this process')
+    args = parser.parse_args()
+    if args.local and args.server:
+        parser.error('--local and --server are alternatives; pick one')
+    server = None
+    if not args.local:
+        from render_server import DEFAULT_PORT
+        server = args.server or f'http://127.0.0.1:{DEFAULT_PORT}'
+    render_and_encode(args.frames, args.draft, args.store, args.out, server)
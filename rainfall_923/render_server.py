@@ -0,0 +1,297 @@
+"""Resident render server that keeps matplotlib, data and figures warm.
+
+Every export script starts a fresh interpreter, imports matplotlib and
+pandas, builds a figure, decodes the map and only then renders; for the
+short preview clips the web frontend asks for, that cold start is most of
+the time. This server does it once and keeps the expensive pieces in LRU
+caches between jobs:
+
+- parsed weather data, keyed by CSV path + size + mtime,
+- simulations (with their seek snapshots), one per dataset,
+- pre-built figures (axes, cached map background, ripple layer, overlay),
+  keyed by canvas size and quality.
+
+Jobs are JSON, POSTed to `/render` over localhost HTTP or a Unix socket:
+
+  {"csv": null, "start": 0, "frames": 40, "width": 800, "height": 560,
+   "draft": false, "out": "preview.mp4"}
+
+`out` ending in .mp4/.gif is encoded with imageio, .rfs (the default,
+frames_preview.rfs) is a frame_store file, anything else is a directory of
+frame_####.png. matplotlib is not
+thread-safe, so jobs are rendered one at a time; `GET /status` reports the
+cache contents.
+
+Run with:
+  python render_server.py --port 8766
+  python render_server.py --socket /tmp/rainfall-render.sock
+  python render_server.py --submit '{"frames": 40, "out": "preview.mp4"}'
+"""
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+import http.client
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import main as m
+import assets
+from overlay import OverlayCompositor
+from frame_store import FrameWriter, EXT as STORE_EXT
+
+
+DEFAULT_PORT = 8766
+VIDEO_EXTS = ('.mp4', '.gif', '.webm', '.mkv')
+
+
+class LRU:
+    """Small least-recently-used cache; `on_evict(value)` runs for dropped entries."""
+
+    def __init__(self, size, on_evict=None):
+        self.size = max(1, int(size))
+        self.on_evict = on_evict
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        self.misses += 1
+        value = self._items[key] = build()
+        while len(self._items) > self.size:
+            _, old = self._items.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(old)
+        return value
+
+    def keys(self):
+        return list(self._items)
+
+    def stats(self):
+        return {'entries': len(self._items), 'size': self.size, 'hits': self.hits, 'misses': self.misses}
+
+
+class Scene:
+    """A ready-to-draw figure: axes, map background, ripple layer and overlay."""
+
+    def __init__(self, width, height, draft=False):
+        self.quality = m.render_quality(draft=draft)
+        dpi = self.quality['dpi']
+        self.fig, self.ax = plt.subplots(figsize=(width / dpi, height / dpi), dpi=dpi)
+        ax = self.ax
+        try:
+            background = assets.add_map_background(ax, dpi) if self.quality['background'] else None
+            if background is None:
+                ax.set_facecolor('#000000')
+        except Exception:
+            ax.set_facecolor('#000000')
+        ax.set_xlim(0, 1)
+        ax.set_ylim(0, 1)
+        ax.set_xticks([])
+        ax.set_yticks([])
+        self.layer = m.RippleLayer(ax, self.quality)
+        # frames after the first only redraw the damaged pixels
+        self.redraw = m.DamageRedraw(self.fig, self.layer)
+        self.overlay = OverlayCompositor([f'Kyoto: {m.KYOTO_LAT}, {m.KYOTO_LON}', 'Rain: {rain:.2f} mm',
+                                          'RH: {rh:.1f}%', 'Temp: {temp:.1f} °C'], fontsize=10, dpi=dpi)
+
+    def draw(self, sim):
+        """Render the simulation's current state; returns an (h, w, 3) uint8 view."""
+        h = self.redraw.height
+        bb = self.ax.bbox
+        x, y = self.overlay.origin((bb.x0, h - bb.y1, bb.x1, h - bb.y0))
+        # the info box is blitted into the pixel buffer (see overlay.py), so it is damage too
+        buf = self.redraw.draw(sim, extra=[(x, y, x + self.overlay.width, y + self.overlay.height)])
+        idx = sim.current_sample()
+        self.overlay.blit(buf, {k: sim.data[k][idx] for k in ('rain', 'rh', 'temp')}, x, y)
+        return buf[..., :3]
+
+    def close(self):
+        plt.close(self.fig)
+
+
+def _data_key(csv_path):
+    path = csv_path or m.CSV_CANDIDATE
+    if not os.path.exists(path):
+        return (None,)
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+class RenderServer:
+    """Job runner with warm caches; the HTTP handlers only call `render`."""
+
+    def __init__(self, max_data=4, max_scenes=4):
+        self.data = LRU(max_data)
+        # a simulation holds a reference to its data, so both are evicted together
+        self.sims = LRU(max_data)
+        self.scenes = LRU(max_scenes, on_evict=Scene.close)
+        self.jobs = 0
+        self._lock = threading.Lock()
+
+    def render(self, job):
+        start = max(0, int(job.get('start', 0)))
+        n_frames = max(1, int(job.get('frames', 40)))
+        width = int(job.get('width', 800))
+        height = int(job.get('height', 560))
+        draft = bool(job.get('draft', False))
+        out = job.get('out') or os.path.join(os.path.dirname(__file__), 'frames_preview' + STORE_EXT)
+        csv_path = job.get('csv')
+
+        with self._lock:
+            t0 = time.perf_counter()
+            key = _data_key(csv_path)
+            data = self.data.get(key, lambda: m.load_data(csv_path or m.CSV_CANDIDATE))
+            sim = self.sims.get(key, lambda: m.RippleSimulation(data))
+            scene = self.scenes.get((width, height, draft), lambda: Scene(width, height, draft))
+            stride = scene.quality['stride']
+
+            # seeking reuses the cached simulation's snapshots, so later clips start instantly
+            sim.seek(start)
+            frames = []
+            for frame in range(start, start + n_frames):
+                sim.step()
+                if frame % stride:
+                    continue
+                frames.append((frame, scene.draw(sim).copy()))
+            written = self._write(frames, out, fps=20 / stride)
+            self.jobs += 1
+            return {'frames': len(frames), 'out': written, 'seconds': round(time.perf_counter() - t0, 3)}
+
+    @staticmethod
+    def _write(frames, out, fps):
+        if out.lower().endswith(VIDEO_EXTS):
+            import imageio
+            with imageio.get_writer(out, fps=fps) as writer:
+                for _, img in frames:
+                    writer.append_data(img)
+            return out
+        if out.lower().endswith(STORE_EXT):
+            h, w = frames[0][1].shape[:2] if frames else (0, 0)
+            with FrameWriter(out, w, h, fps=fps) as writer:
+                for frame, img in frames:
+                    writer.append(img, frame)
+            return out
+        os.makedirs(out, exist_ok=True)
+        for frame, img in frames:
+            plt.imsave(os.path.join(out, f'frame_{frame:04d}.png'), img)
+        return out
+
+    def status(self):
+        return {'jobs': self.jobs, 'data': self.data.stats(), 'sims': self.sims.stats(),
+                'scenes': dict(self.scenes.stats(), keys=[list(k) for k in self.scenes.keys()])}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, clients reuse the connection
+    server_state = None
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/status':
+            self._reply(200, self.server_state.status())
+        else:
+            self._reply(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/render':
+            self._reply(404, {'error': 'not found'})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            self._reply(200, self.server_state.render(job))
+        except Exception as e:
+            self._reply(500, {'error': f'{type(e).__name__}: {e}'})
+
+    def address_string(self):
+        # Unix socket peers have no (host, port)
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(port=DEFAULT_PORT, socket_path=None, state=None):
+    """Start the server on a daemon thread; returns (server, address)."""
+    handler = type('RenderHandler', (Handler,), {'server_state': state or RenderServer()})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        address = f'http://127.0.0.1:{server.server_address[1]}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, address
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def submit(job, address=f'http://127.0.0.1:{DEFAULT_PORT}', timeout=None):
+    """Send a job to a running server (HTTP URL or Unix socket path); returns its reply."""
+    if address.startswith('http'):
+        conn = http.client.HTTPConnection(address.split('://', 1)[1], timeout=timeout)
+    else:
+        conn = _UnixConnection(address, timeout=timeout)
+    try:
+        conn.request('POST', '/render', json.dumps(job), {'Content-Type': 'application/json'})
+        reply = json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+    if 'error' in reply:
+        raise RuntimeError(reply['error'])
+    return reply
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Resident ripple render server')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', default=None, help='Listen on this Unix socket instead of localhost HTTP')
+    parser.add_argument('--max-scenes', type=int, default=4, help='Figures kept warm (LRU)')
+    parser.add_argument('--max-data', type=int, default=4, help='Parsed datasets kept warm (LRU)')
+    parser.add_argument('--submit', metavar='JSON', default=None, help='Send one job to a running server and exit')
+    args = parser.parse_args()
+    if args.submit:
+        print(submit(json.loads(args.submit), args.socket or f'http://127.0.0.1:{args.port}'))
+        raise SystemExit(0)
+    server, address = serve(args.port, args.socket, RenderServer(args.max_data, args.max_scenes))
+    print('Serving', address)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
@@ -0,0 +1,470 @@
+"""Sharded rendering of one clip across machines through a file-based job queue.
+
+The simulation is deterministic and seekable, so any frame range can be
+rendered on its own (export_frames with `start_frame`) and archive
+re-renders can be split over a cluster instead of every host rendering the
+whole clip:
+
+- `submit` cuts the clip into shards and writes one JSON job per shard into
+  a job directory on shared storage,
+- workers claim shards by renaming them from todo/ into claimed/ (atomic on
+  one filesystem: exactly one worker wins), with their worker id in the
+  new name, and touch the claimed file every `HEARTBEAT` seconds while
+  they render their range into a frame_store segment (plus an MP4 segment
+  when the output is a video),
+- the coordinator puts failed shards, and claimed ones whose heartbeat is
+  older than `STALL_SECONDS`, back into todo/ (up to `MAX_ATTEMPTS`), and
+  once every shard is done merges the segments: MP4s with the concat
+  demuxer (shards are whole GOPs, see encode_frames.py), frame stores by
+  copying their encoded frames.
+
+  todo/shard_00003.json              waiting
+  claimed/shard_00003.json@host-123  being rendered by host-123
+  done/shard_00003.json@host-123     segments/shard_00003.host-123.rfs is final
+  failed/shard_00003.json@host-123   error text in the file
+
+Every transition is one rename, so a worker that lost its shard to a
+requeue finds out when its heartbeat or `finish` fails and its segment is
+discarded. Without shared storage, `serve` exposes a job directory over
+HTTP (the same operations plus segment upload) as a local stand-in for a
+queue service; workers then take `--queue http://host:port`.
+
+Run with:
+  python shard_render.py submit jobs/ --frames 2000 --shard-frames 200 --out clip.mp4
+  python shard_render.py work jobs/              # on every node
+  python shard_render.py coordinate jobs/        # requeues, then merges into clip.mp4
+"""
+import os
+import json
+import time
+import shutil
+import socket
+import tempfile
+import threading
+import traceback
+import http.client
+from urllib.parse import urlsplit, quote, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import main as m
+from frame_store import FrameStore, EXT as STORE_EXT, concat as concat_stores
+
+
+DEFAULT_PORT = 8767
+VIDEO_EXTS = ('.mp4', '.mkv')
+HEARTBEAT = 10
+# a claimed shard untouched this long is assumed dead (hosts need roughly synchronized clocks)
+STALL_SECONDS = 120
+MAX_ATTEMPTS = 3
+POLL_SECONDS = 5
+STATES = ('todo', 'claimed', 'done', 'failed')
+
+
+def worker_id():
+    return f'{socket.gethostname()}-{os.getpid()}'.replace('@', '_').replace(os.sep, '_')
+
+
+def plan_shards(n_frames, shard_frames, start=0, align=1):
+    """[(start, frames)] simulation frame ranges; every shard but the last is a multiple of `align`."""
+    size = max(align, -(-int(shard_frames) // align) * align)
+    return [(s, min(size, start + n_frames - s)) for s in range(start, start + n_frames, size)]
+
+
+class JobDir:
+    """The queue: one JSON file per shard, moved between the STATES directories by rename."""
+
+    def __init__(self, root):
+        self.root = root
+        self.segments = os.path.join(root, 'segments')
+
+    def _path(self, *parts):
+        return os.path.join(self.root, *parts)
+
+    @classmethod
+    def create(cls, root, n_frames=200, shard_frames=200, start=0, draft=False, raster=False, out=None):
+        """Write the clip spec and one todo job per shard; returns the JobDir."""
+        jobs = cls(root)
+        if os.path.exists(jobs._path('spec.json')):
+            raise FileExistsError(f'{root} already holds a job')
+        for state in STATES + ('segments',):
+            os.makedirs(jobs._path(state), exist_ok=True)
+        stride = m.render_quality(draft=draft)['stride']
+        video = bool(out) and out.lower().endswith(VIDEO_EXTS)
+        gop = None
+        if video:
+            from encode_frames import GOP as gop
+        # shards cover whole strides; video shards are whole GOPs so the segments concat cleanly
+        shards = plan_shards(n_frames, shard_frames, start, stride * gop if video else stride)
+        # 20 fps before the draft stride, like export_frames
+        spec = dict(frames=n_frames, start=start, draft=draft, raster=raster, video=video, fps=20 / stride,
+                    gop=gop, shards=len(shards), out=out or os.path.join(root, 'clip' + STORE_EXT))
+        for i, (s, n) in enumerate(shards):
+            _write_json(jobs._path('todo', f'shard_{i:05d}.json'), dict(index=i, start=s, frames=n, attempts=0))
+        # written last: workers only start on a complete queue
+        _write_json(jobs._path('spec.json'), spec)
+        return jobs
+
+    def spec(self):
+        with open(self._path('spec.json')) as f:
+            return json.load(f)
+
+    def _names(self, state):
+        try:
+            return sorted(n for n in os.listdir(self._path(state)) if n.startswith('shard_') and not n.endswith('.part'))
+        except FileNotFoundError:
+            return []
+
+    def claim(self, owner):
+        """Take the first waiting shard for `owner`; None if there is none."""
+        for name in self._names('todo'):
+            if not name.endswith('.json'):
+                continue
+            try:
+                os.rename(self._path('todo', name), self._path('claimed', f'{name}@{owner}'))
+            except FileNotFoundError:
+                continue  # another worker got it first
+            # rename keeps the mtime of the wait in todo/; the heartbeat clock starts now
+            os.utime(self._path('claimed', f'{name}@{owner}'))
+            with open(self._path('claimed', f'{name}@{owner}')) as f:
+                return json.load(f)
+        return None
+
+    def heartbeat(self, shard, owner):
+        """Mark the shard alive; False once it has been taken away from `owner`."""
+        try:
+            os.utime(self._path('claimed', f'shard_{shard:05d}.json@{owner}'))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def upload(self, shard, owner, path):
+        """Put a rendered segment file into segments/ under the shard's and owner's name."""
+        ext = os.path.splitext(path)[1]
+        dst = os.path.join(self.segments, f'shard_{shard:05d}.{owner}{ext}')
+        shutil.copyfile(path, dst + '.part')
+        os.replace(dst + '.part', dst)
+        return dst
+
+    def finish(self, shard, owner):
+        """claimed -> done; False if the shard was requeued meanwhile (its segments are dropped)."""
+        name = f'shard_{shard:05d}.json@{owner}'
+        try:
+            os.rename(self._path('claimed', name), self._path('done', name))
+            return True
+        except FileNotFoundError:
+            for seg in self._segments(shard, owner):
+                os.unlink(seg)
+            return False
+
+    def fail(self, shard, owner, error):
+        name = f'shard_{shard:05d}.json@{owner}'
+        try:
+            with open(self._path('claimed', name)) as f:
+                job = json.load(f)
+            job['error'] = error
+            _write_json(self._path('claimed', name), job)
+            os.rename(self._path('claimed', name), self._path('failed', name))
+        except FileNotFoundError:
+            pass  # requeued already
+
+    def _segments(self, shard, owner):
+        prefix = f'shard_{shard:05d}.{owner}.'
+        return sorted(os.path.join(self.segments, n) for n in os.listdir(self.segments)
+                      if n.startswith(prefix) and not n.endswith('.part'))
+
+    def requeue(self, stall=STALL_SECONDS, max_attempts=MAX_ATTEMPTS):
+        """Failed and stalled shards back to todo/; returns how many. Raises once one is out of attempts."""
+        now = time.time()
+        moved = 0
+        candidates = [('failed', n) for n in self._names('failed')]
+        for name in self._names('claimed'):
+            try:
+                if now - os.path.getmtime(self._path('claimed', name)) > stall:
+                    candidates.append(('claimed', name))
+            except FileNotFoundError:
+                pass  # finished meanwhile
+        for state, name in candidates:
+            base = name.split('@', 1)[0]
+            with open(self._path(state, name)) as f:
+                job = json.load(f)
+            if job['attempts'] + 1 >= max_attempts:
+                raise RuntimeError(f'{base} failed {max_attempts} times: {job.get("error", "stalled")}')
+            # taken out of `state` first, so a late finish() of a stalled worker loses the race cleanly
+            tmp = self._path('todo', f'.{base}.requeue')
+            try:
+                os.rename(self._path(state, name), tmp)
+            except FileNotFoundError:
+                continue
+            job['attempts'] += 1
+            job.pop('error', None)
+            _write_json(tmp, job)
+            os.rename(tmp, self._path('todo', base))
+            moved += 1
+            print(f'Requeued {base} ({"stalled" if state == "claimed" else "failed"}, attempt {job["attempts"] + 1})')
+        return moved
+
+    def status(self):
+        return {state: len(self._names(state)) for state in STATES}
+
+    def finished(self):
+        return self.status()['done'] >= self.spec()['shards']
+
+    def done_segments(self):
+        """Final segment paths per shard index, from the owners recorded in done/."""
+        segments = {}
+        for name in self._names('done'):
+            base, owner = name.split('@', 1)
+            shard = int(base[len('shard_'):-len('.json')])
+            segments[shard] = self._segments(shard, owner)
+        return [segments[i] for i in sorted(segments)]
+
+
+def _write_json(path, payload):
+    with open(path + '.part', 'w') as f:
+        json.dump(payload, f)
+    os.replace(path + '.part', path)
+
+
+# --- workers -------------------------------------------------------------
+
+def render_shard(spec, job, tmp_dir):
+    """Render one shard into tmp_dir; returns the segment files (store, plus MP4 for video clips)."""
+    from export_frames import save_frames
+    store = os.path.join(tmp_dir, f'shard_{job["index"]:05d}{STORE_EXT}')
+    # save_frames seeks the deterministic simulation to the shard's first frame
+    save_frames(n_frames=job['frames'], start_frame=job['start'], draft=spec['draft'], raster=spec['raster'],
+                out_dir=tmp_dir, store=store)
+    if not spec['video']:
+        return [store]
+    from encode_frames import encode
+    video = os.path.join(tmp_dir, f'shard_{job["index"]:05d}.mp4')
+    encode(FrameStore(store), video, spec['fps'], spec['gop'])
+    return [video]
+
+
+def work(queue, owner=None, idle_exit=False):
+    """Claim and render shards until the clip is finished (or, with idle_exit, the queue is empty)."""
+    owner = owner or worker_id()
+    spec = queue.spec()
+    rendered = 0
+    while True:
+        job = queue.claim(owner)
+        if job is None:
+            if idle_exit or queue.finished():
+                return rendered
+            # shards still out with other workers may come back through a requeue
+            time.sleep(POLL_SECONDS)
+            continue
+        shard = job['index']
+        alive = threading.Event()
+        alive.set()
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(HEARTBEAT):
+                if not queue.heartbeat(shard, owner):
+                    alive.clear()
+                    return
+
+        beater = threading.Thread(target=beat, name='heartbeat', daemon=True)
+        beater.start()
+        t0 = time.perf_counter()
+        try:
+            with tempfile.TemporaryDirectory(prefix='shard_') as tmp:
+                files = render_shard(spec, job, tmp)
+                if alive.is_set():
+                    for path in files:
+                        queue.upload(shard, owner, path)
+        except Exception:
+            stop.set()
+            queue.fail(shard, owner, traceback.format_exc())
+            print(f'shard {shard} failed')
+            continue
+        stop.set()
+        if alive.is_set() and queue.finish(shard, owner):
+            rendered += 1
+            print(f'shard {shard}: frames {job["start"]}..{job["start"] + job["frames"] - 1} '
+                  f'in {time.perf_counter() - t0:.1f}s')
+        else:
+            print(f'shard {shard} was requeued while rendering; result dropped')
+
+
+# --- coordinator -----------------------------------------------------------
+
+def merge(jobs, out=None):
+    """Assemble the finished segments into the clip's output."""
+    spec = jobs.spec()
+    out = out or spec['out']
+    parts = [p for paths in jobs.done_segments() for p in paths]
+    if spec['video']:
+        from encode_frames import concat
+        concat(parts, out)
+    else:
+        concat_stores(parts, out)
+    return out
+
+
+def coordinate(jobs, out=None, poll=POLL_SECONDS, stall=STALL_SECONDS, max_attempts=MAX_ATTEMPTS):
+    """Requeue failed and stalled shards until all are done, then merge; returns the output path."""
+    last = None
+    while not jobs.finished():
+        jobs.requeue(stall, max_attempts)
+        status = jobs.status()
+        if status != last:
+            print('  '.join(f'{k}: {v}' for k, v in status.items()))
+            last = status
+        time.sleep(poll)
+    out = merge(jobs, out)
+    print('Wrote', out)
+    return out
+
+
+# --- HTTP stand-in queue -----------------------------------------------------
+
+CALLS = ('spec', 'claim', 'heartbeat', 'finish', 'fail', 'status', 'finished')
+
+
+class QueueHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    jobs = None
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        call = self.path.strip('/')
+        if call not in CALLS:
+            self._reply(404, {'error': 'not found'})
+            return
+        try:
+            args = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            self._reply(200, {'result': getattr(self.jobs, call)(**args)})
+        except Exception as e:
+            self._reply(500, {'error': f'{type(e).__name__}: {e}'})
+
+    def do_PUT(self):
+        # /segments/<shard>/<owner>/<file name>: the body is streamed into a temp file, then filed
+        try:
+            _, shard, owner, name = (unquote(p) for p in self.path.strip('/').split('/'))
+            remaining = int(self.headers.get('Content-Length', 0))
+            with tempfile.TemporaryDirectory(dir=self.jobs.segments) as tmp:
+                path = os.path.join(tmp, os.path.basename(name))
+                with open(path, 'wb') as f:
+                    while remaining:
+                        chunk = self.rfile.read(min(remaining, 1 << 20))
+                        if not chunk:
+                            raise ConnectionError('upload cut short')
+                        f.write(chunk)
+                        remaining -= len(chunk)
+                self._reply(200, {'result': self.jobs.upload(int(shard), owner, path)})
+        except Exception as e:
+            self._reply(500, {'error': f'{type(e).__name__}: {e}'})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(jobs, port=DEFAULT_PORT, host='0.0.0.0'):
+    """Serve `jobs` on a daemon thread; returns (server, url)."""
+    handler = type('JobHandler', (QueueHandler,), {'jobs': jobs})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{socket.gethostname() if host == "0.0.0.0" else host}:{server.server_address[1]}'
+
+
+class RemoteQueue:
+    """JobDir's worker-side operations against `serve`; segments are uploaded instead of copied."""
+
+    def __init__(self, url, timeout=60):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or DEFAULT_PORT
+        self.timeout = timeout
+
+    def _request(self, method, path, body, headers):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            reply = json.loads(conn.getresponse().read())
+        finally:
+            conn.close()
+        if 'error' in reply:
+            raise RuntimeError(reply['error'])
+        return reply['result']
+
+    def _call(self, name, **args):
+        return self._request('POST', '/' + name, json.dumps(args), {'Content-Type': 'application/json'})
+
+    def spec(self):
+        return self._call('spec')
+
+    def claim(self, owner):
+        return self._call('claim', owner=owner)
+
+    def heartbeat(self, shard, owner):
+        try:
+            return self._call('heartbeat', shard=shard, owner=owner)
+        except OSError:
+            # an unreachable queue is not a lost shard; the coordinator decides on stalls
+            return True
+
+    def upload(self, shard, owner, path):
+        with open(path, 'rb') as f:
+            return self._request('PUT', '/'.join(['', 'segments', str(shard), quote(owner, safe=''),
+                                                  quote(os.path.basename(path), safe='')]),
+                                 f, {'Content-Length': str(os.path.getsize(path))})
+
+    def finish(self, shard, owner):
+        return self._call('finish', shard=shard, owner=owner)
+
+    def fail(self, shard, owner, error):
+        return self._call('fail', shard=shard, owner=owner, error=error)
+
+    def finished(self):
+        return self._call('finished')
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Render one clip as shards across machines')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('submit', help='Create a job directory with one job per shard')
+    p.add_argument('jobdir')
+    p.add_argument('--frames', type=int, default=200, help='Number of simulation frames')
+    p.add_argument('--start', type=int, default=0, help='First simulation frame')
+    p.add_argument('--shard-frames', type=int, default=200, help='Simulation frames per shard (rounded to whole GOPs for video)')
+    p.add_argument('--draft', action='store_true', help='Draft quality preset')
+    p.add_argument('--raster', action='store_true', help='Render with the NumPy compositor (see export_frames.py)')
+    p.add_argument('--out', default=None, help='Final .mp4/.mkv or .rfs (default: jobdir/clip.rfs)')
+    p = sub.add_parser('work', help='Claim and render shards until the clip is done')
+    p.add_argument('jobdir', nargs='?', default=None)
+    p.add_argument('--queue', metavar='URL', default=None, help='Use a `serve` queue instead of a shared directory')
+    p.add_argument('--idle-exit', action='store_true', help='Stop as soon as no shard is waiting')
+    p = sub.add_parser('coordinate', help='Requeue failed/stalled shards, then merge the segments')
+    p.add_argument('jobdir')
+    p.add_argument('--out', default=None, help='Override the output given at submit')
+    p.add_argument('--stall', type=float, default=STALL_SECONDS, help='Seconds without a heartbeat before a requeue')
+    p.add_argument('--serve', type=int, metavar='PORT', default=None, help='Also serve the queue over HTTP')
+    p = sub.add_parser('status', help='Shard counts per state')
+    p.add_argument('jobdir')
+    args = parser.parse_args()
+
+    if args.cmd == 'submit':
+        jobs = JobDir.create(args.jobdir, args.frames, args.shard_frames, args.start, args.draft, args.raster, args.out)
+        print(f'{jobs.spec()["shards"]} shards in {args.jobdir}')
+    elif args.cmd == 'work':
+        if not args.queue and not args.jobdir:
+            parser.error('work needs a job directory or --queue')
+        queue = RemoteQueue(args.queue) if args.queue else JobDir(args.jobdir)
+        print('Rendered', work(queue, idle_exit=args.idle_exit), 'shards')
+    elif args.cmd == 'coordinate':
+        jobs = JobDir(args.jobdir)
+        if args.serve is not None:
+            print('Serving the queue at', serve(jobs, args.serve)[1])
+        coordinate(jobs, args.out, stall=args.stall)
+    else:
+        print(JobDir(args.jobdir).status())
@@ -0,0 +1,257 @@
+"""Seekable ripple simulation shared by the viewer and the exporters.
+
+The ripple state that used to live in closures inside `main.py` and
+`export_frames.py` is kept here in flat numpy arrays, together with the
+spawn counters and the RNG state. Every `snapshot_every` frames a compact
+copy of that state is stored, so seeking to any frame restores the nearest
+earlier snapshot and replays at most `snapshot_every` steps.
+
+The step semantics match `main.Ripple.step` exactly (same float64
+arithmetic), so switching a renderer to this class does not change output.
+"""
+import bisect
+import math
+import numpy as np
+
+import kernels
+from spatial import RippleGrid
+from weather import wind_components
+
+
+SIM_SEED = 923
+
+# spawn and growth parameters (axis fraction units, see main.Ripple)
+R0 = 0.02
+GROW = 0.008
+FADE = 0.006
+ALPHA0 = 0.95
+MIN_ALPHA = 0.02
+SPAWN_EVERY = 5
+SPAWN_BATCH = 6
+JITTER = 0.03
+WIND_NUDGE = 0.02
+MARGIN = 0.06
+# at most this many live ripples may cover a spawn cell before spawning
+# moves on to the least-filled cell instead (bounds overdraw during storms)
+MAX_PER_CELL = 4
+
+# per-ripple arrays that make up the live state
+FIELDS = ('x', 'y', 'r', 'alpha', 'rain')
+
+
+def max_ripple_radius(max_area_frac=1.0 / 20.0):
+    # circle area = pi * r^2 ; limit each ripple to max_area_frac of the axes
+    return float(np.sqrt(max_area_frac / math.pi))
+
+
+def spawn_grid(max_r):
+    """Evenly spaced spawn positions, at least 2*max_r apart (capped at 8x6)."""
+    span = 1.0 - 2 * MARGIN
+    min_spacing = 2.0 * max_r
+    max_cols = max(1, int(np.floor(span / min_spacing)) + 1)
+    max_rows = max(1, int(np.floor(span / min_spacing)) + 1)
+    cols = min(8, max_cols)
+    rows = min(6, max_rows)
+    xs = np.linspace(MARGIN, 1 - MARGIN, cols)
+    ys = np.linspace(MARGIN, 1 - MARGIN, rows)
+    gx, gy = np.meshgrid(xs, ys)
+    return np.column_stack([gx.ravel(), gy.ravel()])
+
+
+def rain_colors(rain):
+    """Vectorized `main.color_from_rain`: rainfall (mm) -> (N, 3) RGB floats."""
+    v = np.clip(np.asarray(rain, dtype=float) / 30.0, 0.0, 1.0)[:, None]
+    low = np.array([0.35, 0.75, 0.95])
+    mid = np.array([0.0, 0.6, 0.95])
+    high = np.array([1.0, 0.65, 0.0])
+    t_low = v / 0.5
+    t_high = (v - 0.5) / 0.5
+    return np.where(v < 0.5, low * (1 - t_low) + mid * t_low, mid * (1 - t_high) + high * t_high)
+
+
+class RippleSimulation:
+    """Deterministic ripple state machine driven by a weather data dict."""
+
+    def __init__(self, data, seed=SIM_SEED, snapshot_every=250, max_r=None, max_per_cell=MAX_PER_CELL,
+                 spawner=None):
+        # spawner(sim) replaces the grid spawner (e.g. stations.StationSpawner)
+        self.spawner = spawner
+        # on_spawn(sim, x, y, rain) sees every spawned batch (e.g. timeline.SpawnTable)
+        self.on_spawn = None
+        self.data = data
+        self.seed = seed
+        self.snapshot_every = max(1, int(snapshot_every))
+        self.max_r = max_ripple_radius() if max_r is None else float(max_r)
+        self.grid = spawn_grid(self.max_r)
+        self.max_per_cell = max_per_cell
+        self.index = RippleGrid()
+        self._snapshots = {}
+        self._snapshot_frames = []
+        self.reset()
+
+    def reset(self):
+        self.frame = 0
+        self.sample = 0
+        self.cursor = 0
+        self.rng = np.random.RandomState(self.seed)
+        for name in FIELDS:
+            setattr(self, name, np.zeros(0))
+        self._record()
+
+    def __len__(self):
+        return len(self.r)
+
+    def _spawn(self, count):
+        n = len(self.data['rain'])
+        idx = (self.sample + np.arange(count)) % n
+        rain = np.asarray(self.data['rain'], dtype=float)[idx]
+        wind_sin, wind_cos = wind_components(self.data, idx)
+        pos = self._spawn_positions(count)
+        self.spawn_at(pos[:, 0], pos[:, 1], rain, wind_sin, wind_cos)
+        self.sample += count
+        self.cursor += count
+
+    def spawn_at(self, x, y, rain, wind_sin, wind_cos):
+        """Spawn one ripple per position with jitter and a wind nudge (sin/cos of the direction)."""
+        count = len(x)
+        # rand(count, 2) draws x, y pairs in the same order as per-ripple rand() calls
+        jitter = (self.rng.rand(count, 2) - 0.5) * JITTER
+        x = np.clip(x + jitter[:, 0] + WIND_NUDGE * np.asarray(wind_cos, dtype=float), 0.02, 0.98)
+        y = np.clip(y + jitter[:, 1] + WIND_NUDGE * np.asarray(wind_sin, dtype=float), 0.02, 0.98)
+        self._append(x, y, np.full(count, R0), np.full(count, ALPHA0), np.asarray(rain, dtype=float))
+
+    def _spawn_positions(self, count):
+        slots = (self.cursor + np.arange(count)) % len(self.grid)
+        if self.max_per_cell is None:
+            return self.grid[slots]
+        self.index.rebuild(self.x, self.y, self.r)
+        occ = self.index.occupancy(self.grid[:, 0], self.grid[:, 1]).astype(int)
+        for k, s in enumerate(slots):
+            if occ[s] >= self.max_per_cell:
+                # least-filled cell, scanning from the round-robin slot so ties spread out
+                order = (s + np.arange(len(self.grid))) % len(self.grid)
+                s = order[np.argmin(occ[order])]
+                slots[k] = s
+            occ[s] += 1
+        return self.grid[slots]
+
+    def _append(self, x, y, r, alpha, rain):
+        if self.on_spawn is not None:
+            self.on_spawn(self, x, y, rain)
+        self.x = np.concatenate([self.x, x])
+        self.y = np.concatenate([self.y, y])
+        self.r = np.concatenate([self.r, r])
+        self.alpha = np.concatenate([self.alpha, alpha])
+        self.rain = np.concatenate([self.rain, rain])
+
+    def step(self):
+        """Advance one frame: spawn on schedule, grow/fade, drop dead ripples."""
+        if self.frame % SPAWN_EVERY == 0:
+            if self.spawner is not None:
+                self.spawner(self)
+            else:
+                self._spawn(SPAWN_BATCH)
+        # in place: r and alpha handed out earlier change with every step; snapshots and
+        # restores copy, and callers that keep a frame's arrays must copy them too (export_web)
+        alive = kernels.step_ripples(self.r, self.alpha, GROW, FADE, MIN_ALPHA, self.max_r)
+        if not alive.all():
+            for name in FIELDS:
+                setattr(self, name, getattr(self, name)[alive])
+        self.frame += 1
+        if self.frame % self.snapshot_every == 0:
+            self._record()
+
+    def advance(self, steps):
+        for _ in range(int(steps)):
+            self.step()
+
+    def rgba(self):
+        """(N, 4) edge colours of the live ripples in draw order."""
+        out = np.empty((len(self.r), 4))
+        out[:, :3] = rain_colors(self.rain)
+        out[:, 3] = np.maximum(0.0, self.alpha)
+        return out
+
+    def spawn_frames(self):
+        """Frame each live ripple was spawned on, recovered from how far it has faded."""
+        return self.frame - np.rint((ALPHA0 - self.alpha) / FADE).astype(np.int64)
+
+    def current_sample(self):
+        return self.sample % len(self.data['rain'])
+
+    def set_data(self, data, valid_samples=0):
+        """Switch to `data`, whose first `valid_samples` samples equal the current data's.
+
+        Snapshots that consumed no more than that are still exact and are
+        kept. If the simulation has already read past them (e.g. a preview
+        that wrapped around), the later snapshots are dropped and the
+        current frame is replayed on the new data from the last valid one.
+        """
+        self.data = data
+        stale = [f for f in self._snapshot_frames if self._snapshots[f]['sample'] > valid_samples]
+        for f in stale:
+            del self._snapshots[f]
+        self._snapshot_frames = [f for f in self._snapshot_frames if f in self._snapshots]
+        if self.sample <= valid_samples:
+            return
+        # the live ripples (not only the snapshots) were spawned from samples that differ
+        frame = self.frame
+        self.restore(self._snapshots[self._snapshot_frames[-1]])
+        self.advance(frame - self.frame)
+
+    # --- snapshots -------------------------------------------------------
+
+    def snapshot(self):
+        """Compact copy of the full state at the current frame."""
+        snap = {name: getattr(self, name).copy() for name in FIELDS}
+        snap.update(frame=self.frame, sample=self.sample, cursor=self.cursor,
+                    rng=self.rng.get_state())
+        return snap
+
+    def restore(self, snap):
+        for name in FIELDS:
+            setattr(self, name, snap[name].copy())
+        self.frame = snap['frame']
+        self.sample = snap['sample']
+        self.cursor = snap['cursor']
+        self.rng.set_state(snap['rng'])
+
+    def _record(self):
+        if self.frame in self._snapshots:
+            return
+        self._snapshots[self.frame] = self.snapshot()
+        bisect.insort(self._snapshot_frames, self.frame)
+
+    def seek(self, frame):
+        """Jump to `frame`, replaying from the nearest snapshot at or before it."""
+        frame = max(0, int(frame))
+        i = bisect.bisect_right(self._snapshot_frames, frame) - 1
+        base = self._snapshot_frames[i]
+        # stepping forward from where we are is cheaper than any older snapshot
+        if not (base <= self.frame <= frame):
+            self.restore(self._snapshots[base])
+        self.advance(frame - self.frame)
+
+    def save_snapshots(self, path):
+        """Write all recorded snapshots to an .npz so other processes can seek."""
+        payload = {}
+        for f in self._snapshot_frames:
+            snap = self._snapshots[f]
+            for name in FIELDS:
+                payload[f'{f}/{name}'] = snap[name]
+            payload[f'{f}/counters'] = np.array([snap['frame'], snap['sample'], snap['cursor']])
+            payload[f'{f}/rng_keys'] = snap['rng'][1]
+            payload[f'{f}/rng_extra'] = np.array([snap['rng'][2], snap['rng'][3], snap['rng'][4]])
+        np.savez_compressed(path, frames=np.array(self._snapshot_frames), **payload)
+
+    def load_snapshots(self, path):
+        with np.load(path) as z:
+            for f in z['frames'].tolist():
+                frame, sample, cursor = z[f'{f}/counters'].tolist()
+                pos, has_gauss, cached = z[f'{f}/rng_extra'].tolist()
+                snap = {name: z[f'{f}/{name}'] for name in FIELDS}
+                snap.update(frame=frame, sample=sample, cursor=cursor,
+                            rng=('MT19937', z[f'{f}/rng_keys'], int(pos), int(has_gauss), cached))
+                self._snapshots[f] = snap
+                if f not in self._snapshot_frames:
+                    bisect.insort(self._snapshot_frames, f)
@@ -0,0 +1,48 @@
+"""Uniform-grid spatial index over live ripples.
+
+The grid splits the unit square (axis fraction coordinates) into
+`cols` x `rows` cells and keeps, per cell, the number of live ripples whose
+bounding box covers it. Rebuilding is a vectorized 2-D difference array, so
+it costs O(ripples + cells); occupancy queries are a single array lookup.
+
+Spawning uses it to pick an under-filled cell instead of blindly cycling
+round-robin into a cell that is already crowded (see
+simulation.RippleSimulation). It is deliberately not used to cull rings
+at render time: a ring covers only a thin annulus of any cell it touches,
+so cell-level opacity says nothing about whether the ring shows.
+"""
+import numpy as np
+
+
+class RippleGrid:
+    def __init__(self, cols=16, rows=16):
+        self.cols = int(cols)
+        self.rows = int(rows)
+        self.counts = np.zeros((self.rows, self.cols), dtype=np.int32)
+
+    def cell_of(self, x, y):
+        """Column/row of the cell containing each point (clipped to the grid)."""
+        i = np.clip((np.asarray(x) * self.cols).astype(int), 0, self.cols - 1)
+        j = np.clip((np.asarray(y) * self.rows).astype(int), 0, self.rows - 1)
+        return i, j
+
+    def _ranges(self, x, y, r):
+        i0, j0 = self.cell_of(np.asarray(x) - r, np.asarray(y) - r)
+        i1, j1 = self.cell_of(np.asarray(x) + r, np.asarray(y) + r)
+        return i0, i1, j0, j1
+
+    def rebuild(self, x, y, r):
+        """Recount coverage from scratch for the given ripple arrays."""
+        diff = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int32)
+        if len(x):
+            i0, i1, j0, j1 = self._ranges(x, y, r)
+            np.add.at(diff, (j0, i0), 1)
+            np.add.at(diff, (j0, i1 + 1), -1)
+            np.add.at(diff, (j1 + 1, i0), -1)
+            np.add.at(diff, (j1 + 1, i1 + 1), 1)
+        self.counts = diff.cumsum(axis=0).cumsum(axis=1)[:self.rows, :self.cols]
+
+    def occupancy(self, x, y):
+        """Number of live ripples covering the cell at (x, y); O(1) per point."""
+        i, j = self.cell_of(x, y)
+        return self.counts[j, i]
@@ -0,0 +1,142 @@
+"""Multi-station geo-projected ripple mode.
+
+Ripples are placed at real station coordinates instead of the spawn grid.
+All station series are held as (stations, time) float32 arrays and advanced
+together, one column per spawn event, and the lat/lon -> axis-fraction
+projection is computed once per station set and map bounding box and
+cached as an .npy next to the map assets. Nothing here needs Basemap:
+a spherical Web Mercator is a few lines of numpy, and for a city-sized
+map it is indistinguishable from what Basemap would draw.
+
+Station CSVs are long format: `station,lat,lon,time,rain,wind_dir`
+(optional `rh`, `temp`). Without one, `synthetic_network` derives a
+plausible network from a single weather series.
+"""
+import os
+import hashlib
+import numpy as np
+
+import assets
+from simulation import SPAWN_BATCH
+from weather import WeatherSeries, clean
+
+
+# approximate lon/lat extent of Kyoto_rain_art/Kyoto_map.jpg (west, east, south, north)
+KYOTO_MAP_BBOX = (135.62, 135.86, 34.92, 35.10)
+KYOTO_LAT, KYOTO_LON = 35.0116, 135.7681
+SERIES = ('rain', 'wind_dir', 'rh', 'temp')
+
+
+def mercator(lat, lon):
+    lam = np.radians(lon)
+    phi = np.radians(np.clip(lat, -85.0, 85.0))
+    return lam, np.log(np.tan(np.pi / 4 + phi / 2))
+
+
+def project(lat, lon, bbox=KYOTO_MAP_BBOX):
+    """Lat/lon -> (x, y) axis fractions of the map (y up, like the axes)."""
+    west, east, south, north = bbox
+    x, y = mercator(np.asarray(lat, dtype=float), np.asarray(lon, dtype=float))
+    x0, y0 = mercator(south, west)
+    x1, y1 = mercator(north, east)
+    return np.column_stack([(x - x0) / (x1 - x0), (y - y0) / (y1 - y0)])
+
+
+def cached_projection(lat, lon, bbox=KYOTO_MAP_BBOX):
+    """`project`, memoized on disk by station coordinates and bounding box."""
+    key = hashlib.sha1(np.asarray(lat, dtype=float).tobytes() + np.asarray(lon, dtype=float).tobytes()
+                       + np.asarray(bbox, dtype=float).tobytes()).hexdigest()[:16]
+    path = os.path.join(assets.CACHE_DIR, f'proj_{key}.npy')
+    if os.path.exists(path):
+        return np.load(path)
+    xy = project(lat, lon, bbox)
+    os.makedirs(assets.CACHE_DIR, exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp.npy'
+    np.save(tmp, xy)
+    os.replace(tmp, path)
+    return xy
+
+
+class StationNetwork:
+    """Station coordinates plus (stations, time) weather arrays."""
+
+    def __init__(self, names, lat, lon, series):
+        self.names = list(names)
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        # float32 and validated per station, like a WeatherSeries
+        self.series = {k: np.stack([clean(k, row) for row in np.atleast_2d(series[k])]) for k in SERIES}
+        # spawners read the wind as precomputed components, never per-sample trig
+        rad = np.radians(self.series['wind_dir'])
+        self.wind_sin = np.sin(rad)
+        self.wind_cos = np.cos(rad)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def steps(self):
+        return self.series['rain'].shape[1]
+
+    def mean_data(self):
+        """Network-average series as a `WeatherSeries` (for the overlay)."""
+        return WeatherSeries(**{k: np.mean(v, axis=0) for k, v in self.series.items()})
+
+
+def load_station_csv(path):
+    import pandas as pd
+    df = pd.read_csv(path)
+    df.columns = [c.strip().lower() for c in df.columns]
+    for k in SERIES:
+        if k not in df.columns:
+            df[k] = 0.0
+    meta = df.groupby('station')[['lat', 'lon']].first()
+    series = {k: df.pivot_table(index='station', columns='time', values=k).reindex(meta.index)
+              .fillna(0).to_numpy() for k in SERIES}
+    return StationNetwork(meta.index, meta['lat'], meta['lon'], series)
+
+
+def synthetic_network(data, n=64, bbox=KYOTO_MAP_BBOX, seed=35):
+    """Scatter `n` stations over the bbox; each sees `data` lagged west to east."""
+    rng = np.random.RandomState(seed)
+    west, east, south, north = bbox
+    lon = rng.uniform(west, east, n)
+    lat = rng.uniform(south, north, n)
+    steps = len(data['rain'])
+    # weather moves eastward: stations further east see it a few samples later
+    lag = np.round((lon - west) / (east - west) * 6).astype(int)
+    idx = (np.arange(steps)[None, :] - lag[:, None]) % steps
+    series = {}
+    for k in SERIES:
+        base = np.asarray(data[k], dtype=float)[idx]
+        series[k] = base * rng.uniform(0.7, 1.3, (n, 1)) if k == 'rain' else base
+    return StationNetwork([f'S{i:03d}' for i in range(n)], lat, lon, series)
+
+
+class StationSpawner:
+    """Spawner hook for RippleSimulation placing ripples at station positions.
+
+    At each spawn event the current time column of every station is read in
+    one slice; raining stations spawn first (heaviest rain first, up to
+    `max_per_event`), then the batch is topped up round-robin so dry spells
+    still show gentle ripples.
+    """
+
+    def __init__(self, network, bbox=KYOTO_MAP_BBOX, batch=SPAWN_BATCH, max_per_event=None):
+        self.network = network
+        self.xy = cached_projection(network.lat, network.lon, bbox)
+        self.batch = batch
+        self.max_per_event = max_per_event or max(batch, len(network) // 4)
+
+    def __call__(self, sim):
+        t = sim.sample % self.network.steps
+        rain = self.network.series['rain'][:, t]
+        wet = np.flatnonzero(rain > 0)
+        wet = wet[np.argsort(-rain[wet], kind='stable')][:self.max_per_event]
+        fill = max(0, self.batch - len(wet))
+        rr = (sim.cursor + np.arange(fill)) % len(self.network)
+        chosen = np.concatenate([wet, rr]).astype(int)
+        sim.spawn_at(self.xy[chosen, 0], self.xy[chosen, 1], rain[chosen],
+                     self.network.wind_sin[chosen, t], self.network.wind_cos[chosen, t])
+        sim.sample += 1
+        sim.cursor += fill
@@ -0,0 +1,156 @@
+"""Incremental tail-follow reader for growing Open-Meteo style CSV exports.
+
+The exports are several blank-line separated sections (location metadata,
+`current`, `hourly`), each with its own header row, and the collector keeps
+appending rows to the last one during the day. `load_data` re-parses the
+whole file to pick those up; `TailFollowReader.refresh()` instead seeks to
+the byte offset it stopped at, parses only the newly appended complete
+lines and appends them to per-section columnar arrays (amortized doubling,
+so appends are O(new rows)).
+
+`reader.data` is a dict in the same shape `main.load_data` returns
+('rain', 'wind_dir', 'rh', 'temp'); it is updated in place on every
+refresh, so a running simulation sees the new samples without being
+rebuilt. Callbacks registered with `subscribe` are told how many rows
+arrived.
+"""
+import os
+import numpy as np
+
+
+# column candidates, first match wins (case-insensitive substring)
+COLUMNS = {
+    'rain': ['rain', 'precip', 'precipitation'],
+    'wind_dir': ['wind_direction', 'winddir', 'wind_dir'],
+    'rh': ['relative_humidity', 'humidity', 'rh'],
+    'temp': ['temperature', 'temp', 'air_temperature'],
+}
+
+
+class Section:
+    """One header + rows block of the CSV, stored column-wise."""
+
+    def __init__(self, header, offset):
+        self.header = header
+        self.offset = offset  # byte offset of the header line
+        self.end = offset     # byte offset just past the last parsed row
+        self.n = 0
+        self._cols = np.zeros((len(header), 64))
+
+    def append(self, rows):
+        need = self.n + len(rows)
+        if need > self._cols.shape[1]:
+            grown = np.zeros((len(self.header), max(need, 2 * self._cols.shape[1])))
+            grown[:, :self.n] = self._cols[:, :self.n]
+            self._cols = grown
+        # NaN -> 0 like load_data, done once here so reads stay zero-copy views
+        self._cols[:, self.n:need] = np.nan_to_num(np.array(rows, dtype=float).T)
+        self.n = need
+
+    def column(self, i):
+        return self._cols[i, :self.n]
+
+    def find(self, candidates):
+        lower = [h.lower() for h in self.header]
+        for cand in candidates:
+            for i, name in enumerate(lower):
+                if cand in name:
+                    return i
+        return None
+
+
+def _to_float(field):
+    try:
+        return float(field)
+    except ValueError:
+        # timestamps and blanks are not numeric
+        return np.nan
+
+
+class TailFollowReader:
+    def __init__(self, path):
+        self.path = path
+        self.sections = []
+        self.data = {}
+        self._listeners = []
+        self._size = 0
+        self._reset()
+        self.refresh()
+
+    def subscribe(self, callback):
+        """Call `callback(reader, new_rows)` after every refresh that added rows."""
+        self._listeners.append(callback)
+
+    def _reset(self):
+        self.sections = []
+        self._offset = 0
+        self._expect_header = True
+
+    def refresh(self):
+        """Parse bytes appended since the last call; returns the number of new rows."""
+        if not os.path.exists(self.path):
+            return 0
+        size = os.path.getsize(self.path)
+        if size < self._size:
+            # truncated or rotated: start over
+            self._reset()
+        self._size = size
+        if size == self._offset:
+            return 0
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        # only consume complete lines; a half-written row is picked up next time
+        cut = chunk.rfind(b'\n') + 1
+        if cut == 0:
+            return 0
+
+        pending = {}
+        pos = self._offset
+        for raw in chunk[:cut].splitlines(keepends=True):
+            line = raw.decode('utf-8').strip()
+            start = pos
+            pos += len(raw)
+            if not line:
+                # a blank line closes the section; the next line is a header
+                self._expect_header = True
+                continue
+            fields = [p.strip() for p in line.split(',')]
+            if self._expect_header or not self.sections:
+                self.sections.append(Section(fields, start))
+                self.sections[-1].end = pos
+                self._expect_header = False
+                continue
+            current = self.sections[-1]
+            if len(fields) != len(current.header):
+                continue  # malformed row
+            pending.setdefault(id(current), (current, []))[1].append([_to_float(v) for v in fields])
+            current.end = pos
+        self._offset += cut
+
+        added = 0
+        for section, rows in pending.values():
+            section.append(rows)
+            added += len(rows)
+        self._update_data()
+        if added:
+            for cb in self._listeners:
+                cb(self, added)
+        return added
+
+    def main_section(self):
+        """The time-indexed section with the most columns (same rule as load_data)."""
+        timed = [s for s in self.sections if s.header[0].lower() == 'time' and s.n]
+        return max(timed, key=lambda s: len(s.header)) if timed else None
+
+    def _update_data(self):
+        sec = self.main_section()
+        if sec is None:
+            return
+        for key, candidates in COLUMNS.items():
+            i = sec.find(candidates)
+            self.data[key] = sec.column(i) if i is not None else np.zeros(sec.n)
+
+    def index(self):
+        """Byte-offset index: (header, first byte, end byte, rows) per section."""
+        return [(s.header, s.offset, s.end, s.n) for s in self.sections]
@@ -0,0 +1,31 @@
+"""FrameBudget degrading and restoring quality steps."""
+from budget import FrameBudget
+
+
+def test_degrades_over_budget_and_restores_with_headroom():
+    budget = FrameBudget(0.01, window=3)
+    assert [budget.record(0.02) for _ in range(3)] == [False, False, True]
+    assert budget.level == 1 and budget.active('clouds') and not budget.active('antialias')
+    assert budget.label() == '-1 (low cloud detail)'
+    # the new level is judged on its own frames only
+    assert budget.average() == 0.0
+    assert [budget.record(0.001) for _ in range(3)] == [False, False, True]
+    assert budget.level == 0 and budget.label() == 'full'
+
+
+def test_holds_between_headroom_and_budget():
+    budget = FrameBudget(0.01, window=2, headroom=0.6)
+    for _ in range(4):
+        assert not budget.record(0.008)
+    assert budget.level == 0
+
+
+def test_level_stays_within_the_steps():
+    budget = FrameBudget(0.01, steps=('ripples', 'spawn'), window=1)
+    for _ in range(5):
+        budget.record(1.0)
+    assert budget.level == 2 and budget.active('spawn') and not budget.active('clouds')
+    assert budget.label() == '-2 (sparse spawns)'
+    for _ in range(5):
+        budget.record(0.0)
+    assert budget.level == 0
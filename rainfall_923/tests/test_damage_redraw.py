@@ -0,0 +1,46 @@
+"""DamageRedraw frames against full matplotlib canvas draws."""
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+import main as m
+from overlay import OverlayCompositor
+from simulation import RippleSimulation
+
+
+def _scene(quality):
+    fig, ax = plt.subplots(figsize=(4, 3), dpi=quality['dpi'])
+    ax.set_facecolor('#000000')
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.set_xticks([])
+    ax.set_yticks([])
+    return fig, ax, m.RippleLayer(ax, quality)
+
+
+def test_matches_full_draws():
+    quality = m.render_quality(dpi=80)
+    fig, ax, layer = _scene(quality)
+    fig2, _, layer2 = _scene(quality)
+    redraw = m.DamageRedraw(fig2, layer2)
+    overlay = OverlayCompositor(['Rain: {rain:.2f} mm'], fontsize=8, dpi=quality['dpi'])
+    box = (200, 180, 200 + overlay.width, 180 + overlay.height)
+    data = m.load_data(None)
+    sim, sim2 = RippleSimulation(data), RippleSimulation(data)
+    damaged = []
+    for frame in range(80):
+        sim.step()
+        sim2.step()
+        values = {'rain': data['rain'][sim.current_sample()]}
+        layer.update(sim)
+        fig.canvas.draw()
+        full = np.asarray(fig.canvas.buffer_rgba()).copy()
+        overlay.blit(full, values, *box[:2])
+        buf = redraw.draw(sim2, extra=[box])
+        overlay.blit(buf, values, *box[:2])
+        assert np.array_equal(buf, full), frame
+        damaged.append(redraw.damaged_pixels)
+    assert min(damaged) < buf.shape[0] * buf.shape[1]
+    plt.close(fig)
+    plt.close(fig2)
@@ -0,0 +1,74 @@
+"""Writing and reading frame stores."""
+import os
+
+import numpy as np
+import pytest
+
+import frame_store
+from frame_store import FrameWriter, FrameStore
+
+
+def _frames(n=5, h=12, w=16, c=3, seed=3):
+    return np.random.RandomState(seed).randint(0, 256, (n, h, w, c)).astype(np.uint8)
+
+
+@pytest.mark.parametrize('codec', ['raw', 'zlib'])
+def test_round_trip(tmp_path, codec):
+    path = str(tmp_path / ('clip' + frame_store.EXT))
+    frames = _frames()
+    with FrameWriter(path, 16, 12, codec=codec, fps=12.5) as w:
+        for i, f in enumerate(frames):
+            w.append(f, frame_id=4 * i)
+    store = FrameStore(path)
+    assert len(store) == len(frames) and store.shape == (12, 16, 3)
+    assert store.codec == codec and store.fps == 12.5
+    for i, f in enumerate(frames):
+        assert np.array_equal(store[i], f)
+    assert np.array_equal(store[store.find(8)], frames[2])
+    with pytest.raises(KeyError):
+        store.find(5)
+    assert [np.array_equal(a, b) for a, b in zip(store[1:3], frames[1:3])] == [True, True]
+    store.close()
+
+
+def test_rgba_into_rgb_store(tmp_path):
+    path = str(tmp_path / 'clip.rfs')
+    rgba = _frames(1, c=4)[0]
+    with FrameWriter(path, 16, 12) as w:
+        w.append(rgba)
+        with pytest.raises(ValueError):
+            w.append(rgba[:6])
+    assert np.array_equal(FrameStore(path)[0], rgba[..., :3])
+
+
+def test_failed_export_leaves_nothing(tmp_path):
+    path = str(tmp_path / 'clip.rfs')
+    with pytest.raises(RuntimeError):
+        with FrameWriter(path, 16, 12) as w:
+            w.append(_frames(1)[0])
+            raise RuntimeError('render failed')
+    assert os.listdir(tmp_path) == []
+
+
+def test_concat_keeps_frames_and_ids(tmp_path):
+    frames = _frames(6)
+    parts = []
+    for k in range(2):
+        parts.append(str(tmp_path / f'part{k}.rfs'))
+        with FrameWriter(parts[-1], 16, 12) as w:
+            for i in range(3 * k, 3 * k + 3):
+                w.append(frames[i], frame_id=10 + i)
+    out = frame_store.concat(parts, str(tmp_path / 'all.rfs'))
+    store = FrameStore(out)
+    assert store.frame_ids.tolist() == list(range(10, 16))
+    assert all(np.array_equal(store[i], frames[i]) for i in range(6))
+
+
+def test_concat_rejects_mismatched_stores(tmp_path):
+    a, b = str(tmp_path / 'a.rfs'), str(tmp_path / 'b.rfs')
+    with FrameWriter(a, 16, 12) as w:
+        w.append(_frames(1)[0])
+    with FrameWriter(b, 16, 12, codec='raw') as w:
+        w.append(_frames(1)[0])
+    with pytest.raises(ValueError):
+        frame_store.concat([a, b], str(tmp_path / 'out.rfs'))
@@ -0,0 +1,102 @@
+"""Parity of the NumPy and Numba kernels, and of stepping with the old Ripple.step."""
+import numpy as np
+import pytest
+
+import kernels
+import main as m
+from simulation import RippleSimulation, GROW, FADE, MIN_ALPHA, max_ripple_radius
+
+
+def _jit():
+    pytest.importorskip('numba')
+    import kernels_jit
+    return kernels_jit
+
+
+def _pool(n=400, seed=41):
+    rng = np.random.RandomState(seed)
+    max_r = max_ripple_radius()
+    return rng.uniform(0.0, max_r, n), rng.uniform(0.1, 0.95, n), max_r
+
+
+def _rings(seed=7, n=40, h=96, w=128):
+    rng = np.random.RandomState(seed)
+    x = rng.uniform(-20, w + 20, n).astype(np.float32)
+    y = rng.uniform(-20, h + 20, n).astype(np.float32)
+    rx = rng.uniform(0.5, 60, n).astype(np.float32)
+    ry = (rx * rng.uniform(0.7, 1.3, n)).astype(np.float32)
+    rgba = rng.uniform(0, 1, (n, 4)).astype(np.float32)
+    base = rng.uniform(0, 1, (h, w, 3)).astype(np.float32)
+    return base, x, y, rx, ry, rgba
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'jit'])
+def test_step_matches_ripple_step(backend):
+    step = kernels.step_ripples_numpy if backend == 'numpy' else _jit().step_ripples
+    r0, a0, max_r = _pool()
+    ref = []
+    for r, a in zip(r0, a0):
+        rp = m.Ripple(0.5, 0.5, None, r0=r, max_r=max_r)
+        rp.alpha = a
+        ref.append(rp)
+    r, alpha = r0.copy(), a0.copy()
+    for _ in range(200):
+        ref = [rp for rp in ref if rp.step()]
+        alive = step(r, alpha, GROW, FADE, MIN_ALPHA, max_r)
+        r, alpha = r[alive], alpha[alive]
+        assert len(r) == len(ref)
+        np.testing.assert_array_equal(r, [rp.r for rp in ref])
+        np.testing.assert_array_equal(alpha, [rp.alpha for rp in ref])
+
+
+def test_step_backends_agree():
+    jit = _jit()
+    r0, a0, max_r = _pool(seed=3)
+    ra, aa, rb, ab = r0.copy(), a0.copy(), r0.copy(), a0.copy()
+    for _ in range(150):
+        np.testing.assert_array_equal(kernels.step_ripples_numpy(ra, aa, GROW, FADE, MIN_ALPHA, max_r),
+                                      jit.step_ripples(rb, ab, GROW, FADE, MIN_ALPHA, max_r))
+        np.testing.assert_array_equal(ra, rb)
+        np.testing.assert_array_equal(aa, ab)
+
+
+@pytest.mark.parametrize('antialiased', [True, False])
+def test_draw_rings_backends_agree(antialiased):
+    jit = _jit()
+    base, x, y, rx, ry, rgba = _rings()
+    a, b = base.copy(), base.copy()
+    jit.draw_rings(a, 7, 3, x, y, rx, ry, rgba, np.float32(1.5), antialiased)
+    kernels.draw_rings_numpy(b, 7, 3, x, y, rx, ry, rgba, 3.0, antialiased)
+    # float32 rounding only
+    assert np.abs(a - b).max() < 1e-3
+    assert np.abs(b - base).max() > 0.1
+
+
+def test_blend_backends_agree():
+    jit = _jit()
+    rng = np.random.RandomState(5)
+    frame = rng.randint(0, 256, (96, 128, 4)).astype(np.uint8)
+    alpha = rng.uniform(0, 1, (96, 128)).astype(np.float32)
+    alpha[:10] = 0.0
+    a, b = frame.copy(), frame.copy()
+    jit.blend(a, np.array([0.2, 0.5, 0.9], dtype=np.float32), alpha)
+    kernels.blend_numpy(b, (0.2, 0.5, 0.9), alpha)
+    assert np.abs(a.astype(int) - b).max() <= 1
+    np.testing.assert_array_equal(a[:10], frame[:10])
+    np.testing.assert_array_equal(a[..., 3], frame[..., 3])
+
+
+def test_kept_frames_are_not_overwritten_by_later_steps(tmp_path, monkeypatch):
+    # step() grows r/alpha in place; export_web must keep copies of every frame
+    import export_web
+    kept = []
+    encode = export_web.encode_chunk
+    monkeypatch.setattr(export_web, 'encode_chunk', lambda frames: (kept.extend(frames), encode(frames))[1])
+    export_web.export(n_frames=30, chunk_frames=30, out_dir=str(tmp_path))
+
+    sim = RippleSimulation(m.load_data(m.CSV_CANDIDATE))
+    assert len(kept) == 30
+    for frame in kept:
+        sim.step()
+        for got, want in zip(frame, (sim.x, sim.y, sim.r, sim.alpha, sim.rain)):
+            np.testing.assert_array_equal(got, want)
@@ -0,0 +1,83 @@
+"""Seamless kiosk loops from the spawn-event table, and the viewers' loop cache."""
+import sys
+import time
+
+import numpy as np
+import pytest
+
+import kiosk
+import main as m
+from timeline import SpawnTable
+from simulation import SPAWN_EVERY
+
+
+PERIOD = kiosk.loop_period(120)
+
+
+@pytest.fixture(scope='module')
+def table():
+    return SpawnTable.build(m.load_data(None), 900)
+
+
+def test_period_is_whole_spawn_intervals():
+    assert kiosk.loop_period(121) % SPAWN_EVERY == 0
+    assert kiosk.loop_period(1) == SPAWN_EVERY
+
+
+def test_loop_wraps_seamlessly(table):
+    start = kiosk.choose_start(table, PERIOD, search=300)
+    loop = kiosk.loop_table(table, start, PERIOD)
+    assert kiosk.loop_cost(loop, start, PERIOD) == 0.0
+    a, b = loop.frame(start), loop.frame(start + PERIOD)
+    for name in ('x', 'y', 'r', 'alpha', 'rain'):
+        assert np.array_equal(getattr(a, name), getattr(b, name))
+
+
+def test_loop_cost(table):
+    start = table.lifetime + 1
+    assert kiosk.loop_cost(table, start, 0) == 0.0
+    cost = kiosk.loop_cost(table, start, PERIOD)
+    assert cost > 0.0
+    assert kiosk.choose_start(table, PERIOD, search=300) in range(start, table.n_frames - PERIOD, SPAWN_EVERY)
+
+
+def test_loop_cost_of_different_live_counts(table):
+    start = table.lifetime + 1
+    # frame 0 has no ripples yet, frame `start` has
+    assert kiosk.loop_cost(table, 0, start) == np.inf
+
+
+def test_loop_repeats_the_overlay_samples(table):
+    start = kiosk.choose_start(table, PERIOD, search=300)
+    loop = kiosk.loop_table(table, start, PERIOD)
+    window = slice(start, start + PERIOD)
+    assert np.array_equal(loop.samples[window], table.samples[window])
+    assert np.array_equal(loop.samples[start + PERIOD:start + 2 * PERIOD], table.samples[window])
+    assert loop.frame(start).current_sample() == loop.frame(start + PERIOD).current_sample()
+
+
+def test_loop_cache_builds_once_and_follows_the_data(tmp_path):
+    paths = {'now': str(tmp_path / 'a.npy')}
+    builds = []
+
+    def command(path):
+        builds.append(path)
+        return [sys.executable, '-c', f'import numpy as np; np.save({path!r}, np.zeros((3, 2, 2, 3), np.uint8))']
+
+    def wait(cache):
+        deadline = time.time() + 30
+        while not cache.ready() and time.time() < deadline:
+            time.sleep(0.05)
+        return cache.ready()
+
+    cache = kiosk.LoopCache(lambda: paths['now'], command, np.load)
+    assert wait(cache) and cache.frames.shape == (3, 2, 2, 3)
+    # unchanged data: nothing is rebuilt; changed data: the old loop is dropped
+    cache.refresh()
+    paths['now'] = str(tmp_path / 'b.npy')
+    cache.refresh()
+    assert cache.frames is None and wait(cache)
+    assert builds == [str(tmp_path / 'a.npy'), str(tmp_path / 'b.npy')]
+    # a cached loop is opened without a build
+    again = kiosk.LoopCache(lambda: paths['now'], command, np.load)
+    assert again.ready() and len(builds) == 2
@@ -0,0 +1,98 @@
+"""LiveFeed against the local stub server: conditional polls, keep-alive, backoff and stop."""
+import time
+import asyncio
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+import live_feed_stub
+from live_feed import LiveFeed
+
+
+def _data(n=100):
+    i = np.arange(n, dtype=float)
+    return {'rain': i % 7, 'wind_dir': i * 3 % 360, 'rh': 50 + i % 40, 'temp': 20 + i % 10}
+
+
+@pytest.fixture
+def stub():
+    """Stub endpoint that never reveals new samples; records each request and can be made to fail."""
+    state = {'clients': [], 'fail': None}
+
+    class Handler(live_feed_stub.Handler):
+        feed = live_feed_stub.StubFeed(_data(), tick=3600)
+
+        def do_GET(self):
+            state['clients'].append(self.client_address)
+            if state['fail']:
+                self.send_response(state['fail'])
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            super().do_GET()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    state['url'] = f'http://127.0.0.1:{server.server_address[1]}/v1/forecast'
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def test_unchanged_feed_answers_304_on_the_same_connection(stub):
+    feed = LiveFeed(stub['url'])
+
+    async def two_polls():
+        try:
+            return await feed.poll_once(), feed.last_status, await feed.poll_once(), feed.last_status
+        finally:
+            feed.pool.close()
+
+    first, first_status, second, second_status = asyncio.run(two_polls())
+    assert (first, first_status) == (48, 200)
+    assert (second, second_status) == (0, 304)
+    # one client address: the second request went over the pooled connection
+    assert len(stub['clients']) == 2 and len(set(stub['clients'])) == 1
+    assert feed.drain() == 48
+    assert np.array_equal(feed.data['rain'], _data()['rain'][:48])
+
+
+def test_server_errors_back_off_and_recover(stub):
+    stub['fail'] = 503
+    feed = LiveFeed(stub['url'], interval=0.02, max_backoff=0.1).start()
+    try:
+        deadline = time.time() + 5
+        while feed.failures < 3 and time.time() < deadline:
+            time.sleep(0.01)
+        assert feed.failures >= 3 and feed.last_status == 503
+        failures = feed.failures
+        # jittered exponential backoff, capped at max_backoff
+        delay = feed.next_delay()
+        assert 0.5 * min(0.1, 0.02 * 2 ** (failures - 1)) <= delay <= 0.1
+        stub['fail'] = None
+        while feed.failures and time.time() < deadline:
+            time.sleep(0.01)
+        assert feed.failures == 0 and feed.last_status == 200
+    finally:
+        feed.stop()
+
+
+def test_stop_before_the_first_poll_ends_the_thread():
+    # nothing listens on the url: only stop() can end the poll loop
+    feed = LiveFeed('http://127.0.0.1:9/v1/forecast', interval=60)
+    run = feed._run
+
+    def late_run():
+        # the worker only sets up its loop once stop() has been called
+        feed._stopping.wait()
+        run()
+
+    feed._run = late_run
+    feed.start()
+    thread = feed._thread
+    t0 = time.time()
+    feed.stop()
+    assert not thread.is_alive()
+    assert time.time() - t0 < 2
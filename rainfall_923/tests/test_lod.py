@@ -0,0 +1,26 @@
+"""Level-of-detail classification and ring geometry."""
+import numpy as np
+
+import lod
+
+
+def test_classify():
+    level = lod.classify([0.5, 10.0, 10.0, 0.5], [1.0, 1.0, lod.MIN_ALPHA / 2, lod.MIN_ALPHA / 2])
+    assert level.tolist() == [lod.POINT, lod.RING, lod.SKIP, lod.SKIP]
+
+
+def test_segments_keep_the_chord_error():
+    r = np.geomspace(0.5, 2000, 200)
+    n = lod.segments_for_radius(r)
+    assert np.all(n % 4 == 0) and np.all(np.diff(n) >= 0)
+    assert n.min() == lod.MIN_SEGMENTS and n.max() == lod.MAX_SEGMENTS
+    unclipped = n < lod.MAX_SEGMENTS
+    assert np.all(r[unclipped] * (1 - np.cos(np.pi / n[unclipped])) <= lod.MAX_ERROR_PX + 1e-12)
+
+
+def test_ring_polygons():
+    rings = lod.ring_polygons([10.0], [20.0], [3.0], [2.0], [8])
+    assert len(rings) == 1 and rings[0].shape == (9, 2)
+    assert np.allclose(rings[0][0], rings[0][-1])
+    assert np.allclose(rings[0].max(axis=0), (13.0, 22.0))
+    assert lod.unit_circle(8) is lod.unit_circle(8)
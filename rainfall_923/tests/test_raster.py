@@ -0,0 +1,38 @@
+"""RasterCompositor: threaded compositing and when it falls back to serial."""
+import numpy as np
+
+import kernels
+import main as m
+import raster
+from simulation import RippleSimulation
+
+
+def _frames(threads, n=20, w=640, h=448):
+    comp = raster.RasterCompositor(np.zeros((h, w, 3), dtype=np.uint8), threads=threads)
+    sim = RippleSimulation(m.load_data(None))
+    sim.seek(300)
+    pooled = comp.pool is not None
+    for _ in range(n):
+        sim.step()
+        comp.render(sim.x * w, (1 - sim.y) * h, sim.r * w, sim.r * h, sim.rgba())
+    comp.close()
+    return comp.frame, pooled
+
+
+def test_threads_match_serial(monkeypatch):
+    monkeypatch.setattr(raster.os, 'cpu_count', lambda: 4)
+    serial, _ = _frames(1)
+    threaded, pooled = _frames(4)
+    assert pooled == (kernels.jit_module() is not None)
+    assert np.array_equal(serial, threaded)
+
+
+def test_serial_on_one_cpu(monkeypatch):
+    monkeypatch.setattr(raster.os, 'cpu_count', lambda: 1)
+    assert raster.RasterCompositor(np.zeros((64, 64, 3), dtype=np.uint8), threads=4).pool is None
+
+
+def test_serial_without_numba(monkeypatch):
+    monkeypatch.setattr(raster.os, 'cpu_count', lambda: 4)
+    monkeypatch.setattr(kernels, 'jit_module', lambda: None)
+    assert raster.RasterCompositor(np.zeros((64, 64, 3), dtype=np.uint8), threads=4).pool is None
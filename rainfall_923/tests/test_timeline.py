@@ -0,0 +1,48 @@
+"""SpawnTable frames against the stepped simulation."""
+import numpy as np
+import pytest
+
+import main as m
+import timeline
+from simulation import RippleSimulation, FIELDS
+
+
+@pytest.fixture(scope='module')
+def data():
+    return m.load_data(None)
+
+
+@pytest.fixture(scope='module')
+def table(data):
+    return timeline.SpawnTable.build(data, 600)
+
+
+def test_frames_match_stepping(data):
+    assert timeline.check(data, n_frames=600, frames=(0, 1, 5, 137, 420, 599)) == 0.0
+
+
+def test_frames_in_any_order(data, table):
+    sim = RippleSimulation(data)
+    for t in (311, 7, 600, 312):
+        sim.seek(t)
+        view = table.frame(t)
+        assert view.sample == sim.sample and len(view) == len(sim)
+        for name in FIELDS:
+            assert np.array_equal(getattr(view, name), getattr(sim, name))
+
+
+def test_frame_outside_the_table(table):
+    with pytest.raises(ValueError):
+        table.frame(table.n_frames + 1)
+    with pytest.raises(ValueError):
+        table.frame(-1)
+
+
+def test_save_and_load(data, table, tmp_path):
+    path = str(tmp_path / 'table.npz')
+    table.save(path)
+    loaded = timeline.SpawnTable.load(path, data)
+    assert loaded.n_frames == table.n_frames and len(loaded) == len(table)
+    a, b = table.frame(250), loaded.frame(250)
+    for name in FIELDS:
+        assert np.array_equal(getattr(a, name), getattr(b, name))
@@ -0,0 +1,195 @@
+"""Tiled, process-parallel export for very large canvases (e.g. 7680x2160).
+
+A 7680x2160 `fig.savefig` builds the whole frame in one matplotlib figure
+(hundreds of MB of Agg buffers) and rasterizes it on one core. Here the
+canvas is cut into a grid of tiles and every tile is owned by its own
+process for the whole clip:
+
+- each worker evaluates its frames from one shared timeline.SpawnTable
+  (no stepping) and hands only the ripples whose rings touch its tile to a
+  tile-sized raster.RasterCompositor, so all per-pixel work is per tile and
+  damage tracking carries over from frame to frame,
+- finished tiles are written straight into their slice of a shared
+  memory-mapped frame buffer; no process ever holds a full frame.
+
+Output is either a `.npy` (n, height, width, 3) uint8 memmap of the whole
+clip (`np.load(path, mmap_mode='r')`), or a video. For video the memmap
+is a small ring of `slots` frames: the coordinator streams each frame to
+the imageio writer as soon as all its tiles are in, and workers never run
+more than `slots` frames ahead of the encoder.
+
+Run with:
+  python tiled_export.py --width 7680 --height 2160 --tiles 4x2 --frames 200 --out wall.mp4
+"""
+import os
+import time
+import tempfile
+import multiprocessing as mp
+
+import numpy as np
+
+import main as m
+import assets
+import lod
+from overlay import OverlayCompositor
+from raster import RasterCompositor
+from timeline import SpawnTable
+
+
+VIDEO_EXTS = ('.mp4', '.gif', '.webm', '.mkv')
+# inches of canvas height the quality presets' point sizes refer to (the 10x7 figure)
+REFERENCE_HEIGHT_IN = 7.0
+
+
+def tile_grid(width, height, cols, rows):
+    """(x0, y0, x1, y1) pixel boxes of a cols x rows grid, row-major."""
+    xs = np.linspace(0, width, cols + 1).astype(int)
+    ys = np.linspace(0, height, rows + 1).astype(int)
+    return [(int(xs[i]), int(ys[j]), int(xs[i + 1]), int(ys[j + 1])) for j in range(rows) for i in range(cols)]
+
+
+def _render_tile(index, box, job, table, progress, encoded):
+    """Worker: render one tile for every exported frame of the clip."""
+    x0, y0, x1, y1 = box
+    width, height = job['width'], job['height']
+    quality = job['quality']
+    dpi = height / REFERENCE_HEIGHT_IN
+
+    background = assets.map_background(width, height) if quality['background'] else None
+    if background is None:
+        tile_bg = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+    else:
+        # only this tile's rows/columns of the cached memmap are ever paged in
+        tile_bg = np.array(background[y0:y1, x0:x1, :3])
+    comp = RasterCompositor(tile_bg, linewidth=quality['linewidth'] * dpi / 72.0,
+                            antialiased=quality['antialiased'])
+    overlay = OverlayCompositor(job['overlay'], fontsize=10, dpi=dpi)
+    ox, oy = overlay.origin((0, 0, width, height))
+    # the panel is placed in canvas coordinates; tiles it misses clip it away
+    comp.set_overlay(overlay, ox - x0, oy - y0)
+
+    out = np.load(job['path'], mmap_mode='r+')
+    slots = out.shape[0]
+    stride = quality['stride']
+    j = 0
+    for frame in range(job['start'], job['start'] + job['frames'], stride):
+        # state after stepping `frame`, i.e. at frame + 1, straight from the spawn table
+        sim = table.frame(frame + 1)
+        rgba = sim.rgba()
+        draw = lod.classify(sim.r * width, rgba[:, 3]) != lod.SKIP
+        # canvas pixels (y down) shifted into the tile; rings off the tile are culled by the compositor
+        x = sim.x[draw] * width - x0
+        y = (1 - sim.y[draw]) * height - y0
+        idx = sim.current_sample()
+        comp.render(x, y, sim.r[draw] * width, sim.r[draw] * height, rgba[draw],
+                    values={k: sim.data[k][idx] for k in ('rain', 'rh', 'temp')})
+        # a ring slot is free once the encoder has taken the frame that used it last
+        while j - encoded.value >= slots:
+            time.sleep(0.002)
+        out[j % slots, y0:y1, x0:x1] = comp.frame
+        progress.put((index, j))
+        j += 1
+    out.flush()
+    progress.put((index, None))
+
+
+def export_tiled(out, width=7680, height=2160, tiles=(4, 2), n_frames=200, start_frame=0,
+                 draft=False, csv_path=None, slots=4, table=None):
+    """Render the clip tile-parallel into `out` (.npy memmap or a video file); returns `out`.
+
+    `table` replaces the spawn table built from the CSV (e.g. kiosk.loop_table).
+    """
+    quality = m.render_quality(draft=draft)
+    stride = quality['stride']
+    n_out = len(range(start_frame, start_frame + n_frames, stride))
+    if table is None:
+        # spawn events are recorded once; workers get the table (and the float32 data) by pickle
+        table = SpawnTable.build(m.load_data(csv_path or m.CSV_CANDIDATE), start_frame + n_frames)
+
+    video = out.lower().endswith(VIDEO_EXTS)
+    if video:
+        # a short ring of frames between the tile workers and the encoder
+        fd, path = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(os.path.abspath(out)))
+        os.close(fd)
+        slots = max(1, min(slots, n_out))
+    else:
+        path, slots = out, n_out
+    np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(slots, height, width, 3)).flush()
+
+    job = dict(path=path, width=width, height=height, quality=quality, start=start_frame, frames=n_frames,
+               overlay=[f'Kyoto: {m.KYOTO_LAT}, {m.KYOTO_LON}', 'Rain: {rain:.2f} mm', 'RH: {rh:.1f}%',
+                        'Temp: {temp:.1f} °C'])
+    if quality['background']:
+        # build the cached map once here; workers then only memmap their slice of it
+        assets.map_background(width, height)
+    boxes = tile_grid(width, height, *tiles)
+    progress = mp.Queue()
+    # frames handed to the encoder so far; without one, workers never wait
+    encoded = mp.Value('i', n_out if not video else 0)
+    workers = [mp.Process(target=_render_tile, args=(i, box, job, table, progress, encoded), daemon=True)
+               for i, box in enumerate(boxes)]
+    for w in workers:
+        w.start()
+
+    writer = None
+    if video:
+        import imageio
+        writer = imageio.get_writer(out, fps=20 / stride)
+    frames = np.load(path, mmap_mode='r')
+    done = {}
+    finished = 0
+    next_frame = 0
+    t0 = time.perf_counter()
+    try:
+        while finished < len(workers):
+            try:
+                index, j = progress.get(timeout=5)
+            except Exception:
+                failed = [w.exitcode for w in workers if w.exitcode not in (None, 0)]
+                if failed:
+                    raise RuntimeError(f'tile worker failed (exit code {failed[0]})')
+                continue
+            if j is None:
+                finished += 1
+                continue
+            if not video:
+                continue
+            done[j] = done.get(j, 0) + 1
+            # every worker renders in order, so frames complete in order
+            while done.get(next_frame) == len(workers):
+                del done[next_frame]
+                writer.append_data(frames[next_frame % slots])
+                next_frame += 1
+                encoded.value = next_frame
+        for w in workers:
+            w.join()
+    finally:
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+        if writer is not None:
+            writer.close()
+        del frames
+        if video:
+            os.unlink(path)
+    print(f'Wrote {n_out} frames of {width}x{height} in {len(boxes)} tiles to {out} '
+          f'({time.perf_counter() - t0:.1f}s)')
+    return out
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Tile-parallel export for very large canvases')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(__file__), 'tiled_frames.npy'),
+                        help='.npy memmap of all frames, or a video file (.mp4, .gif, ...)')
+    parser.add_argument('--width', type=int, default=7680)
+    parser.add_argument('--height', type=int, default=2160)
+    parser.add_argument('--tiles', default='4x2', help='Tile grid COLSxROWS; one worker process per tile')
+    parser.add_argument('--frames', type=int, default=200, help='Number of simulation frames')
+    parser.add_argument('--start', type=int, default=0, help='First simulation frame to export')
+    parser.add_argument('--draft', action='store_true', help='Draft quality preset (stride, no map, aliased)')
+    parser.add_argument('--slots', type=int, default=4, help='Frames buffered between the tiles and the encoder')
+    args = parser.parse_args()
+    cols, rows = (int(v) for v in args.tiles.lower().split('x'))
+    export_tiled(args.out, args.width, args.height, (cols, rows), args.frames, args.start, args.draft,
+                 slots=args.slots)
@@ -0,0 +1,141 @@
+"""Closed-form ripple timeline: any frame without sequential stepping.
+
+Once spawned, a ripple only grows and fades (`r += GROW`, `alpha -= FADE`
+per step, see simulation.py) until it dies, so its state is a function of
+its age alone. `SpawnTable` records every spawn event once (frame,
+position, rain value) by running the simulation a single time, plus the
+radius/alpha of a ripple at every age up to death. Because every ripple
+starts from R0/ALPHA0, each one lives exactly `lifetime` steps: the
+lifetime intervals sorted by spawn frame are sorted by death frame as
+well, so the ripples alive at frame t are one contiguous range found with
+two `searchsorted` calls, and their radius and alpha are a single gather
+by age. Any frame is then O(live ripples) and independent of all others.
+
+The age tables are produced with the same float64 recurrence the
+simulation uses, so frames evaluated here are bit-identical to stepping.
+
+  table = SpawnTable.build(data, n_frames=2000)
+  view = table.frame(1234)        # x, y, r, alpha, rain like RippleSimulation
+  layer.update(view)
+"""
+import numpy as np
+
+from simulation import RippleSimulation, R0, GROW, FADE, ALPHA0, MIN_ALPHA, FIELDS
+
+
+def age_tables(max_r, r0=R0, alpha0=ALPHA0, grow=GROW, fade=FADE, min_alpha=MIN_ALPHA):
+    """(r, alpha) by age (index 1 = after the first step) up to the last live age."""
+    r, alpha = [r0], [alpha0]
+    while True:
+        # same order and precision as kernels.step_ripples
+        nr, na = r[-1] + grow, alpha[-1] - fade
+        if not (na > min_alpha and nr < max_r):
+            return np.array(r), np.array(alpha)
+        r.append(nr)
+        alpha.append(na)
+
+
+class FrameView:
+    """Ripple state at one frame; quacks like RippleSimulation for the renderers."""
+
+    rgba = RippleSimulation.rgba
+    current_sample = RippleSimulation.current_sample
+    spawn_frames = RippleSimulation.spawn_frames
+
+    def __init__(self, data, frame, sample, **fields):
+        self.data = data
+        self.frame = frame
+        self.sample = sample
+        for name in FIELDS:
+            setattr(self, name, fields[name])
+
+    def __len__(self):
+        return len(self.r)
+
+
+class SpawnTable:
+    """Spawn events plus the age tables; `frame(t)` evaluates any t in 0..n_frames."""
+
+    def __init__(self, data, spawn, x, y, rain, samples, max_r):
+        self.data = data
+        self.spawn = np.asarray(spawn, dtype=np.int64)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.rain = np.asarray(rain, dtype=float)
+        # samples consumed before frame t, for the overlay
+        self.samples = np.asarray(samples, dtype=np.int64)
+        self.max_r = float(max_r)
+        self.r_age, self.alpha_age = age_tables(self.max_r)
+        # a ripple spawned during step f is alive at frames f+1 .. f+lifetime
+        self.lifetime = len(self.r_age) - 1
+        self.death = self.spawn + self.lifetime
+
+    @property
+    def n_frames(self):
+        return len(self.samples) - 1
+
+    def __len__(self):
+        return len(self.spawn)
+
+    @classmethod
+    def build(cls, data, n_frames, spawner=None, **sim_kwargs):
+        """Run the simulation once and record every spawn event up to frame `n_frames`."""
+        sim = RippleSimulation(data, spawner=spawner, **sim_kwargs)
+        events = []
+        samples = np.empty(n_frames + 1, dtype=np.int64)
+        sim.on_spawn = lambda s, x, y, rain: events.append((np.full(len(x), s.frame), x, y, rain))
+        for t in range(n_frames):
+            samples[t] = sim.sample
+            sim.step()
+        samples[n_frames] = sim.sample
+        if events:
+            spawn, x, y, rain = (np.concatenate(col) for col in zip(*events))
+        else:
+            spawn = x = y = rain = np.zeros(0)
+        return cls(data, spawn, x, y, rain, samples, sim.max_r)
+
+    def live(self, t):
+        """slice of the events alive at frame t (spawned before t, not yet dead)."""
+        lo = np.searchsorted(self.death, t, side='left')
+        hi = np.searchsorted(self.spawn, t, side='left')
+        return slice(lo, max(lo, hi))
+
+    def frame(self, t):
+        """FrameView of frame t, in the same draw order as the stepped simulation."""
+        t = int(t)
+        if not 0 <= t <= self.n_frames:
+            raise ValueError(f'frame {t} outside the table (0..{self.n_frames})')
+        s = self.live(t)
+        age = t - self.spawn[s]
+        return FrameView(self.data, t, int(self.samples[t]), x=self.x[s], y=self.y[s],
+                         r=self.r_age[age], alpha=self.alpha_age[age], rain=self.rain[s])
+
+    def save(self, path):
+        np.savez_compressed(path, spawn=self.spawn, x=self.x, y=self.y, rain=self.rain,
+                            samples=self.samples, max_r=self.max_r)
+
+    @classmethod
+    def load(cls, path, data):
+        with np.load(path) as z:
+            return cls(data, z['spawn'], z['x'], z['y'], z['rain'], z['samples'], float(z['max_r']))
+
+
+def check(data, n_frames=1500, frames=(0, 1, 5, 137, 500, 1499)):
+    """Max difference between evaluated and stepped state at `frames` (0.0 = identical)."""
+    table = SpawnTable.build(data, n_frames)
+    sim = RippleSimulation(data)
+    worst = 0.0
+    for t in sorted(frames):
+        sim.seek(t)
+        view = table.frame(t)
+        if len(view) != len(sim) or view.sample != sim.sample:
+            return np.inf
+        for name in FIELDS:
+            if len(view):
+                worst = max(worst, float(np.abs(getattr(view, name) - getattr(sim, name)).max()))
+    return worst
+
+
+if __name__ == '__main__':
+    import main as m
+    print('max difference vs stepping:', check(m.load_data(m.CSV_CANDIDATE)))
@@ -0,0 +1,135 @@
+"""Compact, validated weather series shared by the loaders and spawners.
+
+The loaders used to return whatever pandas produced: float64 columns at
+best, object arrays of strings at worst. `WeatherSeries` keeps all columns
+in one contiguous (7, n) float32 block (half the memory, trivially shared
+with worker processes via `block`/`from_block`) and is cleaned once, with
+vectorized passes:
+
+- non-numeric cells become NaN, values outside `LIMITS` count as NaN,
+- rain NaNs are 0 (dry), other NaNs carry the last valid value forward,
+- wind direction is wrapped to 0..360 and its radians, sin and cos are
+  precomputed so spawners never call math.radians/cos per sample.
+
+It reads like the old dicts: `series['rain']`, `len(series['rain'])`,
+`series.keys()`. Growing sources (tail_reader, live_feed) still hand out
+plain dicts; `wind_components` covers both.
+"""
+import numpy as np
+
+
+KEYS = ('rain', 'wind_dir', 'rh', 'temp')
+DERIVED = ('wind_rad', 'wind_sin', 'wind_cos')
+ROWS = {k: i for i, k in enumerate(KEYS + DERIVED)}
+
+# plausible physical ranges; anything outside is a sensor or export glitch
+LIMITS = {
+    'rain': (0.0, 300.0),
+    'wind_dir': (-360.0, 720.0),
+    'rh': (0.0, 100.0),
+    'temp': (-60.0, 60.0),
+}
+
+
+def _ffill(col):
+    """Carry the last finite value forward over NaNs (leading NaNs become 0)."""
+    bad = np.isnan(col)
+    if not bad.any():
+        return col
+    idx = np.where(bad, 0, np.arange(len(col)))
+    np.maximum.accumulate(idx, out=idx)
+    out = col[idx]
+    out[np.isnan(out)] = 0.0
+    return out
+
+
+def clean(key, values, n=None):
+    """One column as validated float32 (see the module docstring for the rules)."""
+    if values is None:
+        return np.zeros(n or 0, dtype=np.float32)
+    col = np.asarray(values)
+    if col.dtype.kind not in 'fiub':
+        import pandas as pd
+        col = pd.to_numeric(np.asarray(col, dtype=object).ravel(), errors='coerce')
+    col = np.array(col, dtype=np.float32)
+    lo, hi = LIMITS[key]
+    with np.errstate(invalid='ignore'):
+        col[(col < lo) | (col > hi)] = np.nan
+    if key == 'rain':
+        return np.nan_to_num(col, nan=0.0)
+    col = _ffill(col)
+    if key == 'wind_dir':
+        col = np.mod(col, 360.0, dtype=np.float32)
+    return col
+
+
+class WeatherSeries:
+    """rain (mm), wind_dir (deg), rh (%), temp (C) plus wind radians/sin/cos, all float32."""
+
+    __slots__ = ('block',)
+
+    def __init__(self, rain, wind_dir=None, rh=None, temp=None):
+        n = len(rain)
+        self.block = np.empty((len(ROWS), n), dtype=np.float32)
+        for key, values in zip(KEYS, (rain, wind_dir, rh, temp)):
+            self.block[ROWS[key]] = clean(key, values, n)
+        rad = np.radians(self.block[ROWS['wind_dir']])
+        self.block[ROWS['wind_rad']] = rad
+        self.block[ROWS['wind_sin']] = np.sin(rad)
+        self.block[ROWS['wind_cos']] = np.cos(rad)
+
+    @classmethod
+    def from_block(cls, block):
+        """Wrap an already-cleaned (7, n) float32 block (e.g. shared memory) without copying."""
+        series = cls.__new__(cls)
+        series.block = block
+        return series
+
+    @classmethod
+    def from_frame(cls, df, candidates):
+        """Pick columns by case-insensitive substring, first match wins per key."""
+        cols = {c.lower(): c for c in df.columns}
+        picked = {}
+        for key, names in candidates.items():
+            picked[key] = next((df[orig].to_numpy() for cand in names for k, orig in cols.items() if cand in k), None)
+        n = len(df)
+        return cls(**{k: picked.get(k) if picked.get(k) is not None else np.zeros(n) for k in KEYS})
+
+    def __getitem__(self, key):
+        try:
+            return self.block[ROWS[key]]
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in ROWS
+
+    def __len__(self):
+        return self.block.shape[1]
+
+    def get(self, key, default=None):
+        return self[key] if key in ROWS else default
+
+    def keys(self):
+        return list(KEYS)
+
+    def items(self):
+        return [(k, self[k]) for k in KEYS]
+
+    def __getattr__(self, key):
+        # series.rain, series.wind_sin, ... as row views of the block
+        if key in ROWS:
+            return self.block[ROWS[key]]
+        raise AttributeError(key)
+
+    @property
+    def nbytes(self):
+        return self.block.nbytes
+
+
+def wind_components(data, idx):
+    """(sin, cos) of the wind direction at `idx`, precomputed for a WeatherSeries."""
+    if isinstance(data, WeatherSeries):
+        return data.wind_sin[idx], data.wind_cos[idx]
+    ang = np.radians(np.asarray(data['wind_dir'], dtype=float)[idx])
+    return np.sin(ang), np.cos(ang)